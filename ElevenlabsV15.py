@@ -7,22 +7,27 @@ from PySide6.QtWidgets import (
     QMessageBox, QFrame, QScrollArea, QHeaderView, QMenu, QDialog,
     QDialogButtonBox, QTabWidget, QGroupBox, QSplitter, QRadioButton,
     QButtonGroup, QGridLayout, QProgressBar, QTreeWidget, QTreeWidgetItem,
-    QAbstractItemView
+    QAbstractItemView, QTableView
+)
+from PySide6.QtCore import (
+    Qt, QTimer, Signal, QObject, QThread, QEvent, QAbstractTableModel, QModelIndex
 )
-from PySide6.QtCore import Qt, QTimer, Signal, QObject, QThread, QEvent
 from PySide6.QtGui import QFont, QColor, QTextCursor, QAction, QShortcut, QKeySequence, QClipboard
 import json
 import os
 import requests
 import time
 import threading
+import asyncio
 import re
 from datetime import datetime, timedelta, timezone
 import queue
+import collections
 import subprocess
 import platform
 import hashlib
 import base64
+import email.utils
 import shutil
 import glob
 import random
@@ -32,11 +37,23 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import sys
 
+from mp3_merge import Mp3Merger, MergeCancelled
+from text_chunker import split_text
+
 # Optional Dependencies
 try:
     import docx
 except Exception:
     docx = None
+try:
+    import httpx
+except Exception:
+    httpx = None
+try:
+    import h2  # noqa: F401 - httpx chỉ bật HTTP/2 khi có h2
+    HTTP2_AVAILABLE = True
+except Exception:
+    HTTP2_AVAILABLE = False
 APP_NAME = "Audio Generator V17"
 APP_TAGLINE = "AMZ MEDIA <<Hưng>>"
 
@@ -49,11 +66,13 @@ else:
 SETTINGS_DIR = os.path.join(BASE_DIR, "Settings")
 TEMP_DIR = os.path.join(BASE_DIR, "temp")
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+TTS_CACHE_DIR = os.path.join(BASE_DIR, "tts_cache")
 API_FILE = os.path.join(BASE_DIR, "API.txt")
 VOICES_FILE = os.path.join(SETTINGS_DIR, "voices.json")
 API_SETTINGS_FILE = os.path.join(SETTINGS_DIR, "api_settings.json")
 VOICE_SETTINGS_FILE = os.path.join(SETTINGS_DIR, "voice_settings.json")
 PROXY_LINKS_FILE = os.path.join(SETTINGS_DIR, "proxy_links.json")
+PROXY_STATS_FILE = os.path.join(SETTINGS_DIR, "proxy_stats.json")
 EMBEDDED_PUBLIC_KEY = b"""-----BEGIN PUBLIC KEY-----
 MIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEA8Sp6u0xiwQDdWlinmmbS
 xvrjxmyYsIQf3IZjUg6BVrMTQTeY8dOlVmc+ro1d9/fOVt+TAklJv8WbQrjrU1pL
@@ -83,6 +102,14 @@ STATUS_PENDING = "Pending"
 STATUS_SUCCESS = "Success"
 STATUS_FAIL    = "Fail"
 
+# Streaming download
+STREAM_BLOCK_SIZE = 64 * 1024
+PARTIAL_SUFFIX = ".part"
+
+# Credit check: số request song song + thời gian dùng lại kết quả cũ
+CREDIT_CHECK_WORKERS = 16
+CREDIT_CHECK_TTL = 300
+
 # Proxy URL Template - GIỐNG HỆT TKINTER
 PROXY_URL_TEMPLATE = "https://proxyxoay.shop/api/get.php?key={KEY}&nhamang=random&tinhthanh=0"
 
@@ -126,8 +153,17 @@ def ensure_directories_and_files():
                 'timeout_s': 30,
                 'credit_threshold': 1000,
                 'multithread': True,
+                'async_engine': False,
+                'stream_endpoint': False,
+                'first_byte_timeout_s': 10,
                 'open_after_merge': True,
                 'keep_chunks_after_merge': False,
+                'merge_gap_ms': 0,
+                'incremental_merge': True,
+                'tts_cache': True,
+                'tts_cache_mb': 2048,
+                'proxy_validate_workers': 8,
+                'adaptive_concurrency': True,
                 'proxy_mode': 'no_proxy'
             }
             with open(API_SETTINGS_FILE, 'w', encoding='utf-8') as f:
@@ -180,6 +216,159 @@ def status_human_text(s: str) -> str:
     }.get(s, s or STATUS_QUEUE)
 
 
+def write_stream_atomic(path, blocks, on_progress=None):
+    """
+    Ghi stream vào path.part rồi os.replace → path (atomic)
+    Lỗi giữa chừng → xoá .part, file đích không bao giờ bị cụt
+    on_progress(total_bytes) được gọi sau mỗi block (có thể raise để huỷ)
+    """
+    tmp = path + PARTIAL_SUFFIX
+    total = 0
+    try:
+        with open(tmp, 'wb') as f:
+            for block in blocks:
+                if block:
+                    f.write(block)
+                    total += len(block)
+                    if on_progress:
+                        on_progress(total)
+        if total == 0:
+            raise IOError("Empty audio response")
+        os.replace(tmp, path)
+        return total
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+async def write_stream_atomic_async(path, blocks, on_progress=None):
+    """
+    Async version of write_stream_atomic for httpx aiter_bytes()
+    open/write/close/replace chạy trong executor → không chặn event loop (các request khác)
+    """
+    loop = asyncio.get_running_loop()
+    tmp = path + PARTIAL_SUFFIX
+    total = 0
+    f = None
+    try:
+        f = await loop.run_in_executor(None, open, tmp, 'wb')
+        async for block in blocks:
+            if block:
+                await loop.run_in_executor(None, f.write, block)
+                total += len(block)
+                if on_progress:
+                    on_progress(total)
+        await loop.run_in_executor(None, f.close)
+        if total == 0:
+            raise IOError("Empty audio response")
+        await loop.run_in_executor(None, os.replace, tmp, path)
+        return total
+    except BaseException:
+        if f is not None:
+            f.close()
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def remove_partial_files(folder, keep=()):
+    """Dọn file .part còn sót lại khi app bị kill giữa lúc tải"""
+    removed = 0
+    keep = {os.path.abspath(k) for k in keep}
+    for p in glob.glob(os.path.join(folder, "*" + PARTIAL_SUFFIX)):
+        if os.path.abspath(p) in keep:
+            continue
+        try:
+            os.remove(p)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def tts_url(voice_id, streaming=False):
+    """Blocking endpoint, hoặc /stream để nhận audio ngay khi server bắt đầu render"""
+    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+    return url + "/stream" if streaming else url
+
+
+# Phân loại lỗi TTS để quyết định retry
+RETRY_FATAL = "fatal"          # request sai (voice/text/model) → retry vô ích
+RETRY_KEY = "key"              # lỗi của key (401/403/hết quota) → đổi key, retry ngay
+RETRY_PROXY = "proxy"          # proxy hỏng → đổi proxy, retry ngay
+RETRY_TRANSIENT = "transient"  # server bận / lỗi mạng tạm thời → backoff rồi retry
+
+
+def classify_tts_failure(status, detail=''):
+    """HTTP status + body lỗi → 1 trong các RETRY_* ở trên"""
+    detail = (detail or '').lower()
+    if status in (401, 403):
+        return RETRY_KEY
+    if status == 429:
+        return RETRY_KEY if 'quota' in detail else RETRY_TRANSIENT
+    if status == 407:
+        return RETRY_PROXY
+    if status in (400, 404, 405, 413, 422):
+        return RETRY_FATAL
+    return RETRY_TRANSIENT
+
+
+def retry_delay(attempt, retry_after=None, base=1.0, cap=30.0):
+    """Jittered exponential backoff; header Retry-After (giây hoặc HTTP date) được ưu tiên"""
+    if retry_after:
+        try:
+            secs = float(retry_after)
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(retry_after)
+                if when.tzinfo is None:
+                    when = when.replace(tzinfo=timezone.utc)
+                secs = (when - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                secs = None
+        if secs is not None:
+            return max(0.0, min(secs, 120.0))
+    return random.uniform(0.5, 1.0) * min(cap, base * 2 ** attempt)
+
+
+def format_chunk_ranges(nums):
+    """[1,2,3,5,7,8] → '1→3, 5, 7→8' - log gọn cho project hàng nghìn chunk"""
+    parts = []
+    start = prev = None
+    for n in nums:
+        if start is None:
+            start = prev = n
+        elif n == prev + 1:
+            prev = n
+        else:
+            parts.append(f"{start}→{prev}" if prev != start else str(start))
+            start = prev = n
+    if start is not None:
+        parts.append(f"{start}→{prev}" if prev != start else str(start))
+    return ", ".join(parts)
+
+
+def chunk_audio_path(outdir, number, gen_num=0, num_generations=1):
+    """chunk_001.mp3, hoặc chunk_001_v2.mp3 khi V3 generate nhiều version"""
+    if num_generations > 1:
+        return os.path.join(outdir, f"chunk_{number:03d}_v{gen_num+1}.mp3")
+    return os.path.join(outdir, f"chunk_{number:03d}.mp3")
+
+
+def skip_failed_version(gen_num):
+    """
+    V3 nhiều version - chính sách chung của generation_worker và AsyncTTSEngine:
+    version đầu (gen 0) lỗi → cả lượt thử lỗi (retry/đổi key); version phụ lỗi → bỏ qua version đó,
+    chunk vẫn Success với version đầu
+    """
+    return gen_num > 0
+
+
 # ================================================================================
 # INFRASTRUCTURE CLASSES  
 # ================================================================================
@@ -581,7 +770,22 @@ class LicenseDialog(QDialog):
 
 
 class APIKeyManager:
-    """Thread-safe API key manager - GIỐNG HỆT TKINTER"""
+    """
+    Thread-safe API key manager - GIỐNG HỆT TKINTER
+    - Chưa biết credit → round-robin như cũ
+    - Đã check credit → mỗi chunk đi tới key còn đủ credit, ưu tiên key ít credit nhất
+      (best-fit: key nhỏ được dùng hết cho chunk ngắn, key lớn để dành cho chunk dài)
+    - Circuit breaker: 429 → cooldown tăng gấp đôi, lỗi liên tiếp → tạm nghỉ key,
+      401 invalid → quarantine qua remove_and_backup
+    """
+    # Số request đồng thời tối đa trên 1 key trước khi chuyển sang key khác
+    MAX_INFLIGHT_PER_KEY = 2
+    COOLDOWN_429_BASE = 5      # giây, x2 sau mỗi lần 429 liên tiếp
+    FAILURE_TRIP = 3           # số lỗi liên tiếp trước khi tạm nghỉ key
+    FAILURE_COOLDOWN = 30
+    COOLDOWN_MAX = 300
+    INVALID_KEYS_FILE = "API_invalid.txt"
+
     def __init__(self, api_file, base_dir, logger):
         self._lock = threading.Lock()
         self.api_file = api_file
@@ -589,9 +793,15 @@ class APIKeyManager:
         self._keys = []
         self._idx = 0
         self._logger = logger
+        self._credits = {}    # key → credit còn lại (seed từ check credits)
+        self._reserved = {}   # key → số ký tự của các request đang chạy
+        self._inflight = {}   # key → số request đang chạy
+        self._health = {}     # key → requests/failures/latency/cooldown
+        self._persist = True  # False: key từ server, không ghi ra API.txt
 
     def load_from_file(self):
         with self._lock:
+            self._persist = True
             if os.path.exists(self.api_file):
                 with open(self.api_file, 'r', encoding='utf-8') as f:
                     lines = [l.strip() for l in f.readlines()]
@@ -603,25 +813,158 @@ class APIKeyManager:
         self._logger(f"🔑 Loaded {len(self._keys)} API keys")
         return len(self._keys) > 0
 
+    def load_keys(self, keys):
+        """Nạp key trực tiếp vào memory (không ghi file)"""
+        with self._lock:
+            self._keys = list(keys)
+            self._idx = 0
+            self._persist = False
+
     def count(self):
         with self._lock:
             return len(self._keys)
 
-    def get_next(self):
+    def _cooling(self, key, now):
+        h = self._health.get(key)
+        return h is not None and h['cooldown_until'] > now
+
+    def get_next(self, cost=0):
+        """
+        cost = số ký tự sẽ tiêu. Key được giữ chỗ cho tới khi settle() →
+        trả về None nếu không key nào còn đủ credit
+        """
         with self._lock:
             if not self._keys:
                 return None
-            key = self._keys[self._idx]
+            now = time.time()
+            if cost and self._credits:
+                key = self._pick_for(cost, now)
+            else:
+                key = None
+                n = len(self._keys)
+                for i in range(n):
+                    k = self._keys[(self._idx + i) % n]
+                    if not self._cooling(k, now):
+                        key = k
+                        break
             self._idx = (self._idx + 1) % len(self._keys)
+            if key is not None and cost:
+                self._reserved[key] = self._reserved.get(key, 0) + cost
+                self._inflight[key] = self._inflight.get(key, 0) + 1
             return key
 
+    def _pick_for(self, cost, now):
+        best, best_rank = None, None
+        n = len(self._keys)
+        for i in range(n):
+            # Bắt đầu từ _idx để các key bằng điểm được chia đều
+            k = self._keys[(self._idx + i) % n]
+            if self._cooling(k, now):
+                continue
+            remaining = self._credits.get(k)
+            available = float('inf') if remaining is None else remaining - self._reserved.get(k, 0)
+            if available < cost:
+                continue
+            overload = max(0, self._inflight.get(k, 0) - self.MAX_INFLIGHT_PER_KEY + 1)
+            rank = (overload, available)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = k, rank
+        return best
+
+    def settle(self, api_key, cost, used, status=None, latency=None, detail=''):
+        """
+        Kết thúc request đã get_next(cost): used=True → trừ credit của key.
+        status/latency/detail (body lỗi) cập nhật health + circuit breaker
+        """
+        if not api_key:
+            return
+        cooldown = None
+        quarantine = None
+        with self._lock:
+            if cost:
+                self._reserved[api_key] = max(0, self._reserved.get(api_key, 0) - cost)
+                self._inflight[api_key] = max(0, self._inflight.get(api_key, 0) - 1)
+                if used and api_key in self._credits:
+                    self._credits[api_key] = max(0, self._credits[api_key] - cost)
+            
+            h = self._health.setdefault(api_key, {
+                'requests': 0, 'failures': 0, 'streak': 0, 'strikes': 0,
+                'latency_total': 0.0, 'latency_n': 0, 'cooldown_until': 0.0})
+            h['requests'] += 1
+            if used:
+                h['streak'] = 0
+                h['strikes'] = 0
+                if latency is not None:
+                    h['latency_total'] += latency
+                    h['latency_n'] += 1
+            else:
+                h['failures'] += 1
+                h['streak'] += 1
+                if status == 429:
+                    cooldown = min(self.COOLDOWN_MAX, self.COOLDOWN_429_BASE * 2 ** h['strikes'])
+                    h['strikes'] += 1
+                elif status == 401:
+                    if 'quota_exceeded' in (detail or ''):
+                        self._credits[api_key] = 0
+                    else:
+                        quarantine = "401 invalid key"
+                elif h['streak'] >= self.FAILURE_TRIP:
+                    cooldown = min(self.COOLDOWN_MAX,
+                                   self.FAILURE_COOLDOWN * 2 ** (h['streak'] - self.FAILURE_TRIP))
+                if cooldown:
+                    h['cooldown_until'] = time.time() + cooldown
+        
+        if cooldown:
+            reason = "HTTP 429" if status == 429 else f"{self.FAILURE_TRIP}+ failures in a row"
+            self._logger(f"🧊 API ...{api_key[-4:]} cooling down {cooldown}s ({reason})")
+        if quarantine:
+            self.remove_and_backup(api_key, self.INVALID_KEYS_FILE, quarantine)
+
+    def next_available_in(self):
+        """Tất cả key đang cooldown → số giây tới khi có key rảnh, ngược lại 0"""
+        with self._lock:
+            if not self._keys:
+                return 0
+            now = time.time()
+            waits = [self._health[k]['cooldown_until'] - now if self._cooling(k, now) else 0
+                     for k in self._keys]
+            return max(0, min(waits))
+
+    def health_snapshot(self):
+        """[(key, requests, failures, avg_latency, cooldown_left, credits)] cho bảng Key health"""
+        with self._lock:
+            now = time.time()
+            rows = []
+            for k in self._keys:
+                h = self._health.get(k)
+                if h is None:
+                    rows.append((k, 0, 0, None, 0, self._credits.get(k)))
+                    continue
+                avg = h['latency_total'] / h['latency_n'] if h['latency_n'] else None
+                rows.append((k, h['requests'], h['failures'], avg,
+                             max(0, h['cooldown_until'] - now), self._credits.get(k)))
+            return rows
+
+    def set_credits(self, api_key, remaining):
+        with self._lock:
+            self._credits[api_key] = remaining
+
+    def credits_snapshot(self):
+        """{key: credit còn lại} cho các key đang dùng và đã biết credit"""
+        with self._lock:
+            return {k: self._credits[k] for k in self._keys if k in self._credits}
+
     def current_snapshot(self):
         with self._lock:
             return list(self._keys)
 
     def remove_and_backup(self, api_key, backup_filename, reason):
         with self._lock:
-            if api_key in self._keys:
+            if api_key in self._keys and not self._persist:
+                self._keys.remove(api_key)
+                self._idx = 0 if self._idx >= len(self._keys) else self._idx
+                self._logger(f"🗑️ Quarantined API ...{api_key[-4:]} ({reason})")
+            elif api_key in self._keys:
                 self._keys.remove(api_key)
                 with open(self.api_file, 'w', encoding='utf-8') as f:
                     f.write('\n'.join(self._keys))
@@ -637,26 +980,186 @@ class APIKeyManager:
                 self._logger(f"🗑️ Quarantined API ...{api_key[-4:]} → {backup_filename} ({reason})")
 
 
+class HTTPSessionPool:
+    """Shared keep-alive sessions keyed by proxy URL (None = direct connection)"""
+    def __init__(self, pool_size=32):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._pool_size = pool_size
+
+    @staticmethod
+    def _key(proxies):
+        if not proxies:
+            return None
+        return proxies.get('https') or proxies.get('http')
+
+    def _build(self, proxies):
+        sess = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self._pool_size,
+            pool_maxsize=self._pool_size,
+            max_retries=Retry(total=0, connect=2, read=2, backoff_factor=0)
+        )
+        sess.mount('https://', adapter)
+        sess.mount('http://', adapter)
+        sess.headers.update({'Connection': 'keep-alive'})
+        sess.proxies = proxies or {}
+        return sess
+
+    def configure(self, concurrency):
+        """Size connection pools from concurrency; rebuilds sessions only if size changed"""
+        size = max(32, concurrency * 4)
+        with self._lock:
+            if size == self._pool_size:
+                return
+            self._pool_size = size
+            # Session cũ vẫn dùng được cho request đang chạy, chỉ bỏ khỏi cache
+            self._sessions.clear()
+
+    def get(self, proxies=None):
+        key = self._key(proxies)
+        with self._lock:
+            sess = self._sessions.get(key)
+            if sess is None:
+                sess = self._build(proxies)
+                self._sessions[key] = sess
+            return sess
+
+    def invalidate(self, proxies):
+        """Drop the session of a dead proxy so the next request opens fresh connections"""
+        key = self._key(proxies)
+        if key is None:
+            return
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+
+class ProxyLinkStats:
+    """
+    Latency + tỉ lệ thành công của từng proxy link, lưu ở PROXY_STATS_FILE
+    choose() ưu tiên link nhanh, ổn định thay vì random.choice
+    """
+    DEFAULT_LATENCY = 2.0   # link chưa đo
+    EMA_ALPHA = 0.3
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats = {}  # link → {'ok', 'fail', 'latency', 'last'}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                with self._lock:
+                    self._stats = data
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self._stats, indent=2)
+        tmp = self.path + PARTIAL_SUFFIX
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def record(self, link, ok, latency=None):
+        """ok=None: kết quả trung tính (vd status 101 busy) - không tính vào tỉ lệ thành công"""
+        with self._lock:
+            st = self._stats.setdefault(link, {'ok': 0, 'fail': 0, 'latency': None, 'last': 0})
+            if ok is not None:
+                st['ok' if ok else 'fail'] += 1
+            st['last'] = int(time.time())
+            if ok and latency is not None:
+                prev = st['latency']
+                st['latency'] = latency if prev is None else prev + self.EMA_ALPHA * (latency - prev)
+
+    def get(self, link):
+        with self._lock:
+            return dict(self._stats.get(link, {}))
+
+    def _score(self, link):
+        st = self._stats.get(link)
+        if not st:
+            return 0.5 / self.DEFAULT_LATENCY
+        success = (st['ok'] + 1) / (st['ok'] + st['fail'] + 2)  # Laplace: link mới không bị 0
+        return success ** 2 / (st['latency'] or self.DEFAULT_LATENCY)
+
+    def choose(self, links):
+        """Chọn ngẫu nhiên có trọng số theo điểm (success² / latency)"""
+        if not links:
+            return None
+        with self._lock:
+            weights = [self._score(l) for l in links]
+        return random.choices(links, weights=weights, k=1)[0]
+
+
 class ProxyProvider:
-    """Manages proxy - GIỐNG HỆT TKINTER"""
-    def __init__(self, get_links_callable, logger):
+    """
+    Proxy pool - GIỐNG TKINTER nhưng không chặn workers:
+    - 1 thread nền prefetch sẵn proxy vào pool (HTTP fetch + chờ status 101 đều ngoài lock)
+    - Mỗi worker (owner) giữ proxy riêng, chỉ đổi proxy của worker bị lỗi
+    - Pool cạn (nhiều worker hơn proxy) → dùng chung proxy của worker khác, KHÔNG bao giờ đi direct
+    """
+    PREFETCH = 2          # số proxy dự phòng luôn sẵn trong pool
+    MAX_IDLE_AGE = 120    # proxy nằm trong pool quá lâu → bỏ (proxy xoay hết hạn)
+    WAIT_TIMEOUT = 60     # worker chờ proxy mới tối đa bấy nhiêu giây rồi dùng chung proxy đang có
+    FAIL_BACKOFF = 3
+
+    def __init__(self, get_links_callable, logger, on_refresh=None, stats=None):
         self._lock = threading.Lock()
-        self._current = None
-        self._need_refresh = False
+        self._cond = threading.Condition(self._lock)
+        self._pool = collections.deque()  # (fetched_at, proxies)
+        self._assigned = {}               # owner → proxies
+        self._waiting = 0
+        self._thread = None
         self._get_links = get_links_callable
         self._logger = logger
+        self._on_refresh = on_refresh
+        self._stats = stats
+
+    @staticmethod
+    def _owner(owner):
+        return threading.get_ident() if owner is None else owner
+
+    def reset(self):
+        """Bắt đầu lượt generate mới: mọi worker sẽ nhận proxy mới"""
+        with self._lock:
+            stale = list(self._assigned.values())
+            self._assigned.clear()
+            self._cond.notify_all()
+        if self._on_refresh:
+            for proxies in stale:
+                self._on_refresh(proxies)
 
-    def mark_need_refresh(self):
+    def mark_need_refresh(self, owner=None):
+        """Proxy của worker này lỗi → chỉ worker này đổi proxy"""
         with self._lock:
-            self._need_refresh = True
+            stale = self._assigned.pop(self._owner(owner), None)
+            self._cond.notify_all()
+        if self._on_refresh and stale:
+            self._on_refresh(stale)
 
     def _fetch_new_proxy(self):
+        """HTTP fetch 1 proxy → (proxy, retry_after). Chỉ gọi từ thread prefetch, không giữ lock"""
         links = self._get_links()
         if not links:
-            return None
-        link = random.choice(links)
+            return None, None
+        link = self._stats.choose(links) if self._stats else random.choice(links)
         try:
+            started = time.monotonic()
             r = requests.get(link, timeout=10)
+            if self._stats:
+                st = r.json().get('status') if r.status_code == 200 else None
+                # 101 (busy) không nói gì về sức khoẻ link → trung tính
+                self._stats.record(link, None if st == 101 else st == 100, time.monotonic() - started)
             if r.status_code == 200:
                 data = r.json()
                 st = data.get('status')
@@ -667,25 +1170,25 @@ class ProxyProvider:
                     parts = proxy_http.split(':')
                     if len(parts) != 4:
                         self._logger(f"Invalid proxy format: {proxy_http}")
-                        return None
+                        return None, None
                     
                     ip, port, user, pwd = parts
                     try:
                         port_num = int(port)
                         if port_num <= 0 or port_num > 65535:
                             self._logger(f"Invalid port: {port}")
-                            return None
+                            return None, None
                     except ValueError:
                         self._logger(f"Port is not numeric: {port}")
-                        return None
+                        return None, None
                     
                     # Build proxy URL for requests library
                     url = f"http://{user}:{pwd}@{ip}:{port}"
                     self._logger(f"Got proxy: {ip}:{port}")
-                    return {'http': url, 'https': url}
+                    return {'http': url, 'https': url}, None
                 
                 elif st == 101:
-                    # Service busy - wait and retry
+                    # Service busy - thread prefetch chờ rồi thử lại (worker vẫn dùng proxy đang có)
                     msg = data.get('message', '')
                     self._logger(f"Proxy service busy: {msg}")
                     m = re.search(r'(\d+)s', msg)
@@ -693,133 +1196,1217 @@ class ProxyProvider:
                         wait = int(m.group(1))
                         if 0 < wait <= 300:
                             self._logger(f"Waiting {wait}s for new proxy...")
-                            time.sleep(wait)
-                            return self._fetch_new_proxy()
-                    return None
+                            return None, wait
+                    return None, None
                 else:
                     self._logger(f"Proxy service error (status {st}): {data.get('message','Unknown')}")
-                    return None
+                    return None, None
+            return None, None
         except Exception as e:
+            if self._stats:
+                self._stats.record(link, False)
             self._logger(f"Proxy error: {str(e)}")
-            return None
+            return None, None
+
+    def _ensure_prefetcher(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+            self._thread.start()
+
+    def _prefetch_loop(self):
+        failures = 0
+        while True:
+            with self._cond:
+                while len(self._pool) >= self.PREFETCH + self._waiting:
+                    self._cond.wait()
+            proxies, retry_after = self._fetch_new_proxy()
+            if proxies:
+                failures = 0
+                with self._cond:
+                    self._pool.append((time.monotonic(), proxies))
+                    self._cond.notify_all()
+            else:
+                failures += 1
+                time.sleep(retry_after or min(60, self.FAIL_BACKOFF * 2 ** (failures - 1)))
+
+    def _take_fresh(self):
+        now = time.monotonic()
+        while self._pool:
+            fetched_at, proxies = self._pool.popleft()
+            if now - fetched_at <= self.MAX_IDLE_AGE:
+                return proxies
+        return None
+
+    def get_proxy(self, owner=None):
+        """
+        Proxy của worker; chưa có → lấy từ pool (chờ prefetch nếu pool rỗng)
+        Hết WAIT_TIMEOUT → dùng chung proxy đã giao cho worker khác; None chỉ khi không có proxy nào
+        (caller phải coi là lỗi proxy, không gửi direct)
+        """
+        owner = self._owner(owner)
+        deadline = time.monotonic() + self.WAIT_TIMEOUT
+        with self._cond:
+            current = self._assigned.get(owner)
+            if current:
+                return current
+            self._ensure_prefetcher()
+            self._waiting += 1
+            try:
+                while True:
+                    proxies = self._take_fresh()
+                    if proxies:
+                        self._assigned[owner] = proxies
+                        return proxies
+                    self._cond.notify_all()  # đánh thức thread prefetch
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+                self._cond.notify_all()
+            in_use = list(self._assigned.values())
+            if in_use:
+                shared = random.choice(in_use)
+                self._assigned[owner] = shared
+        if in_use:
+            self._logger("⚠️ Proxy pool starved (more workers than proxies) - sharing a proxy with another worker")
+            return shared
+        self._logger(f"⚠️ No proxy available after {self.WAIT_TIMEOUT}s - request not sent")
+        return None
+
+
+class ChunkDispatchQueue:
+    """Thread-safe FIFO of chunk numbers - mỗi chunk chỉ được phát cho 1 worker"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = collections.deque()
+        self._queued = set()
+        self._in_flight = set()
+        self._retry = set()  # requeue() khi chunk đang chạy → done() mới đưa lại vào hàng đợi
 
-    def get_proxy(self):
-        """Get current proxy or fetch new one if needed"""
+    def put(self, num):
+        """Enqueue a chunk number; ignored if it is already queued or in flight"""
         with self._lock:
-            if self._current is None or self._need_refresh:
-                self._current = self._fetch_new_proxy()
-                self._need_refresh = False
-            return self._current
+            if num in self._queued or num in self._in_flight:
+                return False
+            self._pending.append(num)
+            self._queued.add(num)
+            return True
 
+    def requeue(self, num, front=False):
+        """
+        Put a chunk back (retry)
+        Chunk còn đang chạy → chỉ đánh dấu; done() đưa lại vào hàng đợi sau khi lượt hiện tại xong,
+        tránh 2 worker cùng generate (cùng ghi 1 file .part)
+        """
+        with self._lock:
+            if num in self._in_flight:
+                self._retry.add(num)
+                return False
+            if num in self._queued:
+                return False
+            if front:
+                self._pending.appendleft(num)
+            else:
+                self._pending.append(num)
+            self._queued.add(num)
+            return True
 
-# ================================================================================
-# MAIN GUI CLASS
-# ================================================================================
+    def get(self):
+        """Pop next chunk number in O(1), or None when the queue is drained"""
+        with self._lock:
+            if not self._pending:
+                return None
+            num = self._pending.popleft()
+            self._queued.discard(num)
+            self._in_flight.add(num)
+            return num
 
-class ElevenLabsGUI(QMainWindow):
-    def __init__(self, api_client=None, project_manager=None):
-        super().__init__()
-        
-        # API Client for server integration (optional)
-        self.api_client = api_client
-        # Project Manager for voice output folder
-        self.project_manager = project_manager
-        
-        # Initialize directories và files - TẠO TỰ ĐỘNG
-        ensure_directories_and_files()
-        
-        # Initialize core data structures
-        self.chunks = []
-        self.chunks_by_num = {}
-        self.voices_cache = []  # List format giống Tkinter
-        self.proxy_keys = []  # Store proxy KEYS only
-        self.generation_active = False
-        self.worker_threads = []
-        
-        # Project folders - GIỐNG TKINTER
-        self.selected_file = None
-        self.project_text_path = None
-        self.project_root = None
-        self.project_name = None
-        self.project_dir = None
-        self.project_chunks_txt_dir = None
-        self.project_chunks_audio_dir = None
-        
-        # Stats
-        self.total_credits = 0
-        self.proxy_total = 0
-        self.proxy_ok = 0
-        self.proxy_fail = 0
-        
-        # Initialize managers
-        self.log_queue = queue.Queue()
-        self.api_manager = APIKeyManager(API_FILE, BASE_DIR, self.log)
-        self.proxy_provider = ProxyProvider(self._get_proxy_links, self.log)
-        
-        # Build UI TRƯỚC
-        self.init_ui()
-        
-        # Setup hotkeys
-        self.setup_hotkeys()
-        
-        # Load settings SAU khi UI đã được tạo
-        self.log("Loading all settings...")
-        self.api_manager.load_from_file()
-        self.load_voices()
-        self.load_voice_settings()
-        self.load_proxy_links()
-        self._load_settings()
-        self.log("All settings loaded successfully")
-        
-        # Start log processing
-        self.log_timer = QTimer()
-        self.log_timer.timeout.connect(self.process_logs)
-        self.log_timer.start(100)
+    def done(self, num):
+        """Chunk xong 1 lượt → True nếu nó được requeue trong lúc chạy (đã vào lại hàng đợi)"""
+        with self._lock:
+            self._in_flight.discard(num)
+            if num not in self._retry:
+                return False
+            self._retry.discard(num)
+            if num not in self._queued:
+                self._pending.append(num)
+                self._queued.add(num)
+            return True
 
-    def init_ui(self):
-        self.setWindowTitle(f"{APP_NAME}")
-        self.setGeometry(100, 50, 1600, 1000)
-        
-        # Apply theme
-        self.apply_theme()
-        
-        # Central widget
-        central = QWidget()
-        self.setCentralWidget(central)
-        main_layout = QHBoxLayout(central)
-        main_layout.setContentsMargins(5, 5, 5, 5)
-        main_layout.setSpacing(5)
-        
-        # Left side (70%)
-        left_widget = QWidget()
-        left_layout = QVBoxLayout(left_widget)
-        left_layout.setContentsMargins(0, 0, 0, 0)
-        
-        self.create_text_import_section(left_layout)
-        self.create_chunks_section(left_layout)
-        self.create_progress_section(left_layout)
-        
-        main_layout.addWidget(left_widget, 7)
-        
-        # Right side (30%)
-        right_widget = QWidget()
-        right_layout = QVBoxLayout(right_widget)
-        right_layout.setContentsMargins(0, 0, 0, 0)
-        
-        self.create_settings_section(right_layout)
-        self.create_log_section(right_layout)
-        
-        main_layout.addWidget(right_widget, 3)
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._queued.clear()
+            self._in_flight.clear()
+            self._retry.clear()
 
-    def apply_theme(self):
-        """Navy & Vibrant Orange theme - MODERN & PROFESSIONAL"""
-        stylesheet = """
-        QMainWindow, QWidget {
-            background-color: #f8f9fa;
-            color: #11224E;
-            font-family: 'Segoe UI', Arial, sans-serif;
-            font-size: 10pt;
-        }
+    def depth(self):
+        with self._lock:
+            return len(self._pending)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._in_flight)
+
+    def stats(self):
+        """(queued, in_flight) snapshot"""
+        with self._lock:
+            return len(self._pending), len(self._in_flight)
+
+
+class ChunkStatusCounter:
+    """
+    Đếm số chunk theo status, cập nhật tại mỗi lần chuyển trạng thái (thread-safe)
+    - set() đổi status + chỉnh count trong cùng 1 lock → progress/complete/merge đọc O(1)
+    - reset() đếm lại khi bộ chunk thay đổi (tạo/load/resume)
+    - Ghi lại số chunk vừa đổi (dirty) → bảng chunks chỉ repaint các dòng đó
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = collections.Counter()
+        self._tracked = set()  # id() của các chunk đang được đếm
+        self._dirty = set()    # số chunk đổi status/bytes/nội dung từ lần take_dirty() trước
+        self.total = 0
+
+    def reset(self, chunks):
+        with self._lock:
+            self._counts = collections.Counter(c['status'] for c in chunks)
+            self._tracked = {id(c) for c in chunks}
+            self._dirty.clear()
+            self.total = len(chunks)
+
+    def set(self, chunk, status):
+        """Chuyển status của chunk; chunk không thuộc bộ hiện tại thì chỉ đổi status"""
+        with self._lock:
+            old = chunk['status']
+            chunk['status'] = status
+            if id(chunk) in self._tracked:
+                self._dirty.add(chunk['number'])
+                if old != status:
+                    self._counts[old] -= 1
+                    self._counts[status] += 1
+
+    def touch(self, chunk):
+        """Chunk đổi dữ liệu hiển thị nhưng không đổi status (bytes đang tải, nội dung sửa tay)"""
+        with self._lock:
+            if id(chunk) in self._tracked:
+                self._dirty.add(chunk['number'])
+
+    def take_dirty(self):
+        """Lấy + xoá danh sách số chunk cần repaint"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            return dirty
+
+    def get(self, status):
+        with self._lock:
+            return self._counts[status]
+
+    def snapshot(self):
+        """{status: count} cho cả 4 trạng thái"""
+        with self._lock:
+            return {s: self._counts[s] for s in (STATUS_QUEUE, STATUS_PENDING, STATUS_SUCCESS, STATUS_FAIL)}
+
+    def active(self):
+        """Số chunk còn Queue/Pending"""
+        with self._lock:
+            return self._counts[STATUS_QUEUE] + self._counts[STATUS_PENDING]
+
+    def all_success(self):
+        with self._lock:
+            return self.total > 0 and self._counts[STATUS_SUCCESS] == self.total
+
+
+class ConcurrencyController:
+    """
+    AIMD cho số request TTS đồng thời (tối đa max_limit = Concurrency người dùng đặt)
+    - Slow start: +1 mỗi request OK cho tới lần nghẽn đầu tiên
+    - Sau đó +1 khi cả 1 cửa sổ (limit request) đều OK và latency chưa tăng vọt
+    - 429 / timeout → giảm một nửa (tối đa 1 lần mỗi CUT_INTERVAL giây)
+    adaptive=False → luôn chạy đúng max_limit như trước
+    """
+    START = 4
+    CUT_INTERVAL = 3.0
+    LATENCY_FACTOR = 2.0   # latency EMA > 2x mức tốt nhất → giữ nguyên, không tăng
+    EMA_ALPHA = 0.2
+
+    def __init__(self, max_limit, adaptive=True, logger=None):
+        self.max_limit = max(1, max_limit)
+        self.adaptive = adaptive
+        self.limit = min(self.max_limit, self.START) if adaptive else self.max_limit
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._slow_start = True
+        self._ok_in_window = 0
+        self._last_cut = 0.0
+        self._latency = None
+        self._best_latency = None
+        self._logger = logger
+
+    def acquire(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._in_flight < self.limit, timeout):
+                return False
+            self._in_flight += 1
+            return True
+
+    def try_acquire(self):
+        with self._cond:
+            if self._in_flight >= self.limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._cond.notify()
+
+    def record(self, ok, latency=None, congested=False):
+        """Kết quả 1 request. latency nên chuẩn hoá theo độ dài chunk (giây/ký tự)"""
+        if not self.adaptive:
+            return
+        msg = None
+        with self._cond:
+            old = self.limit
+            now = time.monotonic()
+            if congested:
+                if now - self._last_cut >= self.CUT_INTERVAL and self.limit > 1:
+                    self.limit = max(1, self.limit // 2)
+                    self._last_cut = now
+                    self._slow_start = False
+                    self._ok_in_window = 0
+                    msg = f"📉 Concurrency → {self.limit} (throttled)"
+            elif ok:
+                if latency is not None:
+                    self._latency = latency if self._latency is None else \
+                        self._latency + self.EMA_ALPHA * (latency - self._latency)
+                    if self._best_latency is None or self._latency < self._best_latency:
+                        self._best_latency = self._latency
+                    if self._latency > self.LATENCY_FACTOR * self._best_latency:
+                        return  # server đã chậm lại → không tăng thêm
+                if self._slow_start:
+                    self.limit += 1
+                else:
+                    self._ok_in_window += 1
+                    if self._ok_in_window >= self.limit:
+                        self._ok_in_window = 0
+                        self.limit += 1
+                self.limit = min(self.limit, self.max_limit)
+                if self.limit != old:
+                    self._cond.notify_all()
+                    if self.limit % 5 == 0 or self.limit == self.max_limit:
+                        msg = f"📈 Concurrency → {self.limit}"
+        if msg and self._logger:
+            self._logger(msg)
+
+    def stats(self):
+        with self._cond:
+            return self.limit, self._in_flight
+
+
+class TTSManifest:
+    """
+    Manifest JSON-lines của project - mỗi dòng là trạng thái mới nhất của 1 chunk
+    (bản ghi sau đè bản ghi trước). App crash → mở lại script chỉ generate chunk còn thiếu.
+    """
+    FILENAME = "tts_manifest.jsonl"
+
+    def __init__(self, path):
+        self.path = path
+        self.base_dir = os.path.dirname(path)
+        self.records = {}  # number → record
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def file_hash(path):
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(STREAM_BLOCK_SIZE), b''):
+                h.update(block)
+        return h.hexdigest()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        lines = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                lines += 1
+                try:
+                    rec = json.loads(line)
+                    self.records[int(rec['n'])] = rec
+                except (ValueError, KeyError, TypeError):
+                    continue  # dòng cuối bị cắt dở khi crash
+        if lines > 2 * len(self.records) + 50:
+            self._compact()
+
+    def _compact(self):
+        tmp = self.path + PARTIAL_SUFFIX
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for n in sorted(self.records):
+                f.write(json.dumps(self.records[n], ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+
+    def _rel(self, path):
+        try:
+            return os.path.relpath(path, self.base_dir)
+        except ValueError:  # khác ổ đĩa trên Windows
+            return path
+
+    def record(self, chunk):
+        """Ghi trạng thái cuối của chunk (append + flush ngay)"""
+        audio = chunk.get('audio_file')
+        rec = {
+            'n': chunk['number'],
+            'hash': self.text_hash(chunk['content']),
+            'status': chunk['status'],
+            'audio': None,
+            'size': 0,
+            'sha1': None,
+        }
+        if chunk['status'] == STATUS_SUCCESS and audio and os.path.isfile(audio):
+            rec['audio'] = self._rel(audio)
+            rec['size'] = os.path.getsize(audio)
+            rec['sha1'] = self.file_hash(audio)
+        with self._lock:
+            prev = self.records.get(rec['n'])
+            if prev and all(prev.get(k) == v for k, v in rec.items()):
+                return
+            rec['ts'] = datetime.now().isoformat(timespec='seconds')
+            self.records[rec['n']] = rec
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                f.flush()
+
+    def restore(self, chunk):
+        """Chunk cùng nội dung đã Success và MP3 còn nguyên (size + sha1) → True"""
+        rec = self.records.get(chunk['number'])
+        if not rec or rec.get('status') != STATUS_SUCCESS or not rec.get('audio'):
+            return False
+        if rec.get('hash') != self.text_hash(chunk['content']):
+            return False
+        audio = os.path.join(self.base_dir, rec['audio'])
+        try:
+            if os.path.getsize(audio) != rec.get('size') or self.file_hash(audio) != rec.get('sha1'):
+                return False
+        except OSError:
+            return False
+        chunk['status'] = STATUS_SUCCESS
+        chunk['audio_file'] = audio
+        chunk['bytes'] = rec['size']
+        return True
+
+
+class TTSCache:
+    """
+    Cache MP3 theo nội dung: key = hash(text, voice_id, model_id, voice_settings)
+    - Hit → hard-link (hoặc copy nếu khác ổ đĩa) vào folder project, không tốn credit
+    - LRU theo dung lượng: vượt max_bytes → xoá file dùng lâu nhất
+    - Lock chỉ giữ khi sửa index/LRU; link/copy/xoá file chạy ngoài lock (worker không chờ nhau)
+    """
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key → size, cũ nhất ở đầu
+        self._storing = set()  # key đang được ghi vào cache (ngoài lock)
+        self._total = 0
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def key(text, voice_id, model_id, voice_settings):
+        raw = json.dumps([text, voice_id, model_id, voice_settings], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".mp3")
+
+    def _scan(self):
+        found = []
+        for p in glob.glob(os.path.join(self.root, "*", "*.mp3")):
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            found.append((st.st_mtime, os.path.basename(p)[:-4], st.st_size))
+        for _mtime, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+
+    @staticmethod
+    def _link_or_copy(src, dst):
+        tmp = dst + PARTIAL_SUFFIX
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+
+    def fetch(self, key, dest):
+        """Có trong cache → đặt file vào dest, trả về True"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False
+            self._entries.move_to_end(key)
+        path = self._path(key)
+        try:
+            self._link_or_copy(path, dest)
+            os.utime(path)
+        except OSError:
+            # File cache hỏng/bị xoá → bỏ khỏi index
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            self._remove_files([key])
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key, src):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            if key in self._storing:
+                return
+            self._storing.add(key)
+        try:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._link_or_copy(src, path)
+            size = os.path.getsize(path)
+        except BaseException:
+            with self._lock:
+                self._storing.discard(key)
+            raise
+        with self._lock:
+            self._storing.discard(key)
+            self._entries[key] = size
+            self._total += size
+            evicted = []
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                victim = next(iter(self._entries))
+                self._forget(victim)
+                evicted.append(victim)
+        self._remove_files(evicted)
+
+    def _forget(self, key):
+        """Bỏ key khỏi index (gọi khi đang giữ lock)"""
+        self._total -= self._entries.pop(key, 0)
+
+    def _remove_files(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+class IncrementalMerger:
+    """
+    Merge dần trong lúc generate: append chunk N ngay khi 1..N đều Success
+    (contiguous-prefix watermark). Khi generate xong chỉ còn phải merge phần đuôi.
+    ready_path(n) → audio path nếu chunk n đã Success, ngược lại None
+    """
+    def __init__(self, final_path, total, gap_ms, ready_path, logger):
+        self.final_path = final_path
+        self.tmp_path = final_path + PARTIAL_SUFFIX
+        self.total = total
+        self.gap_ms = gap_ms
+        self.error = None
+        self._ready_path = ready_path
+        self._logger = logger
+        self._merger = None
+        self._watermark = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """Gọi sau mỗi chunk Success - thread merge sẽ thử đẩy watermark lên"""
+        self._wake.set()
+
+    def watermark(self):
+        return self._watermark
+
+    def is_valid_for(self, final_path, total, gap_ms):
+        return (self.error is None and self.final_path == final_path
+                and self.total == total and self.gap_ms == gap_ms)
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(1.0)
+            self._wake.clear()
+            if not self._stopped:
+                self._advance()
+
+    def _advance(self, progress=None, should_cancel=None):
+        with self._lock:
+            while self._watermark < self.total and self.error is None:
+                if should_cancel and should_cancel():
+                    raise MergeCancelled()
+                path = self._ready_path(self._watermark + 1)
+                if not path:
+                    break
+                try:
+                    if self._merger is None:
+                        self._merger = Mp3Merger(self.tmp_path, self.gap_ms)
+                    self._merger.append(path)
+                except Exception as e:
+                    self.error = e
+                    self._logger(f"⚠️ Incremental merge stopped at chunk #{self._watermark + 1}: {e}")
+                    break
+                self._watermark += 1
+                if progress:
+                    progress(self._watermark, self.total)
+
+    def finish(self, progress=None, should_cancel=None):
+        """Merge phần đuôi, ghi Xing header, rename .part → final. Trả về stats"""
+        self._stopped = True
+        self._wake.set()
+        try:
+            self._advance(progress, should_cancel)
+            with self._lock:
+                if self.error is not None:
+                    raise self.error
+                if self._watermark != self.total or self._merger is None:
+                    raise RuntimeError(f"Merge incomplete: {self._watermark}/{self.total} chunks ready")
+                stats = self._merger.finalize()
+                self._merger = None
+            os.replace(self.tmp_path, self.final_path)
+            return stats
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):
+        self._stopped = True
+        self._wake.set()
+        with self._lock:
+            if self._merger is not None:
+                self._merger.abort()
+                self._merger = None
+            self._watermark = 0
+
+
+class ChunkTableModel(QAbstractTableModel):
+    """
+    Model cho bảng chunks (thay QTableWidget):
+    - Không tạo item mỗi lần refresh - view chỉ hỏi data() cho các dòng đang hiển thị
+    - refresh() chỉ xử lý các chunk dirty (ChunkStatusCounter ghi lại khi đổi status/bytes),
+      emit dataChanged cho các dải dòng đó - chi phí theo số thay đổi, không theo số chunk
+    - Cache tổng ký tự, cập nhật theo chênh lệch
+    """
+
+    HEADERS = ["Chars", "Status", "Content"]
+    STATUS_COLORS = {
+        STATUS_SUCCESS: QColor("#10b981"),  # Green
+        STATUS_FAIL: QColor("#ef4444"),     # Red
+        STATUS_PENDING: QColor("#f59e0b"),  # Yellow
+        STATUS_QUEUE: QColor("#3b82f6"),    # Blue
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._chunks = []
+        self._chars = []     # số ký tự từng dòng (để cập nhật total_chars khi sửa nội dung)
+        self._row_of = {}    # số chunk → dòng
+        self.total_chars = 0
+
+    @staticmethod
+    def _chunk_chars(chunk):
+        return chunk.get('chars', len(chunk.get('content', '')))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._chunks)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._chunks):
+            return None
+        chunk = self._chunks[index.row()]
+        col = index.column()
+        if role == Qt.DisplayRole:
+            if col == 0:
+                return str(chunk.get('chars', len(chunk.get('content', ''))))
+            if col == 1:
+                text = status_human_text(chunk['status'])
+                if chunk['status'] == STATUS_PENDING and chunk.get('bytes'):
+                    text += f" {chunk['bytes'] // 1024} KB"
+                return text
+            if col == 2:
+                content = chunk['content']
+                return content[:150] + "..." if len(content) > 100 else content
+        elif role == Qt.ForegroundRole and col == 1:
+            return self.STATUS_COLORS.get(chunk['status'])
+        return None
+
+    def chunk_at(self, row):
+        if 0 <= row < len(self._chunks):
+            return self._chunks[row]
+        return None
+
+    def reset(self, chunks):
+        """Thay toàn bộ danh sách (tạo/load/xóa chunks)"""
+        self.beginResetModel()
+        self._chunks = chunks
+        self._chars = [self._chunk_chars(c) for c in chunks]
+        self._row_of = {c['number']: row for row, c in enumerate(chunks)}
+        self.total_chars = sum(self._chars)
+        self.endResetModel()
+
+    def refresh(self, chunks, dirty):
+        """Đồng bộ với chunks; dirty = số các chunk đã đổi → chỉ báo view các dòng đó"""
+        if chunks is not self._chunks or len(chunks) != len(self._chars):
+            self.reset(chunks)
+            return
+        rows = sorted(self._row_of[n] for n in dirty if n in self._row_of)
+        if not rows:
+            return
+        for row in rows:
+            chars = self._chunk_chars(chunks[row])
+            self.total_chars += chars - self._chars[row]
+            self._chars[row] = chars
+        last_col = len(self.HEADERS) - 1
+        run_start = prev = rows[0]
+        for row in rows[1:]:
+            if row != prev + 1:
+                self.dataChanged.emit(self.index(run_start, 0), self.index(prev, last_col))
+                run_start = row
+            prev = row
+        self.dataChanged.emit(self.index(run_start, 0), self.index(prev, last_col))
+
+
+class MergeWorker(QThread):
+    """
+    Background merge - kiểm tra file, merge frame-accurate, verify, cleanup
+    entries: [(chunk_number, audio_path)] đã sort theo số thứ tự
+    """
+    progress_signal = Signal(int, int)   # done, total
+    log_signal = Signal(str)
+    done_signal = Signal(dict)
+    failed_signal = Signal(str, str)     # title, message
+
+    LOG_EVERY_PCT = 10
+
+    def __init__(self, entries, merged_file, gap_ms=0, keep_chunks=True, incremental=None, parent=None):
+        super().__init__(parent)
+        self.entries = entries
+        self.merged_file = merged_file
+        self.gap_ms = gap_ms
+        self.keep_chunks = keep_chunks
+        self.incremental = incremental
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        total = len(self.entries)
+        try:
+            # STEP A: kiểm tra audio files
+            errors = []
+            for chunk_num, audio_path in self.entries:
+                if not audio_path:
+                    errors.append(f"Chunk #{chunk_num}: No audio file path")
+                elif not os.path.exists(audio_path):
+                    errors.append(f"Chunk #{chunk_num}: File not found\n  Path: {audio_path}")
+                elif os.path.getsize(audio_path) == 0:
+                    errors.append(f"Chunk #{chunk_num}: Empty file (0 bytes)\n  Path: {audio_path}")
+            if errors:
+                msg = "❌ AUDIO FILE VALIDATION FAILED!\n\n" + "\n".join(errors[:20])
+                if len(errors) > 20:
+                    msg += f"\n... and {len(errors) - 20} more"
+                msg += "\n\n⚠️ All chunks must have valid audio files!"
+                self.failed_signal.emit("Merge Failed", msg)
+                return
+            self.log_signal.emit(f"✅ All {total} audio files validated")
+
+            # STEP B: merge - log gộp mỗi LOG_EVERY_PCT %
+            if self.gap_ms:
+                self.log_signal.emit(f"   🔇 Silence gap: {self.gap_ms} ms between chunks")
+            if self.incremental is not None:
+                stats = self._finish_incremental(total)
+            else:
+                stats = self._merge_all(total)
+
+            if stats['mismatched']:
+                self.log_signal.emit(f"   ⚠️ Chunks with different sample rate/channels: {', '.join(stats['mismatched'][:5])}")
+
+            # STEP C: verify output
+            merged_size = os.path.getsize(self.merged_file) if os.path.exists(self.merged_file) else 0
+            if merged_size == 0:
+                self.failed_signal.emit("Merge Failed", "Output file is empty or missing!")
+                return
+            if stats['files'] != total:
+                self.failed_signal.emit("Merge Failed", f"Merge incomplete!\n\nExpected: {total} chunks\nMerged: {stats['files']} chunks")
+                return
+            self.log_signal.emit(f"   Frames: {stats['frames']:,} • Output: {merged_size:,} bytes")
+
+            # STEP D: cleanup (optional)
+            if not self.keep_chunks:
+                deleted, failed = 0, []
+                for _, audio_path in self.entries:
+                    try:
+                        os.remove(audio_path)
+                        deleted += 1
+                    except Exception as e:
+                        failed.append(f"{os.path.basename(audio_path)}: {e}")
+                self.log_signal.emit(f"🗑️ Deleted chunk files: {deleted}/{total}")
+                for fail in failed[:5]:
+                    self.log_signal.emit(f"      - {fail}")
+                if len(failed) > 5:
+                    self.log_signal.emit(f"      ... and {len(failed) - 5} more")
+
+            stats['path'] = self.merged_file
+            stats['bytes'] = merged_size
+            stats['order'] = [n for n, _ in self.entries]
+            self.done_signal.emit(stats)
+
+        except MergeCancelled:
+            self.failed_signal.emit("Merge Cancelled", "Merge was cancelled")
+        except Exception as e:
+            self.failed_signal.emit("Merge Failed", f"Merge process failed:\n\n{e}")
+
+    def _merge_all(self, total):
+        """Merge toàn bộ entries theo thứ tự"""
+        if os.path.exists(self.merged_file):
+            os.remove(self.merged_file)
+        merger = Mp3Merger(self.merged_file, self.gap_ms)
+        batch_start = None
+        next_log_pct = self.LOG_EVERY_PCT
+        try:
+            for i, (chunk_num, audio_path) in enumerate(self.entries, 1):
+                if self._cancel.is_set():
+                    raise MergeCancelled()
+                try:
+                    merger.append(audio_path)
+                except Exception as e:
+                    raise RuntimeError(f"Failed to merge chunk #{chunk_num}:\n{audio_path}\n\nError: {e}")
+                if batch_start is None:
+                    batch_start = chunk_num
+                pct = i * 100 // total
+                if pct >= next_log_pct or i == total:
+                    self.log_signal.emit(f"   [{pct:3d}%] Merged #{batch_start:03d} → #{chunk_num:03d}")
+                    batch_start = None
+                    next_log_pct = (pct // self.LOG_EVERY_PCT + 1) * self.LOG_EVERY_PCT
+                self.progress_signal.emit(i, total)
+            return merger.finalize()
+        except BaseException:
+            merger.abort()
+            raise
+
+    def _finish_incremental(self, total):
+        """Phần lớn đã merge trong lúc generate - chỉ còn đuôi"""
+        already = self.incremental.watermark()
+        self.log_signal.emit(f"⚡ {already}/{total} chunks already merged during generation - finishing tail")
+        self.progress_signal.emit(already, total)
+        return self.incremental.finish(
+            progress=lambda done, t: self.progress_signal.emit(done, t),
+            should_cancel=self._cancel.is_set
+        )
+
+
+class TTSEngineSignals(QObject):
+    chunk_updated = Signal(int)  # chunk number
+    finished = Signal()
+
+
+class AsyncTTSEngine:
+    """
+    Asyncio/httpx TTS engine - 1 background thread, N request đồng thời
+    - Semaphore giới hạn số request in-flight (config['concurrency'])
+    - 1 AsyncClient (HTTP/2 nếu có h2) cho mỗi proxy, dùng chung giữa các request
+    - Giữ nguyên timeout/retry và V3 multi-generation như generation_worker
+    """
+    def __init__(self, config, dispatch_queue, chunks_by_num, api_manager, proxy_provider, logger,
+                 controller=None, status_counter=None, on_finished=None):
+        self.config = config
+        # Hook trạng thái cuối của chunk (manifest SHA-1 + TTS cache) - chạy trong executor, không ở UI
+        self.on_finished = on_finished
+        self.status_counter = status_counter or ChunkStatusCounter()
+        self.controller = controller or ConcurrencyController(config['concurrency'], adaptive=False)
+        self.dispatch_queue = dispatch_queue
+        self.chunks_by_num = chunks_by_num
+        self.api_manager = api_manager
+        self.proxy_provider = proxy_provider
+        self._logger = logger
+        self._stopped = False
+        self._thread = None
+        self._clients = {}
+        self._free_slots = []  # mỗi slot = 1 "worker" có proxy riêng
+        self.signals = TTSEngineSignals()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            self._logger(f"💥 Async engine error: {e}")
+        finally:
+            self.signals.finished.emit()
+
+    def _client(self, proxies):
+        key = (proxies or {}).get('https')
+        client = self._clients.get(key)
+        if client is None:
+            limits = httpx.Limits(max_connections=self.config['concurrency'],
+                                  max_keepalive_connections=self.config['concurrency'])
+            kwargs = {'http2': HTTP2_AVAILABLE, 'limits': limits, 'timeout': self.config['timeout']}
+            try:
+                client = httpx.AsyncClient(proxy=key, **kwargs)
+            except TypeError:
+                # httpx < 0.26 chỉ có tham số proxies
+                client = httpx.AsyncClient(proxies=key, **kwargs)
+            self._clients[key] = client
+        return client
+
+    async def _main(self):
+        self._free_slots = list(range(self.config['concurrency']))
+        tasks = set()
+        try:
+            while not self._stopped:
+                # Số request in-flight do ConcurrencyController quyết định (AIMD)
+                if not self.controller.try_acquire():
+                    if tasks:
+                        await asyncio.wait(tasks, timeout=0.2, return_when=asyncio.FIRST_COMPLETED)
+                        tasks = {t for t in tasks if not t.done()}
+                    else:
+                        await asyncio.sleep(0.05)
+                    continue
+                num = self.dispatch_queue.get()
+                if num is None:
+                    self.controller.release()
+                    if not tasks:
+                        break
+                    # Còn request đang chạy - có thể sẽ có chunk được re-queue
+                    await asyncio.wait(tasks, timeout=0.2, return_when=asyncio.FIRST_COMPLETED)
+                    tasks = {t for t in tasks if not t.done()}
+                    continue
+                task = asyncio.create_task(self._process(num))
+                task.add_done_callback(lambda _t: self.controller.release())
+                tasks.add(task)
+                tasks = {t for t in tasks if not t.done()}
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for client in self._clients.values():
+                try:
+                    await client.aclose()
+                except Exception:
+                    pass
+            self._clients.clear()
+
+    async def _process(self, num):
+        slot = self._free_slots.pop()
+        try:
+            await self._process_chunk(num, f"async-{slot}")
+        finally:
+            self._free_slots.append(slot)
+
+    async def _process_chunk(self, num, owner):
+        chunk = self.chunks_by_num.get(num)
+        if not chunk or chunk['status'] != STATUS_QUEUE:
+            self.dispatch_queue.done(num)
+            return
+        self.status_counter.set(chunk, STATUS_PENDING)
+        chunk['bytes'] = 0
+        self.signals.chunk_updated.emit(num)
+
+        cfg = self.config
+        num_generations = cfg['num_generations']
+        streaming = cfg['stream_endpoint']
+        url = tts_url(cfg['voice_id'], streaming)
+        # /stream: không có byte nào trong first_byte_timeout giây → đổi key retry ngay
+        req_timeout = httpx.Timeout(cfg['first_byte_timeout']) if streaming else httpx.Timeout(cfg['timeout'])
+        payload = {"text": chunk['content'], "model_id": cfg['model_id'], "voice_settings": cfg['voice_settings']}
+        os.makedirs(cfg['outdir'], exist_ok=True)
+        cost = len(chunk['content']) * num_generations
+
+        success = False
+        status = None
+        retry_wait = 0
+        for attempt in range(cfg['max_retries']):
+            if self._stopped:
+                break
+            if attempt > 0:
+                self._logger(f"🔄 Retry {attempt}/{cfg['max_retries']} for chunk {num}")
+                if retry_wait > 0:
+                    await asyncio.sleep(retry_wait)
+
+            # Proxy trước key (thiếu proxy thì không giữ chỗ key) - proxy mode không bao giờ đi direct
+            proxies = None
+            if cfg['use_proxy']:
+                # get_proxy có thể chờ prefetch → chạy ngoài event loop
+                proxies = await asyncio.to_thread(self.proxy_provider.get_proxy, owner)
+                if not proxies:
+                    retry_wait = 0
+                    continue
+
+            api_key = self.api_manager.get_next(cost)
+            while not api_key and not self._stopped:
+                # Tất cả key đang cooldown → chờ, không tính là 1 lần retry
+                wait = self.api_manager.next_available_in()
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, 5))
+                api_key = self.api_manager.get_next(cost)
+            if not api_key:
+                self._logger(f"💳 Chunk {num}: no API key with {cost:,} credits left")
+                break
+            headers = {"xi-api-key": api_key, "Content-Type": "application/json"}
+
+            status = None
+            detail = ''
+            retry_after = None
+            kind = RETRY_TRANSIENT
+            timed_out = False
+            t0 = time.monotonic()
+            try:
+                client = self._client(proxies)
+                self._logger(f"⚡ Chunk {num} • API ...{api_key[-4:]} • send")
+                best_audio = None
+                for gen_num in range(num_generations):
+                    audio_file = chunk_audio_path(cfg['outdir'], num, gen_num, num_generations)
+                    started = time.monotonic()
+
+                    def on_progress(total):
+                        chunk['bytes'] = total
+                        self.status_counter.touch(chunk)
+                        if streaming and time.monotonic() - started > cfg['timeout']:
+                            raise httpx.ReadTimeout(f"exceeded {cfg['timeout']}s")
+
+                    async with client.stream("POST", url, json=payload, headers=headers,
+                                             timeout=req_timeout) as resp:
+                        if resp.status_code != 200 and skip_failed_version(gen_num):
+                            self._logger(f"  ⚠️ Chunk {num} • Version {gen_num+1}/{num_generations}: HTTP {resp.status_code} - skipped")
+                            continue
+                        status = resp.status_code  # status của version đầu quyết định chunk
+                        if status != 200:
+                            body = await resp.aread()
+                            detail = body[:500].decode('utf-8', 'replace')
+                            retry_after = resp.headers.get('Retry-After')
+                            self._logger(f"⚠️ Chunk {num} • HTTP {status}: {body[:200].decode('utf-8', 'replace')}")
+                            break
+                        await write_stream_atomic_async(audio_file, resp.aiter_bytes(STREAM_BLOCK_SIZE), on_progress)
+                    if gen_num == 0:
+                        best_audio = audio_file
+                    if num_generations > 1:
+                        self._logger(f"  ✅ Chunk {num} • Version {gen_num+1}/{num_generations}")
+
+                if best_audio:
+                    chunk['audio_file'] = best_audio
+                    success = True
+                    break
+                kind = classify_tts_failure(status, detail)
+            except httpx.ProxyError as e:
+                kind = RETRY_PROXY
+                self._logger(f"🌐 Proxy error chunk {num}: {e}")
+            except httpx.TimeoutException:
+                timed_out = True
+                if streaming and not chunk.get('bytes'):
+                    kind = RETRY_KEY
+                    self._logger(f"⏰ Chunk {num}: no audio within {cfg['first_byte_timeout']}s → switching key")
+                else:
+                    self._logger(f"⏰ Timeout chunk {num}")
+            except httpx.TransportError as e:
+                kind = RETRY_PROXY if cfg['use_proxy'] else RETRY_TRANSIENT
+                self._logger(f"🔌 Connection error chunk {num}: {e}")
+            except Exception as e:
+                self._logger(f"❌ Chunk {num}: {e}")
+            finally:
+                elapsed = time.monotonic() - t0
+                self.api_manager.settle(api_key, cost, success, status, elapsed, detail)
+                self.controller.record(success, elapsed / max(1, cost), congested=status == 429 or timed_out)
+
+            if kind == RETRY_FATAL:
+                self._logger(f"⛔ Chunk {num}: HTTP {status} - not retrying")
+                break
+            if kind == RETRY_PROXY and cfg['use_proxy']:
+                self.proxy_provider.mark_need_refresh(owner)
+            # Đổi key/proxy → retry ngay; lỗi tạm thời → backoff (tôn trọng Retry-After)
+            retry_wait = retry_delay(attempt, retry_after) if kind == RETRY_TRANSIENT else 0
+
+        if success:
+            self.status_counter.set(chunk, STATUS_SUCCESS)
+            self._logger(f"✅ Chunk {num}")
+        else:
+            self.status_counter.set(chunk, STATUS_FAIL)
+            self._logger(f"❌ Chunk {num}: {status} (after {cfg['max_retries']} attempts)")
+        if self.on_finished is not None:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.on_finished, chunk, cfg)
+            except Exception as e:
+                self._logger(f"⚠️ Chunk {num}: post-processing failed: {e}")
+        if self.dispatch_queue.done(num):
+            # User re-queue trong lúc đang chạy → generate lại
+            self.status_counter.set(chunk, STATUS_QUEUE)
+        self.signals.chunk_updated.emit(num)
+
+        if cfg['delay'] > 0:
+            await asyncio.sleep(cfg['delay'])
+
+
+# ================================================================================
+# MAIN GUI CLASS
+# ================================================================================
+
+class ElevenLabsGUI(QMainWindow):
+    def __init__(self, api_client=None, project_manager=None):
+        super().__init__()
+        
+        # API Client for server integration (optional)
+        self.api_client = api_client
+        # Project Manager for voice output folder
+        self.project_manager = project_manager
+        
+        # Initialize directories và files - TẠO TỰ ĐỘNG
+        ensure_directories_and_files()
+        
+        # Initialize core data structures
+        self.chunks = []
+        self.chunks_by_num = {}
+        self.voices_cache = []  # List format giống Tkinter
+        self.proxy_keys = []  # Store proxy KEYS only
+        self.generation_active = False
+        self.worker_threads = []
+        self.dispatch_queue = ChunkDispatchQueue()
+        self.status_counter = ChunkStatusCounter()
+        self.tts_engine = None
+        self._gen_config = None
+        self._run_id = 0  # tăng mỗi lần Start → worker thread của lượt cũ tự thoát
+        self.merge_worker = None
+        self.concurrency = None
+        self.incremental_merger = None
+        self._run_merge_path = None  # output path chốt cho lượt chạy hiện tại (incremental + merge cuối)
+        self.manifest = None
+        self.tts_cache = None
+        
+        # Project folders - GIỐNG TKINTER
+        self.selected_file = None
+        self.project_text_path = None
+        self.project_root = None
+        self.project_name = None
+        self.project_dir = None
+        self.project_chunks_txt_dir = None
+        self.project_chunks_audio_dir = None
+        
+        # Stats
+        self.total_credits = 0
+        self._credit_checked_at = {}  # key → time.time() lần check credit gần nhất
+        self._credit_check_running = False
+        self.proxy_total = 0
+        self.proxy_ok = 0
+        self.proxy_fail = 0
+        
+        # Initialize managers
+        self.log_queue = queue.Queue()
+        self.api_manager = APIKeyManager(API_FILE, BASE_DIR, self.log)
+        self.session_pool = HTTPSessionPool()
+        self.proxy_stats = ProxyLinkStats(PROXY_STATS_FILE)
+        self.proxy_provider = ProxyProvider(self._get_proxy_links, self.log,
+                                            on_refresh=self.session_pool.invalidate,
+                                            stats=self.proxy_stats)
+        
+        # Build UI TRƯỚC
+        self.init_ui()
+        
+        # Setup hotkeys
+        self.setup_hotkeys()
+        
+        # Load settings SAU khi UI đã được tạo
+        self.log("Loading all settings...")
+        self.api_manager.load_from_file()
+        self.load_voices()
+        self.load_voice_settings()
+        self.load_proxy_links()
+        self._load_settings()
+        self.log("All settings loaded successfully")
+        
+        # Start log processing
+        self.log_timer = QTimer()
+        self.log_timer.timeout.connect(self.process_logs)
+        self.log_timer.start(100)
+
+    def init_ui(self):
+        self.setWindowTitle(f"{APP_NAME}")
+        self.setGeometry(100, 50, 1600, 1000)
+        
+        # Apply theme
+        self.apply_theme()
+        
+        # Central widget
+        central = QWidget()
+        self.setCentralWidget(central)
+        main_layout = QHBoxLayout(central)
+        main_layout.setContentsMargins(5, 5, 5, 5)
+        main_layout.setSpacing(5)
+        
+        # Left side (70%)
+        left_widget = QWidget()
+        left_layout = QVBoxLayout(left_widget)
+        left_layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.create_text_import_section(left_layout)
+        self.create_chunks_section(left_layout)
+        self.create_progress_section(left_layout)
+        
+        main_layout.addWidget(left_widget, 7)
+        
+        # Right side (30%)
+        right_widget = QWidget()
+        right_layout = QVBoxLayout(right_widget)
+        right_layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.create_settings_section(right_layout)
+        self.create_log_section(right_layout)
+        
+        main_layout.addWidget(right_widget, 3)
+
+    def apply_theme(self):
+        """Navy & Vibrant Orange theme - MODERN & PROFESSIONAL"""
+        stylesheet = """
+        QMainWindow, QWidget {
+            background-color: #f8f9fa;
+            color: #11224E;
+            font-family: 'Segoe UI', Arial, sans-serif;
+            font-size: 10pt;
+        }
         QGroupBox {
             background-color: white;
             border: 2px solid #d1d9e6;
@@ -916,17 +2503,17 @@ class ElevenLabsGUI(QMainWindow):
             selection-color: white;
             border: 1px solid #d1d9e6;
         }
-        QTableWidget, QTreeWidget {
+        QTableView, QTreeWidget {
             background-color: white;
             border: 2px solid #d1d9e6;
             gridline-color: #e8eef5;
             color: #11224E;
         }
-        QTableWidget::item:selected, QTreeWidget::item:selected {
+        QTableView::item:selected, QTreeWidget::item:selected {
             background-color: #FFE8D6;
             color: #11224E;
         }
-        QTableWidget::item:hover {
+        QTableView::item:hover {
             background-color: #FFF4E8;
         }
         QHeaderView::section {
@@ -1074,15 +2661,17 @@ class ElevenLabsGUI(QMainWindow):
         layout = QVBoxLayout()
         
         # Table - Remove "No" column, make Content wider
-        self.chunks_table = QTableWidget()
-        self.chunks_table.setColumnCount(3)  # Only: Chars, Status, Content
-        self.chunks_table.setHorizontalHeaderLabels(["Chars", "Status", "Content"])
+        # QTableView + model: refresh chỉ repaint các dòng đổi status
+        self.chunks_model = ChunkTableModel(self)
+        self.chunks_table = QTableView()
+        self.chunks_table.setModel(self.chunks_model)  # Only: Chars, Status, Content
         self.chunks_table.horizontalHeader().setStretchLastSection(True)
         self.chunks_table.setColumnWidth(0, 60)   # Chars
         self.chunks_table.setColumnWidth(1, 100)  # Status
         # Content takes remaining space (stretch)
-        self.chunks_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.chunks_table.setSelectionMode(QTableWidget.ExtendedSelection)
+        self.chunks_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.chunks_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.chunks_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         
         # Enable row numbers in vertical header
         self.chunks_table.verticalHeader().setVisible(True)  # Show row numbers
@@ -1149,6 +2738,13 @@ class ElevenLabsGUI(QMainWindow):
         self.btn_merge.clicked.connect(self.merge_audio_files)
         row2.addWidget(self.btn_merge)
         
+        self.btn_cancel_merge = QPushButton("⏹️ Cancel Merge")
+        self.btn_cancel_merge.setObjectName("secondaryButton")
+        self.btn_cancel_merge.setMinimumHeight(35)
+        self.btn_cancel_merge.setEnabled(False)
+        self.btn_cancel_merge.clicked.connect(self.cancel_merge)
+        row2.addWidget(self.btn_cancel_merge)
+        
         self.btn_output = QPushButton("📂 Output")
         self.btn_output.setObjectName("secondaryButton")
         self.btn_output.setMinimumHeight(35)
@@ -1261,6 +2857,17 @@ class ElevenLabsGUI(QMainWindow):
         total_row.addStretch()
         api_layout.addLayout(total_row)
         
+        # Key health - cập nhật live trong lúc generate
+        self.key_health_table = QTableWidget()
+        self.key_health_table.setColumnCount(6)
+        self.key_health_table.setHorizontalHeaderLabels(
+            ["Key", "Requests", "Failures", "Avg latency", "Cooldown", "Credits"])
+        self.key_health_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.key_health_table.verticalHeader().setVisible(False)
+        self.key_health_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.key_health_table.setMaximumHeight(160)
+        api_layout.addWidget(self.key_health_table)
+        
         api_group.setLayout(api_layout)
         layout.addWidget(api_group)
         
@@ -1326,6 +2933,13 @@ class ElevenLabsGUI(QMainWindow):
         btn_validate.clicked.connect(self.validate_proxy_links)
         proxy_btn_row.addWidget(btn_validate)
         
+        proxy_btn_row.addWidget(QLabel("Workers:"))
+        self.proxy_workers_spin = QSpinBox()
+        self.proxy_workers_spin.setRange(1, 64)
+        self.proxy_workers_spin.setValue(8)
+        self.proxy_workers_spin.setToolTip("Proxy links validated in parallel")
+        proxy_btn_row.addWidget(self.proxy_workers_spin)
+        
         proxy_layout.addLayout(proxy_btn_row)
         
         proxy_group.setLayout(proxy_layout)
@@ -1775,8 +3389,9 @@ class ElevenLabsGUI(QMainWindow):
         
         gen_layout.addWidget(QLabel("Concurrency:"), 2, 0)
         self.concurrency_spin = QSpinBox()
-        self.concurrency_spin.setRange(1, 20)
+        self.concurrency_spin.setRange(1, 100)
         self.concurrency_spin.setValue(4)
+        self.concurrency_spin.setToolTip("Maximum requests in flight (adaptive concurrency stays at or below it)")
         gen_layout.addWidget(self.concurrency_spin, 2, 1)
         
         gen_layout.addWidget(QLabel("Timeout (s):"), 3, 0)
@@ -1789,6 +3404,45 @@ class ElevenLabsGUI(QMainWindow):
         self.enable_multithread_check.setChecked(True)
         gen_layout.addWidget(self.enable_multithread_check, 4, 0, 1, 2)
         
+        # Async engine: 1 thread + asyncio thay vì N threads (cần httpx)
+        self.async_engine_check = QCheckBox("Async engine (httpx)")
+        if httpx is None:
+            self.async_engine_check.setEnabled(False)
+            self.async_engine_check.setToolTip("pip install httpx[http2] to enable")
+        else:
+            self.async_engine_check.setToolTip("Run all requests on one asyncio thread - for concurrency 50+")
+        gen_layout.addWidget(self.async_engine_check, 5, 0, 1, 2)
+        
+        # Streaming endpoint: nhận audio dần, phát hiện key/proxy treo sớm
+        self.stream_endpoint_check = QCheckBox("Streaming endpoint")
+        self.stream_endpoint_check.setToolTip("Use /stream - retry on another key if no audio arrives in time")
+        gen_layout.addWidget(self.stream_endpoint_check, 6, 0, 1, 2)
+        
+        gen_layout.addWidget(QLabel("First byte (s):"), 7, 0)
+        self.first_byte_spin = QSpinBox()
+        self.first_byte_spin.setRange(2, 120)
+        self.first_byte_spin.setValue(10)
+        gen_layout.addWidget(self.first_byte_spin, 7, 1)
+        
+        # TTS cache: câu lặp lại giữa các script (intro/outro) không tốn credit
+        self.tts_cache_check = QCheckBox("Reuse cached audio")
+        self.tts_cache_check.setChecked(True)
+        self.tts_cache_check.setToolTip("Same text + voice + model + settings → reuse the MP3 generated before")
+        gen_layout.addWidget(self.tts_cache_check, 8, 0, 1, 2)
+        
+        gen_layout.addWidget(QLabel("Cache size (MB):"), 9, 0)
+        self.tts_cache_spin = QSpinBox()
+        self.tts_cache_spin.setRange(100, 100000)
+        self.tts_cache_spin.setSingleStep(512)
+        self.tts_cache_spin.setValue(2048)
+        gen_layout.addWidget(self.tts_cache_spin, 9, 1)
+        
+        # AIMD: tự tăng/giảm số request đồng thời theo 429/timeout/latency
+        self.adaptive_concurrency_check = QCheckBox("Adaptive concurrency")
+        self.adaptive_concurrency_check.setChecked(True)
+        self.adaptive_concurrency_check.setToolTip("Ramp up while requests succeed, halve on 429/timeouts")
+        gen_layout.addWidget(self.adaptive_concurrency_check, 10, 0, 1, 2)
+        
         gen_group.setLayout(gen_layout)
         layout.addWidget(gen_group)
         
@@ -1806,6 +3460,21 @@ class ElevenLabsGUI(QMainWindow):
         self.keep_chunks_check = QCheckBox("Keep chunk files")
         merge_layout.addWidget(self.keep_chunks_check)
         
+        self.incremental_merge_check = QCheckBox("Merge while generating")
+        self.incremental_merge_check.setChecked(True)
+        self.incremental_merge_check.setToolTip("Append chunk N to the output as soon as chunks 1..N are done")
+        merge_layout.addWidget(self.incremental_merge_check)
+        
+        gap_row = QHBoxLayout()
+        gap_row.addWidget(QLabel("Silence gap (ms):"))
+        self.merge_gap_spin = QSpinBox()
+        self.merge_gap_spin.setRange(0, 5000)
+        self.merge_gap_spin.setSingleStep(50)
+        self.merge_gap_spin.setValue(0)
+        gap_row.addWidget(self.merge_gap_spin)
+        gap_row.addStretch()
+        merge_layout.addLayout(gap_row)
+        
         merge_group.setLayout(merge_layout)
         layout.addWidget(merge_group)
         
@@ -1965,16 +3634,13 @@ class ElevenLabsGUI(QMainWindow):
 
     def edit_selected_chunk(self):
         """Edit selected chunk content"""
-        selected = self.chunks_table.selectedItems()
-        if not selected:
+        if not self.chunks_table.selectionModel().hasSelection():
             return
         
-        row = self.chunks_table.currentRow()
-        if row < 0 or row >= len(self.chunks):
+        chunk = self.chunks_model.chunk_at(self.chunks_table.currentIndex().row())
+        if chunk is None:
             return
         
-        chunk = self.chunks[row]
-        
         dialog = QDialog(self)
         dialog.setWindowTitle(f"Edit Chunk {chunk['number']}")
         dialog.setMinimumSize(600, 400)
@@ -1994,6 +3660,7 @@ class ElevenLabsGUI(QMainWindow):
             new_content = text_edit.toPlainText()
             chunk['content'] = new_content
             chunk['chars'] = len(new_content)
+            self.status_counter.touch(chunk)
             
             # Save to file
             if chunk.get('file'):
@@ -2009,10 +3676,14 @@ class ElevenLabsGUI(QMainWindow):
         if not nums:
             return
         
+        self._invalidate_incremental_merge(nums)
         for n in nums:
             c = self.chunks_by_num.get(n)
             if c:
-                c['status'] = STATUS_QUEUE
+                self.status_counter.set(c, STATUS_QUEUE)
+                # Đang generate → đưa lại vào hàng đợi để worker nhận
+                if self.generation_active:
+                    self.dispatch_queue.requeue(n)
         
         self.update_chunks_display()
         self.log(f"🟦 Marked {len(nums)} chunk(s) as Queue")
@@ -2041,14 +3712,11 @@ class ElevenLabsGUI(QMainWindow):
 
     def get_selected_chunk_numbers(self):
         """Get list of selected chunk numbers"""
-        rows = set()
-        for item in self.chunks_table.selectedItems():
-            rows.add(item.row())
-        
         nums = []
-        for row in rows:
-            if 0 <= row < len(self.chunks):
-                nums.append(self.chunks[row]['number'])
+        for index in self.chunks_table.selectionModel().selectedRows():
+            chunk = self.chunks_model.chunk_at(index.row())
+            if chunk is not None:
+                nums.append(chunk['number'])
         
         return nums
 
@@ -2078,37 +3746,80 @@ class ElevenLabsGUI(QMainWindow):
             self.log("No valid API keys found")
             return
         
+        if self._credit_check_running:
+            self.log("⏳ Credit check already running")
+            return
+        self._credit_check_running = True
         self.log("💰 Checking credits...")
         threading.Thread(target=self._check_credits_thread, daemon=True).start()
 
+    def _fetch_key_credits(self, api_key):
+        """1 key → (remaining, error). Chạy trong thread pool, dùng session pool chung"""
+        try:
+            r = self.session_pool.get(None).get('https://api.elevenlabs.io/v1/user/subscription',
+                                                headers={'xi-api-key': api_key}, timeout=10)
+            if r.status_code != 200:
+                return None, f"Error {r.status_code}"
+            d = r.json()
+            return max(0, d.get('character_limit', 0) - d.get('character_count', 0)), None
+        except Exception as e:
+            return None, str(e)
+
     def _check_credits_thread(self):
-        """Check credits thread - GIỐNG HỆT TKINTER"""
+        """
+        Check credits song song (CREDIT_CHECK_WORKERS request cùng lúc), log từng key ngay khi xong.
+        Key đã check trong CREDIT_CHECK_TTL giây → dùng credit đã biết (đã trừ phần vừa generate)
+        """
         try:
             threshold = self.min_credit_spin.value()
             total_remaining_credits = 0
             valid_keys = []
             snapshot = self.api_manager.current_snapshot()
+            known = self.api_manager.credits_snapshot()
+            now = time.time()
             
+            results = {}
+            to_check = []
             for api_key in snapshot:
-                try:
-                    headers = {'xi-api-key': api_key}
-                    r = requests.get('https://api.elevenlabs.io/v1/user/subscription',
-                                   headers=headers, timeout=10)
-                    if r.status_code == 200:
-                        d = r.json()
-                        used = d.get('character_count', 0)
-                        limit = d.get('character_limit', 0)
-                        remaining = max(0, limit - used)
-                        total_remaining_credits += remaining
-                        if remaining >= threshold:
-                            valid_keys.append(api_key)
-                            self.log(f"✅ API ...{api_key[-4:]}: {remaining:,} credits")
-                        else:
-                            self.log(f"⚠️ API ...{api_key[-4:]}: {remaining:,} credits (Below threshold)")
-                    else:
-                        self.log(f"❌ API ...{api_key[-4:]}: Error {r.status_code}")
-                except Exception as e:
-                    self.log(f"❌ API ...{api_key[-4:]}: {str(e)}")
+                if api_key in known and now - self._credit_checked_at.get(api_key, 0) < CREDIT_CHECK_TTL:
+                    results[api_key] = (known[api_key], None)
+                else:
+                    to_check.append(api_key)
+            if results:
+                self.log(f"♻️ {len(results)} key(s) checked < {CREDIT_CHECK_TTL // 60} min ago - reusing")
+            
+            def report(api_key, remaining, error):
+                if error:
+                    self.log(f"❌ API ...{api_key[-4:]}: {error}")
+                elif remaining >= threshold:
+                    self.log(f"✅ API ...{api_key[-4:]}: {remaining:,} credits")
+                else:
+                    self.log(f"⚠️ API ...{api_key[-4:]}: {remaining:,} credits (Below threshold)")
+            
+            for api_key, (remaining, error) in results.items():
+                report(api_key, remaining, error)
+            
+            if to_check:
+                workers = min(CREDIT_CHECK_WORKERS, len(to_check))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    futures = {pool.submit(self._fetch_key_credits, k): k for k in to_check}
+                    for done, fut in enumerate(as_completed(futures), 1):
+                        api_key = futures[fut]
+                        remaining, error = fut.result()
+                        if error is None:
+                            self.api_manager.set_credits(api_key, remaining)
+                            self._credit_checked_at[api_key] = time.time()
+                        results[api_key] = (remaining, error)
+                        report(api_key, remaining, error)
+                        QTimer.singleShot(0, lambda d=done, n=len(to_check): self.api_status_label.setText(f"Checked {d}/{n}"))
+            
+            # Giữ thứ tự key như trong file
+            for api_key in snapshot:
+                remaining, error = results[api_key]
+                if error is None:
+                    total_remaining_credits += remaining
+                    if remaining >= threshold:
+                        valid_keys.append(api_key)
             
             # Save only valid keys
             with open(API_FILE, 'w', encoding='utf-8') as f:
@@ -2118,9 +3829,13 @@ class ElevenLabsGUI(QMainWindow):
             self.total_credits_label.setText(f"{total_remaining_credits:,} credits")
             self.log(f"💎 Total: {total_remaining_credits:,} credits")
             self.log(f"✅ Valid keys: {len(valid_keys)}")
+            QTimer.singleShot(0, self.update_key_health_table)
+            QTimer.singleShot(0, lambda n=len(valid_keys): self.api_status_label.setText(f"{n} valid keys"))
             
         except Exception as e:
             self.log(f"💥 Error: {str(e)}")
+        finally:
+            self._credit_check_running = False
 
     # ================================================================================
     # PROXY MANAGEMENT - GIỐNG HỆT TKINTER
@@ -2225,43 +3940,39 @@ class ElevenLabsGUI(QMainWindow):
                 self.log("⚠️ No proxy links to validate")
                 return
             
-            self.log(f"🔎 Validating {total} proxy link(s)...")
+            workers = min(self.proxy_workers_spin.value(), total)
+            self.log(f"🔎 Validating {total} proxy link(s) • {workers} parallel...")
             
             # Update initial UI
             QTimer.singleShot(0, lambda: self.update_proxy_validation_ui(0, total, 0, 0))
             
-            for i, link in enumerate(links, 1):
-                good = False
-                try:
-                    r = requests.get(link, timeout=8)
-                    if r.status_code == 200:
-                        try:
-                            data = r.json()
-                        except Exception:
-                            data = {}
-                        
-                        st = int(data.get("status", 0))
-                        # 100 = OK, 101 = Busy (still usable), 102 = Invalid key
-                        if st in (100, 101):
-                            good = True
-                            self.log(f"✅ Proxy {i}/{total}: OK (status {st})")
-                        else:
-                            good = False
-                            self.log(f"❌ Proxy {i}/{total}: Failed (status {st})")
+            index = {link: i for i, link in enumerate(links, 1)}
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(self._check_proxy_link, link): link for link in links}
+                for done, fut in enumerate(as_completed(futures), 1):
+                    link = futures[fut]
+                    i = index[link]
+                    good, busy, latency, msg = fut.result()
+                    # 101 (busy) vẫn dùng được nhưng không tính là thành công trong stats
+                    self.proxy_stats.record(link, None if busy else good, latency)
+                    
+                    if good:
+                        ok += 1
+                        st = self.proxy_stats.get(link)
+                        attempts = st['ok'] + st['fail']
+                        rate = f"{st['ok'] * 100 // attempts}% success" if attempts else "busy"
+                        self.log(f"✅ Proxy {i}/{total}: OK ({msg}) • {latency * 1000:.0f} ms • {rate}")
                     else:
-                        good = False
-                        self.log(f"❌ Proxy {i}/{total}: HTTP {r.status_code}")
-                except Exception as e:
-                    good = False
-                    self.log(f"❌ Proxy {i}/{total}: {str(e)}")
-                
-                if good:
-                    ok += 1
-                else:
-                    fail += 1
-                
-                # Update progress
-                QTimer.singleShot(0, lambda d=i, t=total, o=ok, f=fail: self.update_proxy_validation_ui(d, t, o, f))
+                        fail += 1
+                        self.log(f"❌ Proxy {i}/{total}: {msg}")
+                    
+                    # Update progress
+                    QTimer.singleShot(0, lambda d=done, t=total, o=ok, f=fail: self.update_proxy_validation_ui(d, t, o, f))
+            
+            try:
+                self.proxy_stats.save()
+            except OSError as e:
+                self.log(f"⚠️ Cannot save proxy stats: {e}")
             
             # Save final stats
             self.proxy_ok = ok
@@ -2275,6 +3986,26 @@ class ElevenLabsGUI(QMainWindow):
         except Exception as e:
             self.log(f"💥 Validation error: {str(e)}")
 
+    def _check_proxy_link(self, link):
+        """1 proxy link → (good, busy, latency_s, message). Chạy trong thread pool"""
+        started = time.monotonic()
+        try:
+            r = requests.get(link, timeout=8)
+            latency = time.monotonic() - started
+            if r.status_code != 200:
+                return False, False, latency, f"HTTP {r.status_code}"
+            try:
+                data = r.json()
+            except Exception:
+                data = {}
+            st = int(data.get("status", 0))
+            # 100 = OK, 101 = Busy (still usable), 102 = Invalid key
+            if st in (100, 101):
+                return True, st == 101, latency, f"status {st}"
+            return False, False, latency, f"Failed (status {st})"
+        except Exception as e:
+            return False, False, None, str(e)
+
     def update_proxy_validation_ui(self, done, total, ok, fail):
         """Update validation progress UI"""
         try:
@@ -2393,6 +4124,9 @@ class ElevenLabsGUI(QMainWindow):
             proxies = None
             if self.proxy_rotation_radio.isChecked():
                 proxies = self.proxy_provider.get_proxy()
+                if not proxies:
+                    self.log("Preview skipped: no proxy available")
+                    return
             
             # Create session
             session = self._get_session(proxies)
@@ -2632,6 +4366,7 @@ class ElevenLabsGUI(QMainWindow):
             self.chunks.append(chunk)
         
         self._index_chunks()
+        self._resume_from_manifest()
         self.update_chunks_display()
         self.log(f"✅ Created {len(text_chunks)} chunks in {base_txt_dir}")
 
@@ -2640,6 +4375,7 @@ class ElevenLabsGUI(QMainWindow):
         self.imported_text = ""
         self.chunks = []
         self.chunks_by_num = {}
+        self.status_counter.reset(self.chunks)
         self.update_chunks_display()
         self.log("🗑️ Cleared")
 
@@ -2653,28 +4389,8 @@ class ElevenLabsGUI(QMainWindow):
         self.create_chunks_from_text(self.imported_text)
 
     def split_text_into_chunks(self, text, max_size):
-        """Split text"""
-        if not text.strip():
-            return []
-        
-        chunks = []
-        sentences = re.split(r'([.!?]+[\s\n]+)', text)
-        sentences = [sentences[i] + (sentences[i+1] if i+1 < len(sentences) else '') 
-                    for i in range(0, len(sentences), 2)]
-        
-        current_chunk = ""
-        for sentence in sentences:
-            if len(current_chunk) + len(sentence) <= max_size:
-                current_chunk += sentence
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence
-        
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
-        return [c for c in chunks if c]
+        """Split text - sentence-aware, dùng chung với auto workflow (text_chunker)"""
+        return split_text(text, max_size)
 
     def load_project(self):
         """Load project"""
@@ -2736,6 +4452,16 @@ class ElevenLabsGUI(QMainWindow):
                 QMessageBox.warning(self, "Error", "No chunks to generate")
             return
         
+        # Đang chạy: chỉ cần re-queue, workers hiện tại sẽ nhận
+        if self.generation_active:
+            self._invalidate_incremental_merge([c['number'] for c in target_chunks])
+            for chunk in target_chunks:
+                self.status_counter.set(chunk, STATUS_QUEUE)
+                self.dispatch_queue.requeue(chunk['number'])
+            self.log(f"🔁 Re-queued {len(target_chunks)} chunk(s)")
+            self.update_chunks_display()
+            return
+        
         if self.api_manager.count() == 0:
             if not auto_mode:
                 QMessageBox.warning(self, "Error", "No API keys")
@@ -2783,9 +4509,24 @@ class ElevenLabsGUI(QMainWindow):
             if reply == QMessageBox.No:
                 return
         
+        self._gen_config = self._snapshot_generation_config()
+        self._ensure_manifest()
+        
+        # Chunk đã có trong TTS cache → lấy ngay, không gọi API
+        target_chunks = self._apply_tts_cache(target_chunks)
+        if not target_chunks:
+            self.update_chunks_display()
+            self.update_progress()
+            if self.auto_merge_check.isChecked() and self.status_counter.all_success():
+                self.log("🔗 Auto-merging...")
+                QTimer.singleShot(500, self.merge_audio_files)
+            return
+        
         # Set chunks to Queue
+        self.dispatch_queue.clear()
         for chunk in target_chunks:
-            chunk['status'] = STATUS_QUEUE
+            self.status_counter.set(chunk, STATUS_QUEUE)
+            self.dispatch_queue.put(chunk['number'])
         self.update_chunks_display()
         
         self.generation_active = True
@@ -2795,30 +4536,66 @@ class ElevenLabsGUI(QMainWindow):
         # Check và log proxy mode - GIỐNG TKINTER
         if self.proxy_rotation_radio.isChecked():
             self.log("🔄 Proxy rotation enabled")
-            self.proxy_provider.mark_need_refresh()
+            self.proxy_provider.reset()
         else:
             self.log("🔗 Using direct connection (no proxy)")
         
         self.log(f"🚀 Starting generation for {len(target_chunks)} chunks...")
         
+        credits = self.api_manager.credits_snapshot()
+        if credits:
+            needed = sum(len(c['content']) for c in target_chunks) * self._gen_config['num_generations']
+            self.log(f"💳 Credit-aware keys: {len(credits)} checked • {sum(credits.values()):,} credits for {needed:,} chars")
+        
         # Start auto-refresh timer for UI updates
         self.refresh_timer = QTimer()
         self.refresh_timer.timeout.connect(self.update_chunks_display)
         self.refresh_timer.timeout.connect(self.update_progress)
+        self.refresh_timer.timeout.connect(self.update_key_health_table)
         self.refresh_timer.timeout.connect(self.check_generation_complete)  # Check if done
         self.refresh_timer.start(500)  # Update every 500ms
         
         self.worker_threads = []
         num_workers = self.concurrency_spin.value()
         
+        self._prepare_incremental_merge()
+        keep = [self.incremental_merger.tmp_path] if self.incremental_merger else []
+        removed = remove_partial_files(self._gen_config['outdir'], keep=keep)
+        if removed:
+            self.log(f"🧹 Removed {removed} unfinished download(s)")
+        
+        adaptive = self.adaptive_concurrency_check.isChecked()
+        self.concurrency = ConcurrencyController(num_workers, adaptive=adaptive, logger=self.log)
+        if adaptive:
+            self.log(f"📶 Adaptive concurrency • start {self.concurrency.limit} • max {num_workers}")
+        
+        if self.async_engine_check.isChecked() and httpx is not None:
+            self.log(f"⚡ Async engine • {num_workers} concurrent • HTTP/2: {'on' if HTTP2_AVAILABLE else 'off'}")
+            self.tts_engine = AsyncTTSEngine(self._gen_config, self.dispatch_queue, self.chunks_by_num,
+                                             self.api_manager, self.proxy_provider, self.log,
+                                             controller=self.concurrency,
+                                             status_counter=self.status_counter,
+                                             on_finished=self._on_chunk_finished)
+            self.tts_engine.signals.chunk_updated.connect(self._on_engine_chunk_updated)
+            self.tts_engine.signals.finished.connect(self.check_generation_complete)
+            self.tts_engine.start()
+            return
+        
+        self.session_pool.configure(num_workers)
+        self._run_id += 1
         for i in range(num_workers):
-            thread = threading.Thread(target=self.generation_worker, args=(i+1,), daemon=True)
+            thread = threading.Thread(target=self.generation_worker, daemon=True,
+                                      args=(i+1, self._run_id, self._gen_config, self.concurrency))
             thread.start()
             self.worker_threads.append(thread)
 
     def stop_generation(self):
         """Stop generation"""
         self.generation_active = False
+        self.dispatch_queue.clear()
+        if self.tts_engine:
+            self.tts_engine.stop()
+            self.tts_engine = None
         self.btn_generate.setEnabled(True)
         self.btn_stop.setEnabled(False)
         
@@ -2829,91 +4606,135 @@ class ElevenLabsGUI(QMainWindow):
         # Final update
         self.update_chunks_display()
         self.update_progress()
+        self.update_key_health_table()
+        
+        # Lưu latency/success của proxy link đo được trong lúc generate
+        if self.proxy_rotation_radio.isChecked():
+            try:
+                self.proxy_stats.save()
+            except OSError:
+                pass
         
         self.log("⏹️ Stopped")
-
-    def generation_worker(self, worker_id):
-        """Worker thread - GIỐNG TKINTER"""
-        # Get model ID
-        model_name = self.model_combo.currentText()
-        model_id = {v: k for k, v in MODEL_IDS.items()}.get(model_name, "eleven_turbo_v2_5")
-        
-        while self.generation_active:
-            chunk = None
-            for c in self.chunks:
-                if c['status'] == STATUS_QUEUE:
-                    c['status'] = STATUS_PENDING
-                    chunk = c
-                    break
+
+    def generation_worker(self, worker_id, run_id, cfg, controller):
+        """
+        Worker thread - GIỐNG TKINTER
+        run_id/cfg/controller thuộc lượt chạy đã tạo thread: Stop rồi Start lại nhanh thì thread cũ
+        (còn đang request/backoff) tự thoát, không lấy chunk của lượt mới với voice/model cũ
+        """
+        model_id = cfg['model_id']
+        is_v3 = cfg['is_v3']
+        num_generations = cfg['num_generations']
+        
+        def stale():
+            return self._run_id != run_id
+        
+        def active():
+            return self.generation_active and not stale()
+        
+        while active():
+            # AIMD: chỉ chạy khi controller còn slot
+            if not controller.acquire(timeout=0.5):
+                continue
+            if not active():
+                controller.release()
+                break
             
-            if not chunk:
+            # O(1) dispatch - mỗi chunk chỉ giao cho đúng 1 worker
+            num = self.dispatch_queue.get()
+            if num is not None and stale():
+                # Lượt mới bắt đầu giữa lúc kiểm tra và get() → trả chunk lại cho worker của lượt mới
+                self.dispatch_queue.done(num)
+                self.dispatch_queue.requeue(num, front=True)
+                controller.release()
                 break
+            if num is None:
+                controller.release()
+                if self.dispatch_queue.in_flight() == 0:
+                    break
+                # Còn chunk đang chạy - có thể sẽ có chunk được re-queue
+                time.sleep(0.2)
+                continue
+            
+            chunk = self.chunks_by_num.get(num)
+            if not chunk or chunk['status'] != STATUS_QUEUE:
+                self.dispatch_queue.done(num)
+                controller.release()
+                continue
+            self.status_counter.set(chunk, STATUS_PENDING)
+            chunk['bytes'] = 0
             
             QTimer.singleShot(0, self.update_chunks_display)
             
-            # Retry logic - TỐI ƯU HÓA
-            max_retries = self.max_retries_spin.value()
+            # Retry logic - phân loại lỗi: fatal dừng ngay, key/proxy đổi rồi retry ngay, tạm thời thì backoff
+            max_retries = cfg['max_retries']
             retry_count = 0
+            retry_wait = 0
             success = False
+            cost = len(chunk['content']) * num_generations
             
-            while retry_count < max_retries and not success:
+            while retry_count < max_retries and not success and active():
                 if retry_count > 0:
                     self.log(f"🔄 Retry {retry_count}/{max_retries} for chunk {chunk['number']}")
-                    time.sleep(1)  # Wait 1s between retries
+                    if retry_wait > 0:
+                        time.sleep(retry_wait)
                 
+                api_key = None
+                status = None
+                detail = ''
+                retry_after = None
+                kind = RETRY_TRANSIENT
+                timed_out = False
+                t0 = time.monotonic()
                 try:
-                    api_key = self.api_manager.get_next()
+                    # Proxy trước key (thiếu proxy thì không giữ chỗ key) - proxy mode không bao giờ đi direct
+                    proxies = None
+                    if cfg['use_proxy']:
+                        proxies = self.proxy_provider.get_proxy()
+                        if not proxies:
+                            kind = RETRY_PROXY
+                            detail = "no proxy available"
+                            continue
+                        self.log(f"🌐 Using proxy for chunk {chunk['number']}")
+                    
+                    api_key = self.api_manager.get_next(cost)
+                    while not api_key and active():
+                        # Tất cả key đang cooldown → chờ, không tính là 1 lần retry
+                        wait = self.api_manager.next_available_in()
+                        if wait <= 0:
+                            break
+                        time.sleep(min(wait, 5))
+                        api_key = self.api_manager.get_next(cost)
                     if not api_key:
-                        chunk['status'] = STATUS_FAIL
+                        kind = RETRY_FATAL
+                        detail = f"no API key with {cost:,} credits left"
                         continue
                     
-                    voice_id = self.voice_combo.currentData()
+                    voice_id = cfg['voice_id']
                     
                     # Debug: Log voice info
                     if chunk['number'] == 1:
-                        voice_name = self.voice_combo.currentText()
-                        self.log(f"🎙️ Voice: {voice_name} ({voice_id})")
+                        self.log(f"🎙️ Voice: {cfg['voice_name']} ({voice_id})")
                     
-                    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+                    streaming = cfg['stream_endpoint']
+                    url = tts_url(voice_id, streaming)
                     headers = {
                         "xi-api-key": api_key,
                         "Content-Type": "application/json"
                     }
                     
-                    # V3 check - MUST BE BEFORE PAYLOAD!
-                    is_v3 = model_id == "eleven_v3"  # FIXED: eleven_v3 not eleven_v3_alpha
-                    
-                    # V3 CRITICAL: Only stability is supported!
-                    if is_v3:
-                        payload = {
-                            "text": chunk['content'],
-                            "model_id": model_id,
-                            "voice_settings": {
-                                "stability": self.stability_combo.currentData()
-                                # V3 does NOT support: similarity_boost, style, use_speaker_boost
-                            }
-                        }
-                    else:
-                        # Other models: full settings
-                        payload = {
-                            "text": chunk['content'],
-                            "model_id": model_id,
-                            "voice_settings": {
-                                "stability": self.stability_combo.currentData(),
-                                "similarity_boost": self.similarity_spin.value(),
-                                "style": self.style_spin.value(),
-                                "use_speaker_boost": self.speaker_boost_check.isChecked()
-                            }
-                        }
-                    
-                    timeout = self.timeout_spin.value()
+                    # V3 CRITICAL: Only stability is supported (xem _snapshot_generation_config)
+                    payload = {
+                        "text": chunk['content'],
+                        "model_id": model_id,
+                        "voice_settings": cfg['voice_settings']
+                    }
                     
-                    # Get proxy if rotation mode - GIỐNG TKINTER
-                    proxies = None
-                    if self.proxy_rotation_radio.isChecked():
-                        proxies = self.proxy_provider.get_proxy()
-                        if proxies:
-                            self.log(f"🌐 Using proxy for chunk {chunk['number']}")
+                    timeout = cfg['timeout']
+                    if streaming:
+                        # (connect, read): read timeout = chờ byte đầu tiên / giữa 2 block
+                        timeout = (cfg['first_byte_timeout'], cfg['first_byte_timeout'])
                     
                     # Create session with proxy - GIỐNG TKINTER
                     session = self._get_session(proxies)
@@ -2922,32 +4743,30 @@ class ElevenLabsGUI(QMainWindow):
                     
                     # Debug: Log payload for first chunk
                     if chunk['number'] == 1:
-                        self.log(f"🔍 DEBUG Payload: model={model_id}, stability={self.stability_combo.currentData()}, is_v3={is_v3}")
-                        if not is_v3:
-                            self.log(f"🔍 DEBUG: similarity={self.similarity_spin.value()}, style={self.style_spin.value()}, boost={self.speaker_boost_check.isChecked()}")
-                    
-                    # V3 Multiple Generations Support
-                    if is_v3 and hasattr(self, 'v3_generations_spin'):
-                        num_generations = self.v3_generations_spin.value()
-                    else:
-                        num_generations = 1
+                        self.log(f"🔍 DEBUG Payload: model={model_id}, voice_settings={cfg['voice_settings']}, is_v3={is_v3}")
                     
                     if is_v3 and num_generations > 1:
                         self.log(f"🎭 V3: Generating {num_generations} versions for chunk {chunk['number']}")
                     
                     # Generate multiple versions for V3
                     best_audio = None
-                    outdir = self._get_audio_output_dir()
+                    outdir = cfg['outdir']
                     os.makedirs(outdir, exist_ok=True)
                     
+                    # Latency chỉ tính từ lúc gửi (không gồm thời gian chờ key/proxy) → AIMD + key health
+                    t0 = time.monotonic()
                     for gen_num in range(num_generations):
-                        resp = session.post(url, json=payload, headers=headers, timeout=timeout)
+                        # stream=True: ghi thẳng xuống đĩa, không giữ resp.content trong RAM
+                        resp = session.post(url, json=payload, headers=headers, timeout=timeout, stream=True)
                         
                         if gen_num == 0:
+                            status = resp.status_code
                             self.log(f"📊 Chunk {chunk['number']} • HTTP {resp.status_code}")
                             
                             # Log detailed error for non-200 responses
                             if resp.status_code != 200:
+                                detail = resp.text[:500]
+                                retry_after = resp.headers.get('Retry-After')
                                 try:
                                     error_data = resp.json()
                                     error_msg = error_data.get('detail', {}).get('message', str(error_data))
@@ -2956,32 +4775,40 @@ class ElevenLabsGUI(QMainWindow):
                                     self.log(f"⚠️ Response: {resp.text[:200]}")
                         
                         if resp.status_code == 200:
-                            if num_generations > 1:
-                                # Save multiple versions
-                                audio_file = os.path.join(outdir, f"chunk_{chunk['number']:03d}_v{gen_num+1}.mp3")
-                                with open(audio_file, 'wb') as f:
-                                    f.write(resp.content)
-                                
-                                if gen_num == 0:
-                                    best_audio = audio_file
-                                
-                                if is_v3:
-                                    self.log(f"  ✅ Version {gen_num+1}/{num_generations}")
-                            else:
-                                # Single generation
-                                audio_file = os.path.join(outdir, f"chunk_{chunk['number']:03d}.mp3")
-                                with open(audio_file, 'wb') as f:
-                                    f.write(resp.content)
+                            audio_file = chunk_audio_path(outdir, chunk['number'], gen_num, num_generations)
+                            started = time.monotonic()
+                            
+                            def on_progress(total, chunk=chunk, started=started, streaming=streaming):
+                                if stale():
+                                    raise IOError("superseded by a new generation run")
+                                chunk['bytes'] = total
+                                self.status_counter.touch(chunk)
+                                if streaming and time.monotonic() - started > cfg['timeout']:
+                                    raise requests.exceptions.ReadTimeout(f"exceeded {cfg['timeout']}s")
+                            
+                            try:
+                                write_stream_atomic(audio_file, resp.iter_content(STREAM_BLOCK_SIZE), on_progress)
+                            finally:
+                                resp.close()
+                            
+                            if gen_num == 0:
                                 best_audio = audio_file
+                            
+                            if num_generations > 1:
+                                self.log(f"  ✅ Version {gen_num+1}/{num_generations}")
                         else:
-                            if gen_num == 0:
-                                chunk['status'] = STATUS_FAIL
-                                self.log(f"❌ Chunk {chunk['number']}: {resp.status_code}")
+                            resp.close()
+                            if not skip_failed_version(gen_num):
                                 break
+                            self.log(f"  ⚠️ Chunk {chunk['number']} • Version {gen_num+1}/{num_generations}: HTTP {resp.status_code} - skipped")
                     
-                    if resp.status_code == 200 and best_audio:
+                    if stale():
+                        # Lượt mới đã bắt đầu → bỏ kết quả, không ghi đè status lượt mới đã đặt
+                        break
+                    
+                    if status == 200 and best_audio:
                         chunk['audio_file'] = best_audio
-                        chunk['status'] = STATUS_SUCCESS
+                        self.status_counter.set(chunk, STATUS_SUCCESS)
                         success = True  # Mark success to exit retry loop
                         
                         if is_v3 and num_generations > 1:
@@ -2989,77 +4816,99 @@ class ElevenLabsGUI(QMainWindow):
                         else:
                             self.log(f"✅ Chunk {chunk['number']}")
                         
+                        self._notify_incremental_merge()
+                        
                         # Update UI immediately after success
                         QTimer.singleShot(0, self.update_chunks_display)
                         QTimer.singleShot(0, self.update_progress)
                     else:
-                        # Failed this attempt, will retry if retries left
-                        chunk['status'] = STATUS_FAIL
+                        kind = classify_tts_failure(status, detail)
+                        
+                except requests.exceptions.ProxyError as e:
+                    kind = RETRY_PROXY
+                    detail = str(e)
+                    self.log(f"🌐 Proxy error chunk {chunk['number']}: {e}")
+                except requests.exceptions.Timeout:
+                    timed_out = True
+                    if cfg['stream_endpoint'] and not chunk.get('bytes'):
+                        kind = RETRY_KEY
+                        self.log(f"⏰ Chunk {chunk['number']}: no audio within {cfg['first_byte_timeout']}s → switching key")
+                    else:
+                        self.log(f"⏰ Timeout chunk {chunk['number']}")
+                except requests.exceptions.ConnectionError as e:
+                    kind = RETRY_PROXY if cfg['use_proxy'] else RETRY_TRANSIENT
+                    self.log(f"🔌 Connection error chunk {chunk['number']}: {e}")
+                except Exception as e:
+                    self.log(f"❌ Chunk {chunk['number']}: {e}")
+                finally:
+                    elapsed = time.monotonic() - t0
+                    self.api_manager.settle(api_key, cost, success, status, elapsed, detail)
+                    if api_key:
+                        controller.record(success, elapsed / max(1, cost),
+                                          congested=status == 429 or timed_out)
+                    
+                    if not success and not stale():
+                        self.status_counter.set(chunk, STATUS_FAIL)
                         retry_count += 1
+                        if kind == RETRY_FATAL:
+                            # 400/404/422...: retry cũng fail y hệt → dừng luôn
+                            reason = f"HTTP {status}" if status else detail
+                            self.log(f"⛔ Chunk {chunk['number']}: {reason} - not retrying")
+                            retry_count = max_retries
+                        elif kind == RETRY_PROXY and cfg['use_proxy']:
+                            self.proxy_provider.mark_need_refresh()
+                        # Đổi key/proxy → retry ngay; lỗi tạm thời → backoff (tôn trọng Retry-After)
+                        retry_wait = retry_delay(retry_count - 1, retry_after) if kind == RETRY_TRANSIENT else 0
                         
                         if retry_count < max_retries:
-                            # Will retry
-                            chunk['status'] = STATUS_PENDING  # Reset to pending for retry
+                            self.status_counter.set(chunk, STATUS_PENDING)  # Reset to pending for retry
                         else:
-                            # No more retries
-                            self.log(f"❌ Chunk {chunk['number']}: {resp.status_code} (after {max_retries} attempts)")
+                            self.log(f"❌ Chunk {chunk['number']}: {status or kind} (after {retry_count} attempts)")
                             # Update UI immediately after final fail
                             QTimer.singleShot(0, self.update_chunks_display)
                             QTimer.singleShot(0, self.update_progress)
-                        
-                        # Handle proxy errors - GIỐNG TKINTER
-                        if self.proxy_rotation_radio.isChecked():
-                            self.proxy_provider.mark_need_refresh()
-                        
-                except requests.exceptions.ProxyError as e:
-                    chunk['status'] = STATUS_FAIL
-                    retry_count += 1
-                    self.log(f"🌐 Proxy error chunk {chunk['number']}: {e}")
-                    if retry_count >= max_retries:
-                        QTimer.singleShot(0, self.update_chunks_display)
-                        QTimer.singleShot(0, self.update_progress)
-                    if self.proxy_rotation_radio.isChecked():
-                        self.proxy_provider.mark_need_refresh()
-                except requests.exceptions.Timeout:
-                    chunk['status'] = STATUS_FAIL
-                    retry_count += 1
-                    self.log(f"⏰ Timeout chunk {chunk['number']}")
-                    if retry_count >= max_retries:
-                        QTimer.singleShot(0, self.update_chunks_display)
-                        QTimer.singleShot(0, self.update_progress)
-                except Exception as e:
-                    chunk['status'] = STATUS_FAIL
-                    retry_count += 1
-                    self.log(f"❌ Chunk {chunk['number']}: {e}")
-                    if retry_count >= max_retries:
-                        QTimer.singleShot(0, self.update_chunks_display)
-                        QTimer.singleShot(0, self.update_progress)
+            
+            if stale():
+                # Chunk này giờ thuộc lượt mới (status/queue đã reset) → không đụng tới
+                controller.release()
+                break
+            
+            if not success and chunk['status'] == STATUS_PENDING:
+                self.status_counter.set(chunk, STATUS_FAIL)  # dừng giữa chừng
+            
+            self._on_chunk_finished(chunk, cfg)
+            if self.dispatch_queue.done(chunk['number']):
+                # User re-queue trong lúc đang chạy → generate lại
+                self.status_counter.set(chunk, STATUS_QUEUE)
+            controller.release()
             
             # Final update at end of chunk processing
             QTimer.singleShot(0, self.update_chunks_display)
             QTimer.singleShot(0, self.update_progress)
             
-            delay = self.delay_spin.value() / 1000.0
+            delay = cfg['delay']
             if delay > 0:
                 time.sleep(delay)
         
         # Worker finished - check if all done
         QTimer.singleShot(100, self.check_generation_complete)
 
+    def _on_engine_chunk_updated(self, num):
+        """Async engine → UI (queued signal, chạy trên main thread) - manifest/cache đã xong ở engine"""
+        self._notify_incremental_merge()
+        self.update_progress()
+
     def check_generation_complete(self):
         """Check if generation is complete and auto-stop"""
         if not self.generation_active:
             return
         
-        # Check if any chunks still in queue OR pending
-        has_queue = any(c['status'] == STATUS_QUEUE for c in self.chunks)
-        has_pending = any(c['status'] == STATUS_PENDING for c in self.chunks)
-        
-        # Count statuses for debugging
-        queue_count = sum(1 for c in self.chunks if c['status'] == STATUS_QUEUE)
-        pending_count = sum(1 for c in self.chunks if c['status'] == STATUS_PENDING)
+        # Check if any chunks still in queue OR pending (O(1) - status_counter)
+        counts = self.status_counter.snapshot()
+        queue_count = counts[STATUS_QUEUE]
+        pending_count = counts[STATUS_PENDING]
         
-        if not has_queue and not has_pending:
+        if not queue_count and not pending_count:
             # All workers done, stop generation
             if self.generation_active:  # Double-check to avoid race condition
                 self.log(f"🎯 All chunks processed (Queue: {queue_count}, Pending: {pending_count})")
@@ -3067,8 +4916,9 @@ class ElevenLabsGUI(QMainWindow):
                 self.log("✅ Generation complete!")
                 
                 # Show completion stats
-                success = sum(1 for c in self.chunks if c['status'] == STATUS_SUCCESS)
-                failed = sum(1 for c in self.chunks if c['status'] == STATUS_FAIL)
+                counts = self.status_counter.snapshot()
+                success = counts[STATUS_SUCCESS]
+                failed = counts[STATUS_FAIL]
                 self.log(f"📊 Success: {success} | Failed: {failed}")
                 
                 # Auto-merge if enabled and has successful chunks
@@ -3078,33 +4928,54 @@ class ElevenLabsGUI(QMainWindow):
 
 
     def _get_session(self, proxies):
-        """Create requests session with proxy - GIỐNG TKINTER"""
-        try:
-            concurrency = self.concurrency_spin.value()
-            pool_size = max(32, concurrency * 4)
-        except Exception:
-            pool_size = 64
-        
-        sess = requests.Session()
-        adapter = HTTPAdapter(
-            pool_connections=pool_size, 
-            pool_maxsize=pool_size,
-            max_retries=Retry(total=0, connect=2, read=2, backoff_factor=0)
-        )
-        sess.mount('https://', adapter)
-        sess.mount('http://', adapter)
-        sess.headers.update({'Connection': 'keep-alive'})
-        
-        # Set proxy - GIỐNG TKINTER
-        sess.proxies = proxies or {}
-        
-        return sess
+        """Pooled keep-alive session for this proxy (or direct) - reused across workers"""
+        return self.session_pool.get(proxies)
 
     def _get_model_id(self):
         """Get model ID from combo"""
         model_name = self.model_combo.currentText()
         return {v: k for k, v in MODEL_IDS.items()}.get(model_name, "eleven_turbo_v2_5")
 
+    def _snapshot_generation_config(self):
+        """Đọc settings từ UI 1 lần trên main thread - workers/engine không chạm widget"""
+        model_id = self._get_model_id()
+        is_v3 = model_id == V3_MODEL_ID
+        
+        # V3 CRITICAL: Only stability is supported!
+        if is_v3:
+            voice_settings = {"stability": self.stability_combo.currentData()}
+        else:
+            voice_settings = {
+                "stability": self.stability_combo.currentData(),
+                "similarity_boost": self.similarity_spin.value(),
+                "style": self.style_spin.value(),
+                "use_speaker_boost": self.speaker_boost_check.isChecked()
+            }
+        
+        if is_v3 and hasattr(self, 'v3_generations_spin'):
+            num_generations = self.v3_generations_spin.value()
+        else:
+            num_generations = 1
+        
+        return {
+            'voice_id': self.voice_combo.currentData(),
+            'voice_name': self.voice_combo.currentText(),
+            'model_id': model_id,
+            'is_v3': is_v3,
+            'voice_settings': voice_settings,
+            'num_generations': num_generations,
+            'timeout': self.timeout_spin.value(),
+            'stream_endpoint': self.stream_endpoint_check.isChecked(),
+            'first_byte_timeout': self.first_byte_spin.value(),
+            'max_retries': self.max_retries_spin.value(),
+            'delay': self.delay_spin.value() / 1000.0,
+            'use_proxy': self.proxy_rotation_radio.isChecked(),
+            'concurrency': self.concurrency_spin.value(),
+            'outdir': self._get_audio_output_dir(),
+            # V3 nhiều version: mỗi lần generate phải ra bản mới → không dùng cache
+            'tts_cache': self.tts_cache_check.isChecked() and num_generations == 1,
+        }
+
     def _get_audio_output_dir(self):
         """Get audio output directory - GIỐNG TKINTER"""
         # Ưu tiên project folder nếu có
@@ -3115,41 +4986,205 @@ class ElevenLabsGUI(QMainWindow):
     def _index_chunks(self):
         """Index chunks"""
         self.chunks_by_num = {c['number']: c for c in self.chunks}
+        self.status_counter.reset(self.chunks)
+        self._run_merge_path = None
+        # Bộ chunk mới → phần đã merge dần không còn đúng
+        self._reset_incremental_merge()
 
-    def update_chunks_display(self):
-        """Update table and stats"""
-        self.chunks_table.setRowCount(len(self.chunks))
-        
-        # Calculate stats
-        total_chunks = len(self.chunks)
-        total_chars = sum(chunk.get('chars', len(chunk.get('content', ''))) for chunk in self.chunks)
+    # ================================================================================
+    # RESUME MANIFEST
+    # ================================================================================
+
+    def _manifest_path(self):
+        """Manifest nằm cạnh folder chunks_audio (tức là trong {project}_tts)"""
+        if not self.project_chunks_audio_dir:
+            return None
+        return os.path.join(os.path.dirname(os.path.abspath(self.project_chunks_audio_dir)),
+                            TTSManifest.FILENAME)
+
+    def _ensure_manifest(self):
+        path = self._manifest_path()
+        if path is None:
+            self.manifest = None
+        elif self.manifest is None or self.manifest.path != path:
+            try:
+                self.manifest = TTSManifest(path)
+            except OSError as e:
+                self.log(f"⚠️ Cannot open manifest: {e}")
+                self.manifest = None
+        return self.manifest
+
+    def _resume_from_manifest(self):
+        """Khôi phục các chunk đã generate xong ở lần chạy trước → trả về số chunk khôi phục"""
+        manifest = self._ensure_manifest()
+        if manifest is None or not manifest.records:
+            return 0
+        restored = [c['number'] for c in self.chunks
+                    if c['status'] != STATUS_SUCCESS and manifest.restore(c)]
+        if restored:
+            self.status_counter.reset(self.chunks)
+            self.log(f"♻️ Resumed {len(restored)} finished chunk(s) from manifest: {format_chunk_ranges(restored)}")
+            self.update_chunks_display()
+        return len(restored)
+
+    def _record_chunk(self, chunk):
+        manifest = self.manifest
+        if manifest is None:
+            return
+        try:
+            manifest.record(chunk)
+        except OSError as e:
+            self.log(f"⚠️ Manifest write failed: {e}")
+
+    def _on_chunk_finished(self, chunk, cfg=None):
+        """
+        Trạng thái cuối của 1 chunk: ghi manifest + đưa audio vào TTS cache
+        Chạy trong worker thread / executor của engine (SHA-1 + copy file không chặn UI)
+        cfg = config của lượt đã generate chunk (cache key theo đúng voice/model đã dùng)
+        """
+        self._record_chunk(chunk)
+        cfg = cfg or self._gen_config
+        cache = self.tts_cache
+        if (cache is None or not cfg or not cfg['tts_cache']
+                or chunk['status'] != STATUS_SUCCESS or not chunk.get('audio_file')):
+            return
+        try:
+            key = cache.key(chunk['content'], cfg['voice_id'], cfg['model_id'], cfg['voice_settings'])
+            cache.store(key, chunk['audio_file'])
+        except OSError as e:
+            self.log(f"⚠️ TTS cache write failed: {e}")
+
+    # ================================================================================
+    # TTS CACHE
+    # ================================================================================
+
+    def _get_tts_cache(self):
+        max_bytes = self.tts_cache_spin.value() * 1024 * 1024
+        if self.tts_cache is None:
+            self.tts_cache = TTSCache(TTS_CACHE_DIR, max_bytes)
+        self.tts_cache.max_bytes = max_bytes
+        return self.tts_cache
+
+    def _apply_tts_cache(self, target_chunks):
+        """Lấy audio từ cache cho các chunk trùng nội dung → trả về các chunk còn phải generate"""
+        cfg = self._gen_config
+        if not cfg['tts_cache']:
+            return target_chunks
+        try:
+            cache = self._get_tts_cache()
+            os.makedirs(cfg['outdir'], exist_ok=True)
+        except OSError as e:
+            self.log(f"⚠️ TTS cache unavailable: {e}")
+            return target_chunks
+        
+        remaining = []
+        hits = []
+        for chunk in target_chunks:
+            key = cache.key(chunk['content'], cfg['voice_id'], cfg['model_id'], cfg['voice_settings'])
+            audio_file = chunk_audio_path(cfg['outdir'], chunk['number'])
+            if cache.fetch(key, audio_file):
+                self.status_counter.set(chunk, STATUS_SUCCESS)
+                chunk['audio_file'] = audio_file
+                chunk['bytes'] = os.path.getsize(audio_file)
+                self._record_chunk(chunk)
+                hits.append(chunk['number'])
+            else:
+                remaining.append(chunk)
         
-        # Update stats label
-        self.chunks_stats_label.setText(f"Total: {total_chunks} chunks | {total_chars:,} chars")
+        rate = len(hits) * 100 // len(target_chunks)
+        self.log(f"💾 TTS cache: {len(hits)}/{len(target_chunks)} chunk(s) reused ({rate}% hit rate)")
+        if hits:
+            self.log(f"   ♻️ From cache: {format_chunk_ranges(hits)}")
+        return remaining
+
+    # ================================================================================
+    # INCREMENTAL MERGE
+    # ================================================================================
+
+    def _incremental_ready_path(self, num):
+        chunk = self.chunks_by_num.get(num)
+        if chunk and chunk['status'] == STATUS_SUCCESS and chunk.get('audio_file'):
+            return chunk['audio_file']
+        return None
+
+    def _prepare_incremental_merge(self):
+        """Tạo (hoặc giữ lại) IncrementalMerger cho output của project hiện tại"""
+        if not self.incremental_merge_check.isChecked() or len(self.chunks) < 2:
+            self._reset_incremental_merge()
+            return
+        # Resolve 1 lần cho cả lượt chạy (fallback có timestamp) - merge cuối dùng lại đúng path này
+        if self._run_merge_path is None:
+            self._run_merge_path = self._resolve_merge_output_path(quiet=True)
+        merged_file = self._run_merge_path
+        gap_ms = self.merge_gap_spin.value()
+        current = self.incremental_merger
+        if current is not None and current.is_valid_for(merged_file, len(self.chunks), gap_ms):
+            current.notify()
+            return
+        self._reset_incremental_merge()
+        self.incremental_merger = IncrementalMerger(merged_file, len(self.chunks), gap_ms,
+                                                    self._incremental_ready_path, self.log)
+        self.incremental_merger.notify()
+        self.log(f"⚡ Incremental merge enabled → {os.path.basename(merged_file)}")
+
+    def _notify_incremental_merge(self):
+        merger = self.incremental_merger
+        if merger is not None:
+            merger.notify()
+
+    def _invalidate_incremental_merge(self, nums):
+        """Chunk đã merge bị generate lại → bỏ phần merge dần, merge cuối sẽ làm lại từ đầu"""
+        merger = self.incremental_merger
+        if merger is not None and nums and min(nums) <= merger.watermark():
+            self.log("⚠️ Already-merged chunk regenerated - incremental merge restarted")
+            self._reset_incremental_merge()
+            if self.generation_active:
+                self._prepare_incremental_merge()
+
+    def _reset_incremental_merge(self):
+        merger = getattr(self, 'incremental_merger', None)
+        if merger is not None:
+            merger.abort()
+        self.incremental_merger = None
+
+    def update_chunks_display(self):
+        """Update table and stats - chỉ các dòng thay đổi được repaint"""
+        self.chunks_model.refresh(self.chunks, self.status_counter.take_dirty())
         
-        for i, chunk in enumerate(self.chunks):
-            # Column 0: Chars
-            chars = chunk.get('chars', len(chunk.get('content', '')))
-            self.chunks_table.setItem(i, 0, QTableWidgetItem(str(chars)))
-            
-            # Column 1: Status
-            status_text = status_human_text(chunk['status'])
-            status_item = QTableWidgetItem(status_text)
-            
-            if chunk['status'] == STATUS_SUCCESS:
-                status_item.setForeground(QColor("#10b981"))  # Green
-            elif chunk['status'] == STATUS_FAIL:
-                status_item.setForeground(QColor("#ef4444"))  # Red
-            elif chunk['status'] == STATUS_PENDING:
-                status_item.setForeground(QColor("#f59e0b"))  # Yellow
-            elif chunk['status'] == STATUS_QUEUE:
-                status_item.setForeground(QColor("#3b82f6"))  # Blue
-            
-            self.chunks_table.setItem(i, 1, status_item)
-            
-            # Column 2: Content (longer preview - 100 chars)
-            preview = chunk['content'][:150] + "..." if len(chunk['content']) > 100 else chunk['content']
-            self.chunks_table.setItem(i, 2, QTableWidgetItem(preview))
+        # Stats từ cache của model (không duyệt lại toàn bộ chunks)
+        self.chunks_stats_label.setText(
+            f"Total: {len(self.chunks)} chunks | {self.chunks_model.total_chars:,} chars"
+        )
+
+    def update_key_health_table(self):
+        """
+        Bảng Key health: requests, failures, latency TB, cooldown còn lại, credit
+        Giữ nguyên các item, chỉ setText cho ô có giá trị đổi (timer gọi mỗi 500ms)
+        """
+        rows = self.api_manager.health_snapshot()
+        table = self.key_health_table
+        if table.rowCount() != len(rows):
+            table.setRowCount(len(rows))
+        for r, (key, requests_n, failures, avg, cooldown, credits) in enumerate(rows):
+            values = [
+                f"...{key[-4:]}",
+                str(requests_n),
+                str(failures),
+                f"{avg:.1f}s" if avg is not None else "-",
+                f"{int(cooldown)}s" if cooldown > 0 else "-",
+                f"{credits:,}" if credits is not None else "?",
+            ]
+            for c, value in enumerate(values):
+                item = table.item(r, c)
+                if item is None:
+                    item = QTableWidgetItem(value)
+                    table.setItem(r, c, item)
+                elif item.text() != value:
+                    item.setText(value)
+                else:
+                    continue
+                if c == 4:
+                    item.setForeground(QColor("#d64500") if cooldown > 0 else table.palette().text())
 
     def update_progress(self):
         """Update progress"""
@@ -3159,22 +5194,31 @@ class ElevenLabsGUI(QMainWindow):
             return
         
         total = len(self.chunks)
-        completed = sum(1 for c in self.chunks if c['status'] == STATUS_SUCCESS)
+        completed = self.status_counter.get(STATUS_SUCCESS)
         percentage = int((completed / total) * 100) if total > 0 else 0
         
         self.progress_bar.setValue(percentage)
-        self.progress_label.setText(f"{completed}/{total} ({percentage}%)")
+        text = f"{completed}/{total} ({percentage}%)"
+        if self.generation_active:
+            queued, in_flight = self.dispatch_queue.stats()
+            text += f" • Queue: {queued} • Running: {in_flight}"
+            if self.concurrency is not None and self.concurrency.adaptive:
+                text += f" • Limit: {self.concurrency.limit}"
+        self.progress_label.setText(text)
 
     def merge_audio_files(self):
         """
         Merge audio files - ĐẢM BẢO 100% ĐÚNG THỨ TỰ
-        - Validation toàn diện trước khi merge
-        - Kiểm tra tính liên tục của chunk numbers
-        - Merge theo thứ tự tuyệt đối
+        - Validation trạng thái + thứ tự chunk trên main thread (chỉ đọc memory)
+        - Kiểm tra file, merge, verify, cleanup chạy trong MergeWorker (không block UI)
         - Lưu file cùng cấp với file txt gốc
-        - LOG CHI TIẾT THỨ TỰ MERGE
+        - Progress bar + nút Cancel, log gộp theo từng 10%
         """
         try:
+            if self.merge_worker is not None and self.merge_worker.isRunning():
+                self.log("⏳ Merge already running")
+                return
+            
             # ============================================================
             # STEP 1: KIỂM TRA CƠ BẢN
             # ============================================================
@@ -3184,14 +5228,11 @@ class ElevenLabsGUI(QMainWindow):
             
             total_chunks = len(self.chunks)
             
-            # Phân loại chunks
-            success_chunks = [c for c in self.chunks if c['status'] == STATUS_SUCCESS]
-            failed_chunks = [c for c in self.chunks if c['status'] == STATUS_FAIL]
-            pending_chunks = [c for c in self.chunks if c['status'] in [STATUS_QUEUE, STATUS_PENDING]]
-            
-            success_count = len(success_chunks)
-            failed_count = len(failed_chunks)
-            pending_count = len(pending_chunks)
+            # Đếm theo status - O(1) từ status_counter
+            counts = self.status_counter.snapshot()
+            success_count = counts[STATUS_SUCCESS]
+            failed_count = counts[STATUS_FAIL]
+            pending_count = counts[STATUS_QUEUE] + counts[STATUS_PENDING]
             
             self.log("=" * 60)
             self.log("🔍 MERGE VALIDATION CHECK")
@@ -3209,6 +5250,10 @@ class ElevenLabsGUI(QMainWindow):
                 error_msg += f"❌ Failed: {failed_count}\n"
                 error_msg += f"🟨 Pending: {pending_count}\n\n"
                 
+                # Chỉ khi merge bị chặn mới cần danh sách cụ thể
+                failed_chunks = [c for c in self.chunks if c['status'] == STATUS_FAIL]
+                pending_chunks = [c for c in self.chunks if c['status'] in [STATUS_QUEUE, STATUS_PENDING]]
+                
                 if failed_count > 0:
                     error_msg += "Failed chunks: "
                     error_msg += ", ".join([f"#{c['number']}" for c in failed_chunks[:10]])
@@ -3238,31 +5283,28 @@ class ElevenLabsGUI(QMainWindow):
             
             # Sắp xếp chunks theo số thứ tự
             sorted_chunks = sorted(self.chunks, key=lambda x: x['number'])
-            
-            # LOG THỨ TỰ SAU KHI SORT
-            chunk_sequence = [c['number'] for c in sorted_chunks]
-            sequence_str = "-".join(map(str, chunk_sequence))
-            self.log(f"📊 Chunk order after sorting: {sequence_str}")
+            actual_sequence = [c['number'] for c in sorted_chunks]
+            self.log(f"📊 Chunk order after sorting: {format_chunk_ranges(actual_sequence)}")
             
             # Kiểm tra tính liên tục: phải là 1, 2, 3, ..., n
             expected_sequence = list(range(1, total_chunks + 1))
-            actual_sequence = [c['number'] for c in sorted_chunks]
             
             if actual_sequence != expected_sequence:
                 error_msg = "❌ CHUNK SEQUENCE ERROR!\n\n"
                 error_msg += "Chunks must be numbered 1, 2, 3, ... sequentially.\n\n"
-                error_msg += f"Expected: {expected_sequence}\n"
-                error_msg += f"Actual:   {actual_sequence}\n\n"
+                error_msg += f"Expected: {format_chunk_ranges(expected_sequence)}\n"
+                error_msg += f"Actual:   {format_chunk_ranges(actual_sequence)}\n\n"
                 
                 # Tìm chunks bị thiếu
                 missing = set(expected_sequence) - set(actual_sequence)
                 if missing:
-                    error_msg += f"Missing: {sorted(missing)}\n"
+                    error_msg += f"Missing: {format_chunk_ranges(sorted(missing))}\n"
                 
                 # Tìm chunks bị duplicate
-                duplicates = [x for x in actual_sequence if actual_sequence.count(x) > 1]
+                counts = collections.Counter(actual_sequence)
+                duplicates = sorted(n for n, k in counts.items() if k > 1)
                 if duplicates:
-                    error_msg += f"Duplicates: {set(duplicates)}\n"
+                    error_msg += f"Duplicates: {format_chunk_ranges(duplicates)}\n"
                 
                 self.log("❌ Merge aborted - Invalid sequence")
                 QMessageBox.critical(self, "Merge Failed", error_msg)
@@ -3271,309 +5313,41 @@ class ElevenLabsGUI(QMainWindow):
             self.log(f"✅ Chunk sequence validated: 1 → {total_chunks}")
             
             # ============================================================
-            # STEP 3: KIỂM TRA AUDIO FILES
-            # ============================================================
-            self.log("🔍 Validating audio files...")
-            
-            audio_files_ordered = []
-            errors = []
-            
-            for chunk in sorted_chunks:
-                chunk_num = chunk['number']
-                audio_path = chunk.get('audio_file')
-                
-                # Check 1: Audio path exists
-                if not audio_path:
-                    errors.append(f"Chunk #{chunk_num}: No audio file path")
-                    continue
-                
-                # Check 2: File exists on disk
-                if not os.path.exists(audio_path):
-                    errors.append(f"Chunk #{chunk_num}: File not found\n  Path: {audio_path}")
-                    continue
-                
-                # Check 3: File is not empty
-                file_size = os.path.getsize(audio_path)
-                if file_size == 0:
-                    errors.append(f"Chunk #{chunk_num}: Empty file (0 bytes)\n  Path: {audio_path}")
-                    continue
-                
-                # Check 4: File is readable
-                try:
-                    with open(audio_path, 'rb') as f:
-                        f.read(1)  # Try reading 1 byte
-                except Exception as e:
-                    errors.append(f"Chunk #{chunk_num}: Cannot read file\n  Error: {e}")
-                    continue
-                
-                # All checks passed
-                audio_files_ordered.append({
-                    'number': chunk_num,
-                    'path': audio_path,
-                    'size': file_size,
-                    'name': os.path.basename(audio_path)
-                })
-                
-                self.log(f"   ✓ Chunk #{chunk_num:03d}: {os.path.basename(audio_path)} ({file_size:,} bytes)")
-            
-            # Check for errors
-            if errors:
-                error_msg = "❌ AUDIO FILE VALIDATION FAILED!\n\n"
-                error_msg += "\n".join(errors)
-                error_msg += "\n\n⚠️ All chunks must have valid audio files!"
-                
-                self.log("❌ Merge aborted - Audio file errors")
-                QMessageBox.critical(self, "Merge Failed", error_msg)
-                return
-            
-            # Verify count
-            if len(audio_files_ordered) != total_chunks:
-                error_msg = f"❌ FILE COUNT MISMATCH!\n\n"
-                error_msg += f"Expected: {total_chunks} files\n"
-                error_msg += f"Found: {len(audio_files_ordered)} valid files\n"
-                
-                self.log("❌ Merge aborted - File count mismatch")
-                QMessageBox.critical(self, "Merge Failed", error_msg)
-                return
-            
-            self.log(f"✅ All {len(audio_files_ordered)} audio files validated")
-            
-            # ============================================================
-            # STEP 4: XÁC ĐỊNH OUTPUT PATH (3 PRIORITY LEVELS)
-            # ============================================================
-            self.log("📁 Determining output path...")
-            
-            output_dir = None
-            output_name = None
-            
-            # PRIORITY 1: Auto workflow voice output folder (HIGHEST)
-            if self.project_chunks_audio_dir:
-                output_dir = self.project_chunks_audio_dir
-                # Get script name from script_path if available
-                if hasattr(self, 'project_text_path') and self.project_text_path:
-                    output_name = os.path.splitext(os.path.basename(self.project_text_path))[0]
-                elif hasattr(self, 'script_path') and self.script_path:
-                    output_name = os.path.splitext(os.path.basename(self.script_path))[0]
-                else:
-                    # Use script name from script input if available
-                    script_text = self.script_input.toPlainText().strip()
-                    if script_text:
-                        # Try to extract name from first line or use default
-                        first_line = script_text.split('\n')[0][:50].strip()
-                        output_name = re.sub(r'[^\w\s-]', '', first_line).strip().replace(' ', '_')
-                        if not output_name:
-                            output_name = "script"
-                if not output_name:
-                    output_name = "merged_audio"
-                
-                merged_file = os.path.join(output_dir, f"{output_name}.mp3")
-                self.log(f"   ✅ Using auto workflow voice folder: {output_dir}")
-                self.log(f"   📄 Output file: {merged_file}")
-            
-            # PRIORITY 2: Same folder as TXT file (legacy)
-            elif self.project_text_path and os.path.exists(self.project_text_path):
-                output_dir = os.path.dirname(self.project_text_path)
-                output_name = os.path.splitext(os.path.basename(self.project_text_path))[0]
-                merged_file = os.path.join(output_dir, f"{output_name}.mp3")
-                
-                self.log(f"   📁 Using TXT file folder: {output_dir}")
-                self.log(f"   📄 Output file: {merged_file}")
-            
-            # PRIORITY 3: Fallback to default output folder
-            else:
-                output_dir = OUTPUT_DIR
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                output_name = f"merged_{timestamp}"
-                merged_file = os.path.join(OUTPUT_DIR, f"{output_name}.mp3")
-                self.log(f"   ⚠️ No project/TXT path - using fallback: {OUTPUT_DIR}")
-                self.log(f"   📄 Output file: {merged_file}")
-            
-            # Ensure output directory exists
-            if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir, exist_ok=True)
-                self.log(f"   ✅ Created output directory: {output_dir}")
-            
-            # ============================================================
-            # STEP 5: MERGE FILES THEO THỨ TỰ TUYỆT ĐỐI
+            # STEP 3: XÁC ĐỊNH OUTPUT PATH
             # ============================================================
-            self.log("=" * 60)
-            self.log("🔗 STARTING MERGE PROCESS")
-            self.log("=" * 60)
-            
-            # LOG THỨ TỰ MERGE NGAY TRƯỚC KHI BẮT ĐẦU
-            merge_order = [f['number'] for f in audio_files_ordered]
-            merge_order_str = "-".join(map(str, merge_order))
-            self.log(f"📋 MERGE ORDER: {merge_order_str}")
-            self.log(f"📋 Total files to merge: {len(audio_files_ordered)}")
-            
-            # Xóa file cũ nếu tồn tại
-            if os.path.exists(merged_file):
-                try:
-                    os.remove(merged_file)
-                    self.log(f"   🗑️ Removed existing file: {os.path.basename(merged_file)}")
-                except Exception as e:
-                    error_msg = f"Cannot remove existing file:\n{merged_file}\n\nError: {e}"
-                    QMessageBox.critical(self, "Merge Failed", error_msg)
-                    return
-            
-            # Merge process
-            total_bytes_written = 0
-            chunks_merged = 0
-            merge_log_parts = []  # Để build string "1-2-3-4-5-..."
-            
-            try:
-                with open(merged_file, 'wb') as outfile:
-                    for i, audio_info in enumerate(audio_files_ordered, 1):
-                        chunk_num = audio_info['number']
-                        audio_path = audio_info['path']
-                        
-                        # Add to merge log
-                        merge_log_parts.append(str(chunk_num))
-                        
-                        # Log progress mỗi chunk
-                        progress_pct = int((i / total_chunks) * 100)
-                        current_merge_str = "-".join(merge_log_parts)
-                        self.log(f"   [{progress_pct:3d}%] Merging #{chunk_num:03d} → Current order: {current_merge_str}")
-                        
-                        # Read and write
-                        try:
-                            with open(audio_path, 'rb') as infile:
-                                audio_data = infile.read()
-                                
-                                # Verify data
-                                if len(audio_data) == 0:
-                                    raise Exception(f"File became empty during read: {audio_path}")
-                                
-                                # Write to output
-                                bytes_written = outfile.write(audio_data)
-                                total_bytes_written += bytes_written
-                                chunks_merged += 1
-                                
-                                # Verify write
-                                if bytes_written != len(audio_data):
-                                    raise Exception(f"Write incomplete: expected {len(audio_data)}, wrote {bytes_written}")
-                        
-                        except Exception as e:
-                            error_msg = f"Failed to merge chunk #{chunk_num}:\n{audio_path}\n\nError: {e}"
-                            self.log(f"❌ Merge failed at chunk #{chunk_num}: {e}")
-                            QMessageBox.critical(self, "Merge Failed", error_msg)
-                            
-                            # Cleanup incomplete file
-                            try:
-                                outfile.close()
-                                os.remove(merged_file)
-                            except:
-                                pass
-                            return
-            
-            except Exception as e:
-                error_msg = f"Merge process failed:\n\n{e}"
-                self.log(f"❌ Merge failed: {e}")
-                QMessageBox.critical(self, "Merge Failed", error_msg)
-                return
-            
-            # LOG FINAL MERGE ORDER
-            final_merge_str = "-".join(merge_log_parts)
-            self.log("=" * 60)
-            self.log(f"✅ MERGE SEQUENCE COMPLETED: {final_merge_str}")
-            self.log("=" * 60)
+            # Path đã chốt khi bật incremental merge (nếu có) → phần merge dần còn dùng được
+            merged_file = self._run_merge_path or self._resolve_merge_output_path()
+            self._run_merge_path = None
             
             # ============================================================
-            # STEP 6: VERIFY OUTPUT FILE
+            # STEP 4: KIỂM TRA FILE + MERGE + VERIFY + CLEANUP (BACKGROUND)
             # ============================================================
-            self.log("🔍 Verifying merged file...")
-            
-            if not os.path.exists(merged_file):
-                error_msg = "Output file was not created!"
-                self.log("❌ Merge failed - No output file")
-                QMessageBox.critical(self, "Merge Failed", error_msg)
-                return
-            
-            merged_size = os.path.getsize(merged_file)
-            
-            if merged_size == 0:
-                error_msg = "Output file is empty (0 bytes)!"
-                self.log("❌ Merge failed - Empty output")
-                QMessageBox.critical(self, "Merge Failed", error_msg)
-                return
-            
-            if chunks_merged != total_chunks:
-                error_msg = f"Merge incomplete!\n\n"
-                error_msg += f"Expected: {total_chunks} chunks\n"
-                error_msg += f"Merged: {chunks_merged} chunks"
-                self.log(f"❌ Merge incomplete: {chunks_merged}/{total_chunks}")
-                QMessageBox.critical(self, "Merge Failed", error_msg)
-                return
-            
-            # Calculate expected vs actual size
-            total_input_size = sum(f['size'] for f in audio_files_ordered)
-            size_diff = abs(merged_size - total_input_size)
-            size_diff_pct = (size_diff / total_input_size * 100) if total_input_size > 0 else 0
-            
-            self.log(f"   Input total: {total_input_size:,} bytes")
-            self.log(f"   Output size: {merged_size:,} bytes")
-            self.log(f"   Difference: {size_diff:,} bytes ({size_diff_pct:.2f}%)")
+            entries = [(c['number'], c.get('audio_file')) for c in sorted_chunks]
+            gap_ms = self.merge_gap_spin.value()
+            incremental = self.incremental_merger
+            if incremental is not None and not incremental.is_valid_for(merged_file, total_chunks, gap_ms):
+                self._reset_incremental_merge()
+                incremental = None
+            self.incremental_merger = None  # MergeWorker sở hữu từ đây
             
-            # Warning if size difference is too large
-            if size_diff_pct > 5:
-                self.log(f"   ⚠️ Size difference exceeds 5% - verify output quality!")
+            self.merge_worker = MergeWorker(
+                entries, merged_file,
+                gap_ms=gap_ms,
+                keep_chunks=self.keep_chunks_check.isChecked(),
+                incremental=incremental,
+                parent=self
+            )
+            self.merge_worker.progress_signal.connect(self._on_merge_progress)
+            self.merge_worker.log_signal.connect(self.log)
+            self.merge_worker.done_signal.connect(self._on_merge_done)
+            self.merge_worker.failed_signal.connect(self._on_merge_failed)
             
-            # ============================================================
-            # STEP 7: SUCCESS REPORT
-            # ============================================================
+            self.btn_merge.setEnabled(False)
+            self.btn_cancel_merge.setEnabled(True)
             self.log("=" * 60)
-            self.log("✅ MERGE COMPLETED SUCCESSFULLY!")
-            self.log(f"   Merged Order: {final_merge_str}")
-            self.log(f"   Total Chunks: {total_chunks}")
-            self.log(f"   Output Size: {merged_size:,} bytes ({merged_size / 1024 / 1024:.2f} MB)")
-            self.log(f"   Output File: {os.path.basename(merged_file)}")
-            self.log(f"   Full Path: {merged_file}")
+            self.log(f"🔗 STARTING MERGE PROCESS ({total_chunks} files, background)")
             self.log("=" * 60)
-            
-            # ============================================================
-            # STEP 8: CLEANUP (optional)
-            # ============================================================
-            if not self.keep_chunks_check.isChecked():
-                self.log("🗑️ Cleaning up chunk files...")
-                deleted_count = 0
-                failed_deletions = []
-                
-                for audio_info in audio_files_ordered:
-                    try:
-                        os.remove(audio_info['path'])
-                        deleted_count += 1
-                    except Exception as e:
-                        failed_deletions.append(f"{audio_info['name']}: {e}")
-                
-                self.log(f"   Deleted: {deleted_count}/{len(audio_files_ordered)} files")
-                
-                if failed_deletions:
-                    self.log("   ⚠️ Some files could not be deleted:")
-                    for fail in failed_deletions[:5]:  # Show first 5
-                        self.log(f"      - {fail}")
-                    if len(failed_deletions) > 5:
-                        self.log(f"      ... and {len(failed_deletions) - 5} more")
-            
-            # ============================================================
-            # STEP 9: OPEN FILE (optional)
-            # ============================================================
-            if self.open_after_merge_check.isChecked():
-                self.log("📂 Opening merged file...")
-                self.open_file(merged_file)
-            
-            # ============================================================
-            # STEP 10: SUCCESS MESSAGE
-            # ============================================================
-            success_msg = "✅ MERGE SUCCESSFUL!\n\n"
-            success_msg += f"📁 File: {os.path.basename(merged_file)}\n\n"
-            success_msg += f"📊 Details:\n"
-            success_msg += f"   • Chunks merged: {total_chunks}\n"
-            success_msg += f"   • Merge order: {final_merge_str}\n"
-            success_msg += f"   • Total size: {merged_size:,} bytes ({merged_size / 1024 / 1024:.2f} MB)\n"
-            success_msg += f"   • Sequence: 1 → {total_chunks} (validated)\n\n"
-            success_msg += f"📂 Location:\n{merged_file}"
-            
-            QMessageBox.information(self, "Merge Complete", success_msg)
+            self.merge_worker.start()
             
         except Exception as e:
             error_msg = f"❌ UNEXPECTED ERROR!\n\n{str(e)}\n\n"
@@ -3582,6 +5356,120 @@ class ElevenLabsGUI(QMainWindow):
             import traceback
             self.log(traceback.format_exc())
             QMessageBox.critical(self, "Merge Error", error_msg)
+
+    def _resolve_merge_output_path(self, quiet=False):
+        """Output path theo 3 mức ưu tiên - tạo folder nếu cần (quiet: không ghi log)"""
+        log = (lambda _msg: None) if quiet else self.log
+        log("📁 Determining output path...")
+        
+        output_dir = None
+        output_name = None
+        
+        # PRIORITY 1: Auto workflow voice output folder (HIGHEST)
+        if self.project_chunks_audio_dir:
+            output_dir = self.project_chunks_audio_dir
+            # Get script name from script_path if available
+            if hasattr(self, 'project_text_path') and self.project_text_path:
+                output_name = os.path.splitext(os.path.basename(self.project_text_path))[0]
+            elif hasattr(self, 'script_path') and self.script_path:
+                output_name = os.path.splitext(os.path.basename(self.script_path))[0]
+            else:
+                # Use script name from script input if available
+                script_text = self.script_input.toPlainText().strip() if hasattr(self, 'script_input') else ""
+                if script_text:
+                    # Try to extract name from first line or use default
+                    first_line = script_text.split('\n')[0][:50].strip()
+                    output_name = re.sub(r'[^\w\s-]', '', first_line).strip().replace(' ', '_')
+                    if not output_name:
+                        output_name = "script"
+            if not output_name:
+                output_name = "merged_audio"
+            
+            merged_file = os.path.join(output_dir, f"{output_name}.mp3")
+            log(f"   ✅ Using auto workflow voice folder: {output_dir}")
+        
+        # PRIORITY 2: Same folder as TXT file (legacy)
+        elif self.project_text_path and os.path.exists(self.project_text_path):
+            output_dir = os.path.dirname(self.project_text_path)
+            output_name = os.path.splitext(os.path.basename(self.project_text_path))[0]
+            merged_file = os.path.join(output_dir, f"{output_name}.mp3")
+            log(f"   📁 Using TXT file folder: {output_dir}")
+        
+        # PRIORITY 3: Fallback to default output folder
+        else:
+            output_dir = OUTPUT_DIR
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            output_name = f"merged_{timestamp}"
+            merged_file = os.path.join(OUTPUT_DIR, f"{output_name}.mp3")
+            log(f"   ⚠️ No project/TXT path - using fallback: {OUTPUT_DIR}")
+        
+        log(f"   📄 Output file: {merged_file}")
+        
+        # Ensure output directory exists
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+            log(f"   ✅ Created output directory: {output_dir}")
+        
+        return merged_file
+
+    def cancel_merge(self):
+        """Cancel background merge - file dở dang sẽ bị xoá"""
+        if self.merge_worker is not None and self.merge_worker.isRunning():
+            self.merge_worker.cancel()
+            self.btn_cancel_merge.setEnabled(False)
+            self.log("⏹️ Cancelling merge...")
+
+    def _on_merge_progress(self, done, total):
+        percentage = int(done * 100 / total) if total else 0
+        self.progress_bar.setValue(percentage)
+        self.progress_label.setText(f"🔗 Merging {done}/{total} ({percentage}%)")
+
+    def _merge_ui_reset(self):
+        self.btn_merge.setEnabled(True)
+        self.btn_cancel_merge.setEnabled(False)
+        self.merge_worker = None
+        self.update_progress()
+
+    def _on_merge_failed(self, title, error_msg):
+        self._merge_ui_reset()
+        self.log(f"❌ {title}")
+        if title != "Merge Cancelled":
+            QMessageBox.critical(self, title, error_msg)
+
+    def _on_merge_done(self, result):
+        """STEP 5+: report, open file, success message (main thread)"""
+        self._merge_ui_reset()
+        merged_file = result['path']
+        merged_size = result['bytes']
+        total_chunks = result['files']
+        order_str = format_chunk_ranges(result['order'])
+        
+        self.log("=" * 60)
+        self.log("✅ MERGE COMPLETED SUCCESSFULLY!")
+        self.log(f"   Merged Order: {order_str}")
+        self.log(f"   Total Chunks: {total_chunks}")
+        self.log(f"   Duration: {timedelta(seconds=int(result['duration_s']))}")
+        self.log(f"   Output Size: {merged_size:,} bytes ({merged_size / 1024 / 1024:.2f} MB)")
+        self.log(f"   Output File: {os.path.basename(merged_file)}")
+        self.log(f"   Full Path: {merged_file}")
+        self.log("=" * 60)
+        
+        # Open file (optional)
+        if self.open_after_merge_check.isChecked():
+            self.log("📂 Opening merged file...")
+            self.open_file(merged_file)
+        
+        success_msg = "✅ MERGE SUCCESSFUL!\n\n"
+        success_msg += f"📁 File: {os.path.basename(merged_file)}\n\n"
+        success_msg += f"📊 Details:\n"
+        success_msg += f"   • Chunks merged: {total_chunks}\n"
+        success_msg += f"   • Merge order: {order_str}\n"
+        success_msg += f"   • Duration: {timedelta(seconds=int(result['duration_s']))}\n"
+        success_msg += f"   • Total size: {merged_size:,} bytes ({merged_size / 1024 / 1024:.2f} MB)\n"
+        success_msg += f"   • Sequence: 1 → {total_chunks} (validated)\n\n"
+        success_msg += f"📂 Location:\n{merged_file}"
+        
+        QMessageBox.information(self, "Merge Complete", success_msg)
         
     def _load_settings(self):
         """Load settings"""
@@ -3594,6 +5482,15 @@ class ElevenLabsGUI(QMainWindow):
                     self.delay_spin.setValue(s.get('gen_delay_ms', 0))
                     self.max_retries_spin.setValue(s.get('max_retries', 3))
                     self.timeout_spin.setValue(s.get('timeout_s', 30))
+                    self.async_engine_check.setChecked(bool(s.get('async_engine', False)) and httpx is not None)
+                    self.stream_endpoint_check.setChecked(s.get('stream_endpoint', False))
+                    self.first_byte_spin.setValue(s.get('first_byte_timeout_s', 10))
+                    self.merge_gap_spin.setValue(s.get('merge_gap_ms', 0))
+                    self.incremental_merge_check.setChecked(s.get('incremental_merge', True))
+                    self.tts_cache_check.setChecked(s.get('tts_cache', True))
+                    self.tts_cache_spin.setValue(s.get('tts_cache_mb', 2048))
+                    self.proxy_workers_spin.setValue(s.get('proxy_validate_workers', 8))
+                    self.adaptive_concurrency_check.setChecked(s.get('adaptive_concurrency', True))
                     self.min_credit_spin.setValue(s.get('credit_threshold', 1000))
                     
                     # Load proxy mode - GIỐNG TKINTER
@@ -3620,8 +5517,17 @@ class ElevenLabsGUI(QMainWindow):
                 'timeout_s': self.timeout_spin.value(),
                 'credit_threshold': self.min_credit_spin.value(),
                 'multithread': self.enable_multithread_check.isChecked(),
+                'async_engine': self.async_engine_check.isChecked(),
+                'stream_endpoint': self.stream_endpoint_check.isChecked(),
+                'first_byte_timeout_s': self.first_byte_spin.value(),
                 'open_after_merge': self.open_after_merge_check.isChecked(),
                 'keep_chunks_after_merge': self.keep_chunks_check.isChecked(),
+                'merge_gap_ms': self.merge_gap_spin.value(),
+                'incremental_merge': self.incremental_merge_check.isChecked(),
+                'tts_cache': self.tts_cache_check.isChecked(),
+                'tts_cache_mb': self.tts_cache_spin.value(),
+                'proxy_validate_workers': self.proxy_workers_spin.value(),
+                'adaptive_concurrency': self.adaptive_concurrency_check.isChecked(),
                 'proxy_mode': 'rotation' if self.proxy_rotation_radio.isChecked() else 'no_proxy'
             }
             
@@ -3825,9 +5731,7 @@ class ElevenLabsGUI(QMainWindow):
                 return
             
             # Load keys directly into api_manager (in memory, not file)
-            with self.api_manager._lock:
-                self.api_manager._keys = api_keys
-                self.api_manager._idx = 0
+            self.api_manager.load_keys(api_keys)
             
             key_count = len(api_keys)
             self.log(f"✅ Loaded {key_count} keys from server (in memory only)")
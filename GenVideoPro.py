@@ -21,6 +21,7 @@ from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
 from PySide6.QtMultimediaWidgets import QVideoWidget
 from datetime import datetime, timezone
 from PySide6.QtWidgets import QDialog, QDialogButtonBox, QFormLayout
+from thumbnail_cache import thumbnail_service, bucket_size
 # >>> NEW: deps cho AI prompt (Groq/OpenAI-compatible)
 try:
     import requests
@@ -2384,7 +2385,6 @@ class PromptEdit(QTextEdit):
 
 class VideoCellWidget(QWidget):
     """Modern video cell with lazy loading and smooth animations"""
-    _thumbnail_cache = {}  # Static cache for thumbnails
     
     def __init__(self, video_path: str, parent=None, show_preview: bool = True, image_path: str = None):
         super().__init__(parent)
@@ -2523,14 +2523,7 @@ class VideoCellWidget(QWidget):
             lay.addWidget(label, 0, Qt.AlignCenter)
     
     def _load_thumbnail_lazy(self):
-        """Lazy load thumbnail for performance"""
-        # Check cache first
-        if self.image_path in VideoCellWidget._thumbnail_cache:
-            pixmap = VideoCellWidget._thumbnail_cache[self.image_path]
-            self.thumbnail_label.setPixmap(pixmap)
-            self._loaded = True
-            return
-        
+        """Lazy load thumbnail for performance (thumbnail_service: RAM → disk cache → background decode)"""
         # Show loading state
         self.thumbnail_label.setText("Loading...")
         self.thumbnail_label.setStyleSheet("""
@@ -2542,69 +2535,48 @@ class VideoCellWidget(QWidget):
                 font-weight: 600;
             }
         """)
-        
-        # Load in background thread
-        QTimer.singleShot(10, self._do_load_thumbnail)
+        self._do_load_thumbnail()
     
+    def _thumb_bucket(self):
+        """Kích thước thumbnail cho card hiện tại (làm tròn theo bucket, label tự scale về đúng card)"""
+        if hasattr(self, 'card') and self.card:
+            card_size = self.card.size()
+            return bucket_size(card_size.width(), card_size.height())
+        return bucket_size(240, 135)  # Default fallback
+
     def _do_load_thumbnail(self):
-        """Actually load the thumbnail"""
-        if self.image_path and os.path.exists(self.image_path):
-            try:
-                from PIL import Image
-                from PySide6.QtGui import QImage
-                
-                # Get current card size for dynamic thumbnail size
-                if hasattr(self, 'card') and self.card:
-                    card_size = self.card.size()
-                    thumb_size = (card_size.width(), card_size.height())
-                else:
-                    thumb_size = (240, 135)  # Default fallback
-                
-                # Load and resize with high quality
-                pil_img = Image.open(self.image_path)
-                pil_img.thumbnail(thumb_size, Image.Resampling.LANCZOS)
-                
-                # Convert to QPixmap
-                if pil_img.mode == "RGBA":
-                    data = pil_img.tobytes("raw", "RGBA")
-                    qimg = QImage(data, pil_img.width, pil_img.height, QImage.Format_RGBA8888)
-                else:
-                    pil_img = pil_img.convert("RGB")
-                    data = pil_img.tobytes("raw", "RGB")
-                    qimg = QImage(data, pil_img.width, pil_img.height, QImage.Format_RGB888)
-                
-                pixmap = QPixmap.fromImage(qimg)
-                
-                # Cache it
-                VideoCellWidget._thumbnail_cache[self.image_path] = pixmap
-                
-                # Set pixmap
-                self.thumbnail_label.setPixmap(pixmap)
-                self.thumbnail_label.setStyleSheet("")
-                self._loaded = True
-                
-                # Trigger fade-in animation if available
-                if hasattr(self, 'fade_in_animation') and not self.fade_in_animation.state() == QPropertyAnimation.Running:
-                    self.fade_in_animation.start()
-                
-            except Exception as e:
-                print(f"[VIDEO CELL] Failed to load thumbnail: {e}")
-                self._show_fallback_icon()
-        else:
+        """Request thumbnail at the current card size bucket - callback chạy trên UI thread"""
+        if not (self.image_path and os.path.exists(self.image_path)):
+            self._show_fallback_icon()
+            return
+        thumb_size = self._thumb_bucket()
+        self._thumb_size = thumb_size
+        thumbnail_service().request(
+            self.image_path, *thumb_size,
+            lambda image, size=thumb_size: self._on_thumbnail_ready(size, image))
+    
+    def _on_thumbnail_ready(self, size, image):
+        if size != getattr(self, '_thumb_size', None):
+            return  # card đã đổi size, đang chờ thumbnail mới
+        if image.isNull():
+            print(f"[VIDEO CELL] Failed to load thumbnail: {self.image_path}")
             self._show_fallback_icon()
+            return
+        self.thumbnail_label.setPixmap(QPixmap.fromImage(image))
+        self.thumbnail_label.setStyleSheet("")
+        self._loaded = True
+        
+        # Trigger fade-in animation if available
+        if hasattr(self, 'fade_in_animation') and not self.fade_in_animation.state() == QPropertyAnimation.Running:
+            self.fade_in_animation.start()
     
     def update_size(self, width: int, height: int):
         """Update card size while maintaining aspect ratio"""
         if hasattr(self, 'card') and self.card:
             self.card.setFixedSize(width, height)
-            # Update thumbnail if loaded - reload with new size
+            # Reload thumbnail chỉ khi sang bucket mới - trong cùng bucket label tự scale
             if hasattr(self, 'thumbnail_label') and self.thumbnail_label and hasattr(self, 'image_path'):
-                # Force reload thumbnail with new dimensions
-                if self.image_path:
-                    # Clear cache for this image to force reload
-                    if self.image_path in VideoCellWidget._thumbnail_cache:
-                        del VideoCellWidget._thumbnail_cache[self.image_path]
-                    # Reload thumbnail
+                if self.image_path and self._thumb_bucket() != getattr(self, '_thumb_size', None):
                     self._loaded = False
                     self._do_load_thumbnail()
     
@@ -5676,12 +5648,16 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Vision", str(e))
 
     def _make_thumb(self, image_path: str, width: int, height: int) -> QPixmap:
-        """Create thumbnail from image with specified dimensions"""
+        """Create thumbnail from image with specified dimensions (shared thumbnail cache)"""
         try:
-            pixmap = QPixmap(image_path)
-            if pixmap.isNull():
+            image = thumbnail_service().load(image_path, width, height)
+            if image.isNull():
                 return QPixmap()
-            return pixmap.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            pixmap = QPixmap.fromImage(image)
+            if pixmap.width() < width and pixmap.height() < height:
+                # Cache không phóng to ảnh nhỏ → scale lên cho vừa khung như trước
+                pixmap = pixmap.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            return pixmap
         except Exception:
             return QPixmap()
 
@@ -7728,32 +7704,8 @@ class MainWindow(QMainWindow):
         icon_label.setFixedSize(160, 80)
         icon_label.setCursor(Qt.PointingHandCursor)
         
-        if path and os.path.exists(path):
-            pm = QPixmap(path)
-            if not pm.isNull():
-                scaled = pm.scaled(160, 80, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                icon_label.setPixmap(scaled)
-                icon_label.setStyleSheet("""
-                    QLabel {
-                        background: #f9fafb;
-                        border: 1px solid #e5e7eb;
-                        border-radius: 6px;
-                    }
-                    QLabel:hover {
-                        border: 2px solid #3b82f6;
-                    }
-                """)
-            else:
-                icon_label.setText("🖼️")
-                icon_label.setStyleSheet("""
-                    QLabel {
-                        background: #f0f9ff;
-                        border: 2px solid #bae6fd;
-                        border-radius: 8px;
-                        font-size: 40px;
-                    }
-                """)
-        else:
+        def show_placeholder():
+            icon_label.setPixmap(QPixmap())
             icon_label.setText("🖼️")
             icon_label.setStyleSheet("""
                 QLabel {
@@ -7764,6 +7716,29 @@ class MainWindow(QMainWindow):
                 }
             """)
         
+        def on_thumb_ready(image):
+            if image.isNull():
+                show_placeholder()
+                return
+            icon_label.setText("")
+            icon_label.setPixmap(QPixmap.fromImage(image))
+        
+        if path and os.path.exists(path):
+            icon_label.setStyleSheet("""
+                QLabel {
+                    background: #f9fafb;
+                    border: 1px solid #e5e7eb;
+                    border-radius: 6px;
+                }
+                QLabel:hover {
+                    border: 2px solid #3b82f6;
+                }
+            """)
+            # Thumbnail từ cache dùng chung (decode ở background nếu chưa có)
+            thumbnail_service().request(path, 160, 80, on_thumb_ready)
+        else:
+            show_placeholder()
+        
         # Thêm click handler để mở dialog điều hướng
         def on_image_clicked(event):
             # Thu thập tất cả hình ảnh từ tất cả prompts
@@ -14,6 +14,7 @@ from pathlib import Path
 from typing import List, Optional
 from PySide6.QtCore import QObject, Signal, QTimer, Qt, QMetaObject, Slot
 from PySide6.QtWidgets import QMessageBox, QProgressDialog
+from text_chunker import split_text
 
 # Import from image_tab_full for AI analysis
 try:
@@ -424,10 +425,22 @@ class AutoWorkflowOrchestrator(QObject):
                 audio_widget.script_path = self.script_path
                 print(f"[GENERATE_VOICE] Set script path: {self.script_path}")
             
+            # Resume chunks already generated in a previous (crashed) run
+            if hasattr(audio_widget, '_resume_from_manifest'):
+                resumed = audio_widget._resume_from_manifest()
+                if resumed:
+                    print(f"[GENERATE_VOICE] Resumed {resumed} chunks from manifest")
+            
             self.step_changed.emit(f"🎙️ Generating {len(chunks)} voice chunks...")
             
             # Start generation (auto_mode=True to skip dialogs)
             target = [c for c in audio_widget.chunks if c['status'] != 'Success']
+            if not target:
+                # Everything was resumed from the manifest → go straight to merge
+                print("[GENERATE_VOICE] All chunks already generated")
+                if audio_widget.auto_merge_check.isChecked():
+                    audio_widget.merge_audio_files()
+                return
             print(f"[GENERATE_VOICE] Starting generation for {len(target)} chunks")
             audio_widget._start_generation(target, auto_mode=True)
             
@@ -445,27 +458,8 @@ class AutoWorkflowOrchestrator(QObject):
             QMetaObject.invokeMethod(self, "generate_images", Qt.QueuedConnection)
     
     def split_script_into_chunks(self, script: str, chunk_size: int = 800) -> List[str]:
-        """Split script into chunks for voice generation"""
-        import re
-        
-        # Split by sentences
-        sentences = re.split(r'(?<=[.!?])\s+', script)
-        
-        chunks = []
-        current_chunk = ""
-        
-        for sentence in sentences:
-            if len(current_chunk) + len(sentence) <= chunk_size:
-                current_chunk += " " + sentence if current_chunk else sentence
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence
-        
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
-        return [c for c in chunks if c]
+        """Split script into chunks for voice generation (same chunker as the ElevenLabs tab)"""
+        return split_text(script, chunk_size)
     
     @Slot()
     def check_and_generate_images(self):
@@ -1,8 +1,11 @@
 import os
+import re
 import json
 import time
 import base64
 import threading
+import heapq
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -16,6 +19,7 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, Signal, QThread, QSize, QPropertyAnimation, QEasingCurve, QPoint, QRect, QTimer, Slot, QMetaObject, Q_ARG
 from PySide6.QtGui import QPixmap, QPalette, QColor, QFont, QMouseEvent, QPainter, QPen, QCursor, QIcon
+from thumbnail_cache import thumbnail_service, MODE_COVER
 
 try:
     from cryptography.hazmat.primitives import hashes, serialization
@@ -554,20 +558,144 @@ def get_machine_guid() -> str:
     except Exception:
         return ""
 
+# Giới hạn mặc định của 1 key Gemini/Imagen (server có thể gửi rpm/daily_quota riêng cho từng key)
+KEY_DEFAULT_RPM = 0                # 0 = không giới hạn → chỉ nghỉ khi API trả 429
+KEY_DEFAULT_DAILY_QUOTA = 0        # 0 = không biết → chỉ dừng khi API báo hết quota
+KEY_RATE_COOLDOWN = 60             # 429 theo phút, không có retryDelay
+KEY_WAIT_TIMEOUT = 120             # acquire() chờ tối đa (giây) khi mọi key hết lượt
+
+# Quota ngày của Google reset lúc 0h giờ Pacific (có DST)
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_RESET_TZ = ZoneInfo("America/Los_Angeles")
+except Exception:
+    # Windows không có tzdata → dùng PST cố định (lệch 1h khi đang DST)
+    QUOTA_RESET_TZ = timezone(timedelta(hours=-8))
+
+def _seconds_until_quota_reset() -> float:
+    now = datetime.now(QUOTA_RESET_TZ)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    # So sánh theo UTC - trừ 2 datetime cùng tzinfo sẽ bỏ qua chênh lệch DST
+    return (midnight.astimezone(timezone.utc) - now.astimezone(timezone.utc)).total_seconds()
+
+def _parse_retry_delay(msg: str) -> Optional[float]:
+    """'retryDelay': '37s' / 'Please retry in 12.5s' trong message lỗi Gemini"""
+    m = re.search(r"retry(?:delay['\"]?\s*:\s*['\"]?| in )\s*(\d+(?:\.\d+)?)s", msg or "", re.IGNORECASE)
+    return float(m.group(1)) if m else None
+
 class KeyRotator:
-    def __init__(self, keys: List[str]):
+    """
+    Xoay vòng key Gemini/Imagen, dùng chung cho mọi worker (thread-safe)
+    - Mỗi key có token bucket theo RPM (rpm=0: không giới hạn) + đếm quota ngày
+    - acquire() trả key kế tiếp còn lượt (round-robin), chờ nếu tất cả đang hết lượt
+    - report_error(): 429 theo phút → cooldown ngắn; hết quota ngày / 403 → cooldown tới lúc reset
+    """
+    def __init__(self, keys: List[str], limits: Optional[dict] = None):
         self.keys = [k.strip() for k in keys if k.strip()]
         if not self.keys:
             raise ValueError("No API keys loaded.")
         self.lock = threading.Lock()
+        self._cond = threading.Condition(self.lock)
         self.idx = 0
+        # genai.Client per key - shared by all workers (reuse HTTP transport + auth)
+        self._clients = {}
+        limits = limits or {}
+        now = time.monotonic()
+        self._state = {}
+        for k in self.keys:
+            rpm, daily = limits.get(k, (None, None))
+            rpm = max(0, int(rpm or KEY_DEFAULT_RPM))
+            self._state[k] = {
+                'rpm': rpm,
+                'daily': int(daily or KEY_DEFAULT_DAILY_QUOTA),
+                'tokens': float(rpm),
+                'refilled': now,
+                'used_today': 0,
+                'day_reset': now + _seconds_until_quota_reset(),
+                'cooldown_until': 0.0,
+            }
     
     def current(self) -> str:
         with self.lock:
             return self.keys[self.idx % len(self.keys)]
     
+    def client(self, api_key: str) -> genai.Client:
+        """Cached genai.Client for api_key (created on first use)"""
+        with self.lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                client = genai.Client(api_key=api_key)
+                self._clients[api_key] = client
+            return client
+    
+    def _ready_in(self, st: dict, now: float) -> float:
+        """0 nếu key dùng được ngay, ngược lại số giây phải chờ (gọi khi đang giữ lock)"""
+        if now >= st['day_reset']:
+            st['used_today'] = 0
+            st['day_reset'] = now + _seconds_until_quota_reset()
+        if st['cooldown_until'] > now:
+            return st['cooldown_until'] - now
+        if st['daily'] and st['used_today'] >= st['daily']:
+            return st['day_reset'] - now
+        if not st['rpm']:
+            return 0.0
+        rate = st['rpm'] / 60.0
+        st['tokens'] = min(float(st['rpm']), st['tokens'] + (now - st['refilled']) * rate)
+        st['refilled'] = now
+        if st['tokens'] >= 1:
+            return 0.0
+        return (1 - st['tokens']) / rate
+    
+    def acquire(self, timeout: float = KEY_WAIT_TIMEOUT, cancel=None) -> Optional[str]:
+        """Lấy key kế tiếp còn lượt (tiêu 1 token + 1 quota); None nếu hết giờ chờ / cancel()"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = None
+                n = len(self.keys)
+                for i in range(n):
+                    k = self.keys[(self.idx + i) % n]
+                    st = self._state[k]
+                    ready_in = self._ready_in(st, now)
+                    if ready_in == 0:
+                        if st['rpm']:
+                            st['tokens'] -= 1
+                        st['used_today'] += 1
+                        self.idx = (self.idx + i + 1) % n
+                        return k
+                    wait = ready_in if wait is None else min(wait, ready_in)
+                if (cancel and cancel()) or now >= deadline:
+                    return None
+                # Chờ key sớm nhất có lượt (tối đa 1s để kiểm tra cancel)
+                self._cond.wait(min(wait, deadline - now, 1.0))
+    
+    def report_error(self, api_key: str, msg: str):
+        """Key gặp lỗi rate/quota → cooldown; lỗi khác bỏ qua"""
+        if not is_rate_or_quota_error(msg):
+            return
+        low = (msg or "").lower()
+        with self._cond:
+            st = self._state.get(api_key)
+            if st is None:
+                return
+            now = time.monotonic()
+            if "perday" in low or "per day" in low or "daily" in low or "403" in low or "permission" in low:
+                # Hết quota ngày / key không có quyền → nghỉ tới lúc reset
+                st['cooldown_until'] = st['day_reset']
+                self._clients.pop(api_key, None)
+            else:
+                # Hết cooldown chỉ cho 1 request thử lại, sau đó nạp token theo RPM
+                st['cooldown_until'] = max(st['cooldown_until'],
+                                           now + (_parse_retry_delay(msg) or KEY_RATE_COOLDOWN))
+                st['tokens'] = 1.0
+                st['refilled'] = st['cooldown_until']
+            self._cond.notify_all()
+    
     def next(self) -> str:
         with self.lock:
+            # Key bị bỏ qua (rate/quota) → drop client, lần sau dùng lại sẽ tạo mới
+            self._clients.pop(self.keys[self.idx % len(self.keys)], None)
             self.idx = (self.idx + 1) % len(self.keys)
             return self.keys[self.idx]
     
@@ -610,6 +738,9 @@ def crop_to_16_9(pixmap: QPixmap, target_width: int, target_height: int) -> QPix
     # Scale to target size with smooth transformation
     return cropped.scaled(target_width, target_height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
 
+# Ảnh preview của PromptRow (qua thumbnail_service - decode ở background + disk cache)
+PREVIEW_DECODE_SIZE = (760, 428)   # đủ cho main preview; thumbnail 66×37 cắt từ bản này
+
 # ==================== PROMPT CLEANING HELPER ====================
 def clean_prompt_prefix(prompt: str) -> str:
     """Remove common prefixes like 'Prompt vẽ ảnh:', 'Prompt:', etc."""
@@ -1860,23 +1991,79 @@ def extract_inline_image_bytes_from_gemini(resp) -> List[bytes]:
                     except Exception: pass
     return outs
 
+# Số request Gemini image chạy đồng thời tối đa trên 1 key (dùng chung mọi worker)
+GEMINI_IMAGE_PER_KEY_LIMIT = 2
+_key_slots = {}
+_key_slots_lock = threading.Lock()
+
+def _key_slot(api_key: str) -> threading.BoundedSemaphore:
+    with _key_slots_lock:
+        slot = _key_slots.get(api_key)
+        if slot is None:
+            slot = threading.BoundedSemaphore(GEMINI_IMAGE_PER_KEY_LIMIT)
+            _key_slots[api_key] = slot
+        return slot
+
+def _generate_one_gemini_image(client: genai.Client, prompt: str, aspect_ratio: str):
+    try:
+        cfg = GenerateContentConfig(
+            response_modalities=[Modality.IMAGE],
+            image_config=types.ImageConfig(aspect_ratio=aspect_ratio)
+        )
+        resp = client.models.generate_content(model=GEMINI_FLASH_IMAGE, contents=[prompt], config=cfg)
+    except Exception:
+        resp = client.models.generate_content(
+            model=GEMINI_FLASH_IMAGE,
+            contents=[f"{prompt}\nAspect ratio: {aspect_ratio}"],
+            config=GenerateContentConfig(response_modalities=[Modality.IMAGE])
+        )
+    return extract_inline_image_bytes_from_gemini(resp)
+
 def generate_with_gemini_image(client: genai.Client, prompt: str,
-                               aspect_ratio: str, n_images: int) -> List[bytes]:
-    images: List[bytes] = []
-    for _ in range(n_images):
+                               aspect_ratio: str, n_images: int,
+                               rotator: Optional["KeyRotator"] = None) -> List[bytes]:
+    """
+    n_images request chạy song song (Gemini trả 1 ảnh / request)
+    - Có rotator: mỗi request lấy key còn lượt qua rotator.acquire() → chia tải cho nhiều key,
+      lỗi rate/quota được báo lại cho rotator
+    - Mỗi key tối đa GEMINI_IMAGE_PER_KEY_LIMIT request cùng lúc
+    - Kết quả giữ đúng thứ tự; request lỗi bị bỏ qua, chỉ raise khi tất cả đều lỗi
+    """
+    n_images = max(1, int(n_images))
+    
+    def one():
+        if rotator is None:
+            return _generate_one_gemini_image(client, prompt, aspect_ratio)
+        api_key = rotator.acquire()
+        if api_key is None:
+            raise RuntimeError("429 rate limit: all API keys are cooling down or out of quota")
         try:
-            cfg = GenerateContentConfig(
-                response_modalities=[Modality.IMAGE],
-                image_config=types.ImageConfig(aspect_ratio=aspect_ratio)
-            )
-            resp = client.models.generate_content(model=GEMINI_FLASH_IMAGE, contents=[prompt], config=cfg)
-        except Exception:
-            resp = client.models.generate_content(
-                model=GEMINI_FLASH_IMAGE,
-                contents=[f"{prompt}\nAspect ratio: {aspect_ratio}"],
-                config=GenerateContentConfig(response_modalities=[Modality.IMAGE])
-            )
-        images.extend(extract_inline_image_bytes_from_gemini(resp))
+            with _key_slot(api_key):
+                return _generate_one_gemini_image(rotator.client(api_key), prompt, aspect_ratio)
+        except Exception as e:
+            rotator.report_error(api_key, str(e))
+            raise
+    
+    if n_images == 1:
+        return one()
+    
+    results: List[Optional[List[bytes]]] = [None] * n_images
+    first_err = None
+    with ThreadPoolExecutor(max_workers=n_images) as ex:
+        futures = {ex.submit(one): i for i in range(n_images)}
+        for fut in as_completed(futures):
+            try:
+                results[futures[fut]] = fut.result()
+            except Exception as e:
+                if first_err is None:
+                    first_err = e
+    
+    images: List[bytes] = []
+    for r in results:
+        if r:
+            images.extend(r)
+    if not images and first_err is not None:
+        raise first_err
     return images
 
 def ai_fix_prompt(client: genai.Client, raw_prompt: str, user_instruction: str = "") -> str:
@@ -2981,6 +3168,7 @@ class PromptRow(QWidget):
         # Track thumbnails
         self.thumbnails = []
         self.current_preview_index = 0
+        self._preview_token = 0
     
     def get_prompt(self) -> str:
         return self.txt.toPlainText().strip()
@@ -3029,6 +3217,10 @@ class PromptRow(QWidget):
     def update_preview(self, image_paths: List[Path]):
         self.saved_paths = image_paths
         self.thumbnails.clear()
+        # Kết quả decode của lần update trước (nếu còn chạy) bị bỏ qua
+        self._preview_token += 1
+        token = self._preview_token
+        self.current_preview_index = 0
         
         # Clear thumbnails
         for i in reversed(range(self.thumb_layout.count())):
@@ -3046,10 +3238,10 @@ class PromptRow(QWidget):
         self.main_preview.show()
         self.open_btn.setEnabled(True)
         
-        # Create thumbnails - very compact
+        # Create thumbnails - very compact (ảnh được decode ở thumbnail_service)
         for idx, p in enumerate(image_paths):
             try:
-                pixmap = QPixmap(str(p))
+                pixmap = QPixmap()
                 
                 # Thumbnail button - very small
                 thumb_btn = QPushButton()
@@ -3067,9 +3259,7 @@ class PromptRow(QWidget):
                     }}
                 """)
                 
-                # Set thumbnail image - crop to 16:9
-                cropped_thumb = crop_to_16_9(pixmap, 66, 37)  # 66/37 ≈ 16/9
-                thumb_btn.setIcon(QIcon(cropped_thumb))
+                # Icon được gắn khi decode xong (_on_preview_ready)
                 thumb_btn.setIconSize(QSize(66, 37))
                 thumb_btn.clicked.connect(lambda checked, i=idx: self.show_preview(i))
                 
@@ -3099,9 +3289,24 @@ class PromptRow(QWidget):
             except Exception as e:
                 print("Preview error:", e)
         
-        # Show first image
-        if self.thumbnails:
-            self.show_preview(0)
+        # Gửi request sau khi dựng xong nút: ảnh đã có trong RAM sẽ callback ngay
+        for idx, p in enumerate(image_paths):
+            thumbnail_service().request(
+                str(p), *PREVIEW_DECODE_SIZE,
+                lambda image, t=token, i=idx: self._on_preview_ready(t, i, image),
+                mode=MODE_COVER)
+    
+    def _on_preview_ready(self, token: int, idx: int, image):
+        if token != self._preview_token or not (0 <= idx < len(self.thumbnails)) or image.isNull():
+            return
+        thumb_btn, _ = self.thumbnails[idx]
+        pixmap = QPixmap.fromImage(image)
+        self.thumbnails[idx] = (thumb_btn, pixmap)
+        # Set thumbnail image - crop to 16:9
+        thumb_btn.setIcon(QIcon(crop_to_16_9(pixmap, 66, 37)))  # 66/37 ≈ 16/9
+        # Show first image (hoặc ảnh user đã chọn trong lúc chờ)
+        if idx == self.current_preview_index:
+            self.show_preview(idx)
     
     def show_preview(self, index: int):
         """Show selected image in main preview"""
@@ -3276,38 +3481,143 @@ class PromptRow(QWidget):
 
 # ==================== GENERATION WORKER ====================
 class GenerationWorker(QThread):
+    """
+    Scheduler ảnh chạy suốt vòng đời tab (1 executor, không dựng lại giữa các batch)
+    - submit() nhận row mới bất kỳ lúc nào; slot trống được lấp ngay → luôn chạy đủ concurrency
+    - priority: số nhỏ chạy trước (regenerate 1 row → chen lên đầu hàng đợi)
+    - pause()/resume(): ngừng/tiếp tục phát row mới, row đang chạy vẫn chạy xong
+    - cancel(): bỏ hàng đợi + dừng row đang chạy ở lần retry kế tiếp; scheduler vẫn sống
+    """
     progress_signal = Signal(int)
+    row_started_signal = Signal(object)
     row_done_signal = Signal(object, list, str)
     all_done_signal = Signal()
     
-    def __init__(self, targets, controller):
+    def __init__(self, controller, max_workers: int, concurrency: int = 1):
         super().__init__()
-        self.targets = targets
         self.controller = controller
-        self.cancel_flag = False
+        self.max_workers = max(1, max_workers)
+        self.concurrency = max(1, min(concurrency, self.max_workers))
+        self._cond = threading.Condition()
+        self._heap = []         # (priority, seq, row)
+        self._seq = 0
+        self._queued = set()    # id(row) đang chờ
+        self._running = set()   # id(row) đang chạy
+        self._epoch = 0         # tăng mỗi lần cancel → task cũ tự dừng
+        self._paused = False
+        self._stopped = False
+        self._done = 0
+    
+    # ---------- API cho UI thread ----------
+    def submit(self, rows, priority: int = 0, on_new_batch=None) -> int:
+        """
+        Thêm rows vào hàng đợi (bỏ qua row đang chờ/đang chạy) → số row được thêm
+        Scheduler đang rảnh → batch mới: reset progress + gọi on_new_batch(số row) trong lock,
+        trước khi row nào kịp chạy xong (không mất progress của row nhanh)
+        """
+        with self._cond:
+            new_rows = []
+            for row in rows:
+                if id(row) in self._queued or id(row) in self._running:
+                    continue
+                self._queued.add(id(row))
+                new_rows.append(row)
+            if not new_rows:
+                return 0
+            if not self._heap and not self._running:
+                self._done = 0
+                if on_new_batch is not None:
+                    on_new_batch(len(new_rows))
+            for row in new_rows:
+                heapq.heappush(self._heap, (priority, self._seq, row))
+                self._seq += 1
+            self._cond.notify_all()
+        return len(new_rows)
+    
+    def set_concurrency(self, n: int):
+        with self._cond:
+            self.concurrency = max(1, min(int(n), self.max_workers))
+            self._cond.notify_all()
+    
+    def pause(self):
+        with self._cond:
+            self._paused = True
+    
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+    
+    def is_paused(self) -> bool:
+        with self._cond:
+            return self._paused
+    
+    def is_idle(self) -> bool:
+        with self._cond:
+            return not self._heap and not self._running
     
+    def cancel(self):
+        """Bỏ các row đang chờ (báo 'Cancelled', vẫn tính vào progress), row đang chạy dừng ở lần thử kế tiếp"""
+        with self._cond:
+            dropped = [row for _, _, row in self._heap]
+            self._heap.clear()
+            self._queued.clear()
+            self._epoch += 1
+            self._done += len(dropped)
+            done = self._done
+            idle = not self._running
+            self._cond.notify_all()
+        for row in dropped:
+            self.row_done_signal.emit(row, [], "Cancelled")
+        if dropped:
+            self.progress_signal.emit(done)
+        if idle and dropped:
+            self.all_done_signal.emit()
+    
+    def shutdown(self):
+        self.cancel()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+    
+    # ---------- scheduler ----------
     def run(self):
-        concurrency = self.controller.get_concurrency()
-        done = 0
-        
-        with ThreadPoolExecutor(max_workers=concurrency) as ex:
-            futures = {ex.submit(self.task_fn, r): r for r in self.targets}
-            for fut in as_completed(futures):
-                if self.cancel_flag:
-                    break
-                row = futures[fut]
-                try:
-                    r, paths, err = fut.result()
-                    self.row_done_signal.emit(r, paths, err)
-                except Exception as e2:
-                    self.row_done_signal.emit(row, [], str(e2))
-                
-                done += 1
-                self.progress_signal.emit(done)
-        
-        self.all_done_signal.emit()
-    
-    def task_fn(self, row):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as ex:
+            while True:
+                with self._cond:
+                    while not self._stopped and (
+                            self._paused or not self._heap or len(self._running) >= self.concurrency):
+                        self._cond.wait()
+                    if self._stopped:
+                        break
+                    _, _, row = heapq.heappop(self._heap)
+                    self._queued.discard(id(row))
+                    self._running.add(id(row))
+                    epoch = self._epoch
+                self.row_started_signal.emit(row)
+                fut = ex.submit(self.task_fn, row, epoch)
+                fut.add_done_callback(lambda f, r=row: self._on_task_done(r, f))
+    
+    def _on_task_done(self, row, fut):
+        try:
+            r, paths, err = fut.result()
+            self.row_done_signal.emit(r, paths, err)
+        except Exception as e2:
+            self.row_done_signal.emit(row, [], str(e2))
+        with self._cond:
+            self._running.discard(id(row))
+            self._done += 1
+            done = self._done
+            idle = not self._heap and not self._running
+            self._cond.notify_all()
+        self.progress_signal.emit(done)
+        if idle:
+            self.all_done_signal.emit()
+    
+    def _is_cancelled(self, epoch: int) -> bool:
+        return self._stopped or epoch != self._epoch
+    
+    def task_fn(self, row, epoch: int = 0):
         self.controller._delete_images_for_row(row.index)
         
         tries = 0
@@ -3320,14 +3630,21 @@ class GenerationWorker(QThread):
         max_retries = self.controller.get_max_retries()
         auto_retry = self.controller.get_auto_retry()
         
-        while tries < max_retries and not self.cancel_flag:
-            api_key = self.controller.rotator.current()
-            client = genai.Client(api_key=api_key)
-            
+        rotator = self.controller.rotator
+        while tries < max_retries and not self._is_cancelled(epoch):
+            api_key = None
             final_prompt = user_prompt_raw
             
             try:
                 if model_id_local.startswith("imagen-4.0"):
+                    # Key kế tiếp còn lượt (RPM + quota ngày) - chờ nếu mọi key đang hết lượt
+                    api_key = rotator.acquire(cancel=lambda: self._is_cancelled(epoch))
+                    if api_key is None:
+                        if self._is_cancelled(epoch):
+                            last_err = "Cancelled"
+                            break
+                        raise RuntimeError("429 rate limit: all API keys are cooling down or out of quota")
+                    client = rotator.client(api_key)
                     effective_size = self.controller.get_image_size() if model_id_local in (IMAGEN4_STD, IMAGEN4_ULTRA) else None
                     
                     resp = generate_with_imagen4(
@@ -3342,11 +3659,13 @@ class GenerationWorker(QThread):
                     bytes_list = [gi.image.image_bytes for gi in resp.generated_images]
                     saved_paths = self.controller.save_bytes_list(row.index, bytes_list)
                 else:
+                    # Mỗi ảnh tự lấy key qua rotator.acquire()
                     bytes_list = generate_with_gemini_image(
-                        client,
+                        None,
                         final_prompt,
                         self.controller.get_aspect_ratio(),
-                        self.controller.get_n_images()
+                        self.controller.get_n_images(),
+                        rotator=rotator
                     )
                     saved_paths = self.controller.save_bytes_list(row.index, bytes_list)
                 
@@ -3354,27 +3673,26 @@ class GenerationWorker(QThread):
             
             except Exception as e:
                 last_err = str(e)
+                if api_key:
+                    # Key vào cooldown → acquire() lần sau tự bỏ qua key này
+                    rotator.report_error(api_key, last_err)
                 
                 if not auto_retry:
                     break
                 
                 if is_rate_or_quota_error(last_err):
-                    self.controller.rotator.next()
-                    
                     low = last_err.lower()
                     if ("quota" in low or "permission" in low or "exhaust" in low or "403" in low):
                         model_id_local = escalate_model_quality_fallback(model_id_local)
                     
-                    time.sleep(0.3)
                     tries += 1
                     continue
                 
                 break
         
+        if last_err is None and self._is_cancelled(epoch):
+            last_err = "Cancelled"
         return (row, saved_paths, last_err)
-    
-    def cancel(self):
-        self.cancel_flag = True
 
 # ==================== MAIN APPLICATION ====================
 class ImageGeneratorTab(QWidget):
@@ -3817,6 +4135,13 @@ class ImageGeneratorTab(QWidget):
         self.cancel_btn.setEnabled(False)
         toolbar_layout.addWidget(self.cancel_btn)
         
+        self.pause_btn = ModernButton("⏸ Pause", Theme.WARNING)
+        self.pause_btn.setMaximumWidth(100)
+        self.pause_btn.setToolTip("Stop starting new prompts (running ones finish)")
+        self.pause_btn.clicked.connect(self.on_pause_batch)
+        self.pause_btn.setEnabled(False)
+        toolbar_layout.addWidget(self.pause_btn)
+        
         toolbar_layout.addSpacing(12)
         
         delete_btn = ModernButton("🗑 Delete All", Theme.DANGER)
@@ -4154,7 +4479,8 @@ class ImageGeneratorTab(QWidget):
                 r.set_index(i)
     
     def regenerate_row(self, row: PromptRow):
-        self.generate_rows([row])
+        # Ưu tiên: chen lên trước các row đang chờ
+        self.generate_rows([row], priority=-1)
     
     @Slot(int, str, str)
     def _on_ai_fix_result(self, row_index: int, fixed_text: str, status: str):
@@ -4256,7 +4582,7 @@ class ImageGeneratorTab(QWidget):
                                 break
                             
                             print(f"[AI FIX WORKER] Attempt {tries + 1}/{max_retries}, using API key: {api_key[:10]}...")
-                            client = genai.Client(api_key=api_key)
+                            client = self.rotator.client(api_key)
                             fixed = ai_fix_prompt(client, raw, user_instruction)
                             
                             if fixed and fixed != raw:
@@ -4679,7 +5005,7 @@ class ImageGeneratorTab(QWidget):
                 
                 while tries < max_retries:
                     api_key = self.rotator.current()
-                    client = genai.Client(api_key=api_key)
+                    client = self.rotator.client(api_key)
                     try:
                         fixed = ai_fix_prompt(client, raw, user_instruction)
                         break
@@ -4932,8 +5258,11 @@ class ImageGeneratorTab(QWidget):
             )
     
     def on_cancel_batch(self):
+        self._batch_cancelled = True
         if self.worker:
             self.worker.cancel()
+            self.worker.resume()
+            self.pause_btn.setText("⏸ Pause")
         self.set_status("⚠️ Canceling...")
     
     def on_export_prompts(self):
@@ -5053,34 +5382,81 @@ class ImageGeneratorTab(QWidget):
                 except Exception:
                     pass
     
-    def generate_rows(self, targets: List[PromptRow]):
-        if self.clear_before_cb.isChecked():
+    def _ensure_worker(self) -> GenerationWorker:
+        """Scheduler dùng chung cho mọi lần Run/Regenerate - tạo 1 lần, chạy suốt vòng đời tab"""
+        if self.worker is None:
+            max_workers = max(int(self.cc_cb.itemText(i)) for i in range(self.cc_cb.count()))
+            self.worker = GenerationWorker(self, max_workers, self.get_concurrency())
+            self.worker.progress_signal.connect(self.on_progress_update)
+            self.worker.row_started_signal.connect(self.on_row_started)
+            self.worker.row_done_signal.connect(self.on_row_done)
+            self.worker.all_done_signal.connect(self.on_all_done)
+            self.cc_cb.currentTextChanged.connect(
+                lambda _: self.worker and self.worker.set_concurrency(self.get_concurrency()))
+            # Tab nhúng trong GenVideoPro không nhận closeEvent → dừng thread khi app thoát / tab bị xoá
+            QApplication.instance().aboutToQuit.connect(self._stop_worker)
+            self.destroyed.connect(lambda *_, w=self.worker: (w.shutdown(), w.wait()))
+            self.worker.start()
+        return self.worker
+    
+    def _stop_worker(self):
+        """Dừng scheduler và chờ thread thoát (row đang chạy dừng ở lần thử kế tiếp)"""
+        worker, self.worker = self.worker, None
+        if worker is not None:
+            worker.shutdown()
+            worker.wait()
+    
+    def generate_rows(self, targets: List[PromptRow], priority: int = 0):
+        worker = self._ensure_worker()
+        idle = worker.is_idle()
+        if idle and self.clear_before_cb.isChecked():
             removed = self._clear_output_folder()
             if removed:
                 self.set_status(f"🧹 Cleared {removed} images")
         
-        total = len(targets)
-        self.progress.setMaximum(total)
-        self.progress.setValue(0)
+        # Batch mới khi scheduler rảnh (set progress trong lock của worker); đang chạy thì nối thêm vào tổng
+        new_batch = []
+        
+        def start_batch(count):
+            new_batch.append(count)
+            self.progress.setMaximum(count)
+            self.progress.setValue(0)
+        
+        added = worker.submit(targets, priority, on_new_batch=start_batch)
+        if not added:
+            return
+        self._batch_cancelled = False
+        if not new_batch:
+            self.progress.setMaximum(self.progress.maximum() + added)
         self.cancel_btn.setEnabled(True)
+        self.pause_btn.setEnabled(True)
         
         for r in targets:
             r.set_busy(True)
-            r.set_status("generating")
+            r.set_status("queue")
         
-        self.set_status(f"⚡ Generating {total} prompts...")
-        
-        self.worker = GenerationWorker(targets, self)
-        self.worker.progress_signal.connect(self.on_progress_update)
-        self.worker.row_done_signal.connect(self.on_row_done)
-        self.worker.all_done_signal.connect(self.on_all_done)
-        self.worker.start()
+        self.set_status(f"⚡ Generating {self.progress.maximum()} prompts...")
+    
+    def on_pause_batch(self):
+        if not self.worker:
+            return
+        if self.worker.is_paused():
+            self.worker.resume()
+            self.pause_btn.setText("⏸ Pause")
+            self.set_status("▶️ Resumed")
+        else:
+            self.worker.pause()
+            self.pause_btn.setText("▶️ Resume")
+            self.set_status("⏸ Paused - running prompts will finish")
     
     def on_progress_update(self, value):
         self.progress.setValue(value)
         total = self.progress.maximum()
         self.set_status(f"⚡ Generating... {value}/{total}")
     
+    def on_row_started(self, row):
+        row.set_status("generating")
+    
     def on_row_done(self, row, paths, error):
         if paths:
             row.update_preview(paths)
@@ -5093,15 +5469,16 @@ class ImageGeneratorTab(QWidget):
     
     def on_all_done(self):
         self.cancel_btn.setEnabled(False)
+        self.pause_btn.setEnabled(False)
         completed = self.progress.value()
         self.set_status(f"✅ Complete! Generated {completed} prompts")
-        self.worker = None
         
-        # Auto-start next queued jobs
-        self._auto_start_queued_jobs()
+        # Auto-start next queued jobs (không tự chạy lại sau khi user Cancel)
+        if not getattr(self, '_batch_cancelled', False):
+            self._auto_start_queued_jobs()
     
     def _auto_start_queued_jobs(self):
-        """Automatically start next queued jobs after current batch completes"""
+        """Scheduler rảnh → đưa các row còn QUEUE (chưa chạy) vào hàng đợi"""
         # Find all rows with "QUEUE" status (not busy, not done, not failed)
         queued_rows = []
         for row in self.rows:
@@ -5113,13 +5490,10 @@ class ImageGeneratorTab(QWidget):
                     queued_rows.append(row)
         
         if queued_rows:
-            concurrency = self.get_concurrency()
-            # Limit to concurrency number to avoid starting too many at once
-            rows_to_start = queued_rows[:concurrency]
-            print(f"[AUTO START] Found {len(queued_rows)} queued jobs, starting {len(rows_to_start)} jobs (concurrency: {concurrency})...")
-            self.set_status(f"🔄 Auto-starting {len(rows_to_start)} queued jobs...")
-            # Start generation for queued rows with a small delay to ensure UI is ready
-            QTimer.singleShot(500, lambda: self.generate_rows(rows_to_start))
+            # Scheduler tự giữ đúng số luồng → đưa hết vào, không cần chia batch
+            print(f"[AUTO START] Found {len(queued_rows)} queued jobs, queueing all (concurrency: {self.get_concurrency()})...")
+            self.set_status(f"🔄 Auto-starting {len(queued_rows)} queued jobs...")
+            self.generate_rows(queued_rows)
         else:
             print("[AUTO START] No queued jobs found - all jobs completed!")
             self.set_status("✅ All jobs completed!")
@@ -5129,6 +5503,7 @@ class ImageGeneratorTab(QWidget):
     
     def closeEvent(self, event):
         self.save_settings()
+        self._stop_worker()
         event.accept()
     
     # Helper methods for worker
@@ -5197,6 +5572,7 @@ class ImageGeneratorTab(QWidget):
             # Extract and clean API keys from the data
             # keys_data is a list of dict like: [{'id': 1, 'api_key': 'AIza...', 'name': '...', 'status': 'active'}]
             api_keys = []
+            key_limits = {}
             for item in keys_data:
                 raw_key = item.get('api_key', '')
                 # Clean key: trim, remove newlines, tabs, and any whitespace
@@ -5204,6 +5580,8 @@ class ImageGeneratorTab(QWidget):
                 
                 if clean_key:
                     api_keys.append(clean_key)
+                    # Giới hạn riêng của key (nếu server có gửi) cho rate limiter
+                    key_limits[clean_key] = (item.get('rpm'), item.get('daily_quota'))
                     # Debug logging - show first/last 8 chars only
                     print(f"🔑 Loaded key {item.get('id')}: {clean_key[:8]}...{clean_key[-8:]} (length: {len(clean_key)})")
             
@@ -5213,7 +5591,7 @@ class ImageGeneratorTab(QWidget):
                 return
             
             # Update the key rotator with server keys
-            self.rotator = KeyRotator(api_keys)
+            self.rotator = KeyRotator(api_keys, limits=key_limits)
             
             key_count = len(api_keys)
             self.set_status(f"✅ Loaded {key_count} Gemini keys from server")
@@ -0,0 +1,399 @@
+"""
+MP3 Merge - Frame-accurate MP3 concatenation
+Replaces raw byte concatenation of ElevenLabs chunk files:
+- Strips per-chunk ID3v2 / ID3v1 / APE tags and Xing/Info/VBRI header frames
+- Writes a single Xing/Info header with the real frame count, byte count and TOC
+- Copies audio frames with os.sendfile (Linux) or bounded buffered copies
+- Optional silence gap (digital-silence frames) between chunks
+"""
+
+import os
+import sys
+import struct
+from typing import Dict, List, Optional
+
+
+COPY_BLOCK_SIZE = 1024 * 1024
+SCAN_BUFFER_SIZE = 256 * 1024
+RESYNC_WINDOW = 4096
+
+# Bitrate tables (kbps) indexed by bitrate_index
+_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# version bits → (version_key, sample rates)
+_SAMPLE_RATES = {
+    0b11: (1, [44100, 48000, 32000]),    # MPEG1
+    0b10: (2, [22050, 24000, 16000]),    # MPEG2
+    0b00: (2.5, [11025, 12000, 8000]),   # MPEG2.5
+}
+
+XING_FLAG_FRAMES = 0x1
+XING_FLAG_BYTES = 0x2
+XING_FLAG_TOC = 0x4
+
+
+class Mp3FormatError(Exception):
+    """File is not a parseable MPEG audio stream"""
+
+
+class MergeCancelled(Exception):
+    """Raised when should_cancel() returns True during a merge"""
+
+
+class FrameHeader:
+    """Decoded 4-byte MPEG audio frame header"""
+    __slots__ = ('raw', 'version_bits', 'version', 'layer', 'protected', 'bitrate_index',
+                 'bitrate', 'sample_rate_index', 'sample_rate', 'padding', 'channel_mode',
+                 'samples', 'length')
+
+    @classmethod
+    def parse(cls, data: bytes, offset: int = 0) -> Optional['FrameHeader']:
+        if len(data) - offset < 4:
+            return None
+        raw = struct.unpack_from('>I', data, offset)[0]
+        if (raw >> 21) & 0x7FF != 0x7FF:
+            return None
+        version_bits = (raw >> 19) & 0x3
+        layer_bits = (raw >> 17) & 0x3
+        bitrate_index = (raw >> 12) & 0xF
+        sample_rate_index = (raw >> 10) & 0x3
+        if version_bits == 0b01 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+            return None
+
+        h = cls()
+        h.raw = raw
+        h.version_bits = version_bits
+        h.version, rates = _SAMPLE_RATES[version_bits]
+        h.layer = 4 - layer_bits
+        h.protected = not ((raw >> 16) & 0x1)
+        h.bitrate_index = bitrate_index
+        table = _BITRATES[(1 if h.version == 1 else 2, h.layer)]
+        h.bitrate = table[bitrate_index] * 1000
+        h.sample_rate_index = sample_rate_index
+        h.sample_rate = rates[sample_rate_index]
+        h.padding = (raw >> 9) & 0x1
+        h.channel_mode = (raw >> 6) & 0x3
+
+        if h.layer == 1:
+            h.samples = 384
+            h.length = (12 * h.bitrate // h.sample_rate + h.padding) * 4
+        elif h.layer == 2 or h.version == 1:
+            h.samples = 1152
+            h.length = 144 * h.bitrate // h.sample_rate + h.padding
+        else:
+            h.samples = 576
+            h.length = 72 * h.bitrate // h.sample_rate + h.padding
+        return h
+
+    @property
+    def is_mono(self) -> bool:
+        return self.channel_mode == 0b11
+
+    def side_info_size(self) -> int:
+        """Bytes between the header (and CRC) and the Xing tag for Layer III"""
+        if self.version == 1:
+            return 17 if self.is_mono else 32
+        return 9 if self.is_mono else 17
+
+    def same_stream(self, other: 'FrameHeader') -> bool:
+        return (self.version_bits == other.version_bits and self.layer == other.layer
+                and self.sample_rate == other.sample_rate and self.is_mono == other.is_mono)
+
+
+def _syncsafe(b: bytes) -> int:
+    return (b[0] << 21) | (b[1] << 14) | (b[2] << 7) | b[3]
+
+
+def _audio_bounds(f, file_size: int):
+    """Return (start, end) of the MPEG payload after removing ID3v2/ID3v1/APE tags"""
+    start = 0
+    while True:
+        f.seek(start)
+        head = f.read(10)
+        if len(head) < 10 or head[:3] != b'ID3':
+            break
+        size = _syncsafe(head[6:10]) + 10
+        if head[5] & 0x10:  # footer present
+            size += 10
+        start += size
+
+    end = file_size
+    if end - start >= 128:
+        f.seek(end - 128)
+        if f.read(3) == b'TAG':
+            end -= 128
+    if end - start >= 32:
+        f.seek(end - 32)
+        footer = f.read(32)
+        if footer[:8] == b'APETAGEX':
+            tag_size, flags = struct.unpack_from('<II', footer, 12)[0], struct.unpack_from('<I', footer, 20)[0]
+            end -= tag_size + (32 if flags & 0x80000000 else 0)
+    return start, max(start, end)
+
+
+def _find_sync(f, pos: int, end: int) -> Optional[int]:
+    """Scan forward (bounded window) for a frame header whose successor also parses"""
+    f.seek(pos)
+    window = f.read(min(RESYNC_WINDOW, end - pos))
+    i = window.find(b'\xff')
+    while i != -1:
+        h = FrameHeader.parse(window, i)
+        if h:
+            nxt = pos + i + h.length
+            if nxt + 4 > end:
+                return pos + i
+            f.seek(nxt)
+            h2 = FrameHeader.parse(f.read(4))
+            if h2 and h2.same_stream(h):
+                return pos + i
+        i = window.find(b'\xff', i + 1)
+    return None
+
+
+def _is_info_frame(f, pos: int, h: FrameHeader) -> bool:
+    """Xing/Info (LAME) or VBRI header frame - carries no audio"""
+    if h.layer != 3:
+        return False
+    f.seek(pos)
+    frame = f.read(min(h.length, 64))
+    xing_at = 4 + (2 if h.protected else 0) + h.side_info_size()
+    return frame[xing_at:xing_at + 4] in (b'Xing', b'Info') or frame[36:40] == b'VBRI'
+
+
+def scan_mp3(path: str) -> Dict:
+    """
+    Walk frame headers of one MP3 without loading it into memory
+    Returns: {start, end, frames, samples, first_header, bitrates}
+    start/end delimit the audio frames to copy (tags and Xing frame excluded)
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb', buffering=SCAN_BUFFER_SIZE) as f:
+        start, end = _audio_bounds(f, file_size)
+        first = _find_sync(f, start, end)
+        if first is None:
+            raise Mp3FormatError(f"No MPEG frame found: {path}")
+        f.seek(first)
+        first_header = FrameHeader.parse(f.read(4))
+        if _is_info_frame(f, first, first_header):
+            first += first_header.length
+        if first >= end:
+            raise Mp3FormatError(f"No audio frames: {path}")
+
+        pos = first
+        frames = 0
+        samples = 0
+        bitrates = set()
+        audio_header = None
+        while pos + 4 <= end:
+            f.seek(pos)
+            h = FrameHeader.parse(f.read(4))
+            if h is None or pos + h.length > end:
+                nxt = _find_sync(f, pos + 1, end) if h is None else None
+                if nxt is None:
+                    break  # trailing garbage / truncated last frame
+                pos = nxt
+                continue
+            if audio_header is None:
+                audio_header = h
+            frames += 1
+            samples += h.samples
+            bitrates.add(h.bitrate)
+            pos += h.length
+
+    if not frames:
+        raise Mp3FormatError(f"No audio frames: {path}")
+    return {
+        'start': first,
+        'end': pos,
+        'frames': frames,
+        'samples': samples,
+        'first_header': audio_header,
+        'bitrates': bitrates,
+    }
+
+
+def _copy_range(src, dst, offset: int, length: int):
+    """Copy [offset, offset+length) from src to dst - sendfile on Linux, buffered elsewhere"""
+    dst.flush()
+    if sys.platform.startswith('linux') and hasattr(os, 'sendfile'):
+        try:
+            in_fd, out_fd = src.fileno(), dst.fileno()
+            out_pos = os.lseek(out_fd, 0, os.SEEK_CUR)
+            sent_total = 0
+            while sent_total < length:
+                sent = os.sendfile(out_fd, in_fd, offset + sent_total, length - sent_total)
+                if sent == 0:
+                    break
+                sent_total += sent
+            if sent_total == length:
+                dst.seek(out_pos + length)
+                return
+            dst.seek(out_pos)
+            dst.truncate()
+        except OSError:
+            pass
+    src.seek(offset)
+    remaining = length
+    while remaining > 0:
+        block = src.read(min(COPY_BLOCK_SIZE, remaining))
+        if not block:
+            raise IOError(f"Unexpected end of file while copying {getattr(src, 'name', '')}")
+        dst.write(block)
+        remaining -= len(block)
+
+
+def _build_header(template: FrameHeader, bitrate_index: int) -> bytes:
+    """Layer III header with template's stream params, no CRC, no padding"""
+    raw = (0x7FF << 21) | (template.version_bits << 19) | (0b01 << 17) | (1 << 16)
+    raw |= (bitrate_index << 12) | (template.sample_rate_index << 10)
+    raw |= (template.channel_mode << 6)
+    return struct.pack('>I', raw)
+
+
+def _xing_frame_size(template: FrameHeader):
+    """Smallest bitrate whose frame can hold the Xing tag with TOC → (bitrate_index, length)"""
+    needed = 4 + template.side_info_size() + 4 + 4 + 4 + 4 + 100
+    table = _BITRATES[(1 if template.version == 1 else 2, 3)]
+    factor = 144 if template.version == 1 else 72
+    for idx in range(1, 15):
+        length = factor * table[idx] * 1000 // template.sample_rate
+        if length >= needed:
+            return idx, length
+    raise Mp3FormatError("Cannot fit Xing header")
+
+
+def silence_frame(template: FrameHeader) -> bytes:
+    """One frame of digital silence (zero side info → zero granules)"""
+    header = _build_header(template, template.bitrate_index)
+    h = FrameHeader.parse(header)
+    return header + b'\x00' * (h.length - 4)
+
+
+class Mp3Merger:
+    """
+    Incremental frame-accurate merger
+    append() files in order, then finalize() to write the Xing/Info header;
+    abort() removes the partial output.
+    """
+
+    def __init__(self, out_path: str, gap_ms: int = 0):
+        self.out_path = out_path
+        self.gap_ms = max(0, int(gap_ms))
+        self._out = open(out_path, 'w+b')
+        self._template: Optional[FrameHeader] = None
+        self._xing_index = 0
+        self._xing_length = 0
+        self._silence = b''
+        self._silence_count = 0
+        self.frames = 0
+        self.samples = 0
+        self.audio_bytes = 0
+        self.files = 0
+        self.bitrates = set()
+        self.mismatched: List[str] = []
+        self._marks: List[tuple] = []  # (samples_before, bytes_before) per appended segment
+
+    def _start(self, template: FrameHeader):
+        self._template = template
+        if template.layer == 3:
+            self._xing_index, self._xing_length = _xing_frame_size(template)
+            self._out.write(b'\x00' * self._xing_length)  # placeholder, filled in finalize()
+        if self.gap_ms and template.layer == 3:
+            self._silence = silence_frame(template)
+            per_frame_ms = template.samples * 1000.0 / template.sample_rate
+            self._silence_count = max(1, int(round(self.gap_ms / per_frame_ms)))
+
+    def _write_gap(self):
+        if not self._silence_count:
+            return
+        self._marks.append((self.samples, self.audio_bytes))
+        self._out.write(self._silence * self._silence_count)
+        self.frames += self._silence_count
+        self.samples += self._silence_count * self._template.samples
+        self.audio_bytes += len(self._silence) * self._silence_count
+
+    def append(self, path: str) -> Dict:
+        info = scan_mp3(path)
+        header = info['first_header']
+        if self._template is None:
+            self._start(header)
+        else:
+            if not header.same_stream(self._template):
+                self.mismatched.append(os.path.basename(path))
+            self._write_gap()
+
+        self._marks.append((self.samples, self.audio_bytes))
+        length = info['end'] - info['start']
+        with open(path, 'rb') as src:
+            _copy_range(src, self._out, info['start'], length)
+
+        self.frames += info['frames']
+        self.samples += info['samples']
+        self.audio_bytes += length
+        self.bitrates |= info['bitrates']
+        self.files += 1
+        return info
+
+    def _toc(self) -> bytes:
+        """100-entry seek table interpolated from per-segment (samples, bytes) marks"""
+        total_samples = self.samples or 1
+        total_bytes = self.audio_bytes or 1
+        marks = self._marks + [(self.samples, self.audio_bytes)]
+        toc = bytearray(100)
+        j = 0
+        for i in range(100):
+            target = total_samples * i / 100.0
+            while j + 1 < len(marks) and marks[j + 1][0] <= target:
+                j += 1
+            s0, b0 = marks[j]
+            s1, b1 = marks[j + 1] if j + 1 < len(marks) else (self.samples, self.audio_bytes)
+            frac = (target - s0) / (s1 - s0) if s1 > s0 else 0.0
+            pos = b0 + frac * (b1 - b0)
+            toc[i] = min(255, int(pos * 256 / total_bytes))
+        return bytes(toc)
+
+    def finalize(self) -> Dict:
+        if self._template is None:
+            self.abort()
+            raise Mp3FormatError("Nothing to merge")
+        t = self._template
+        if t.layer == 3:
+            tag = b'Info' if len(self.bitrates) <= 1 else b'Xing'
+            frame = bytearray(self._xing_length)
+            frame[0:4] = _build_header(t, self._xing_index)
+            pos = 4 + t.side_info_size()
+            flags = XING_FLAG_FRAMES | XING_FLAG_BYTES | XING_FLAG_TOC
+            frame[pos:pos + 16] = tag + struct.pack('>III', flags, self.frames,
+                                                    self.audio_bytes + self._xing_length)
+            frame[pos + 16:pos + 116] = self._toc()
+            self._out.flush()
+            self._out.seek(0)
+            self._out.write(bytes(frame))
+        self._out.close()
+        duration = self.samples / float(t.sample_rate)
+        return {
+            'files': self.files,
+            'frames': self.frames,
+            'bytes': os.path.getsize(self.out_path),
+            'duration_s': duration,
+            'sample_rate': t.sample_rate,
+            'vbr': len(self.bitrates) > 1,
+            'mismatched': list(self.mismatched),
+        }
+
+    def abort(self):
+        try:
+            self._out.close()
+        except Exception:
+            pass
+        try:
+            os.remove(self.out_path)
+        except OSError:
+            pass
@@ -0,0 +1,57 @@
+"""
+Regression checks for text_chunker.split_text
+Run directly (python test_text_chunker.py) or with pytest
+"""
+
+import random
+
+from text_chunker import split_text, _units
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+
+
+def greedy_split(text, max_size):
+    """Plain greedy packing of the same units - the chunk count split_text must never exceed"""
+    units = list(_units(text, 0, len(text), max_size, 0))
+    chunks = []
+    cur_start, cur_end = units[0]
+    for s, e in units[1:]:
+        if e - cur_start > max_size:
+            chunks.append(text[cur_start:cur_end].strip())
+            cur_start = s
+        cur_end = e
+    chunks.append(text[cur_start:cur_end].strip())
+    return [c for c in chunks if c]
+
+
+def random_script(rng):
+    sentences = []
+    for _ in range(rng.randint(1, 60)):
+        words = " ".join(rng.choices(WORDS, k=rng.randint(2, 40))).capitalize()
+        sentences.append(words + rng.choice([".", "!", "?", ","]))
+    return " ".join(sentences)
+
+
+def test_never_more_chunks_than_greedy():
+    rng = random.Random(1)
+    for _ in range(500):
+        text = random_script(rng)
+        max_size = rng.choice([200, 500, 800, 1000])
+        chunks = split_text(text, max_size)
+        assert len(chunks) <= len(greedy_split(text, max_size))
+        assert all(len(c) <= max_size for c in chunks)
+        assert "".join(chunks).replace(" ", "") == text.replace(" ", "")
+
+
+def test_no_tiny_tail():
+    # 1769 chars at max 800: 3 balanced chunks, not 571/571/571/51
+    text = "Word " * 353 + "end."
+    chunks = split_text(text, 800)
+    assert len(chunks) == 3
+    assert min(len(c) for c in chunks) > 500
+
+
+if __name__ == "__main__":
+    test_never_more_chunks_than_greedy()
+    test_no_tiny_tail()
+    print("✅ text_chunker checks passed")
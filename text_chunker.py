@@ -0,0 +1,99 @@
+"""
+Text Chunker - shared sentence-aware splitter for TTS scripts
+Used by the ElevenLabs tab and the auto workflow so both produce the same chunks:
+- Splits on sentence ends (. ! ? … and CJK/Arabic marks, closing quotes) and blank lines
+- A sentence longer than max_size falls back to clause (, ; : dashes), then word,
+  then hard character boundaries - no chunk is ever longer than max_size
+- Chunks are slices of the original text (no string rebuilding) → linear time
+- Chunks are balanced toward a target size instead of leaving a tiny last chunk,
+  without ever using more chunks (TTS requests) than plain greedy packing
+"""
+
+import re
+from typing import Iterator, List, Optional, Tuple
+
+
+# Sentence end: terminators + closing quotes/brackets + whitespace, or a paragraph break
+_SENTENCE_END = re.compile(r'[.!?…。！？؟]+["\'”’»)\]]*\s+|\n\s*\n\s*')
+# Clause end: comma/semicolon/colon (Latin + CJK) or a spaced dash
+_CLAUSE_END = re.compile(r'[,;:，；：、]\s+|\s[—–-]\s+')
+_WORD_END = re.compile(r'\s+')
+
+_LEVELS = (_SENTENCE_END, _CLAUSE_END, _WORD_END)
+
+
+def _units(text: str, start: int, end: int, max_size: int, level: int) -> Iterator[Tuple[int, int]]:
+    """Contiguous (start, end) spans covering text[start:end], each at most max_size long"""
+    if end - start <= max_size:
+        yield start, end
+        return
+    if level == len(_LEVELS):
+        # No usable boundary (very long token / script without spaces)
+        for i in range(start, end, max_size):
+            yield i, min(i + max_size, end)
+        return
+    prev = start
+    for m in _LEVELS[level].finditer(text, start, end):
+        cut = m.end()
+        if cut >= end:
+            break
+        if cut - prev <= max_size:
+            yield prev, cut
+        else:
+            yield from _units(text, prev, cut, max_size, level + 1)
+        prev = cut
+    if end - prev <= max_size:
+        yield prev, end
+    else:
+        yield from _units(text, prev, end, max_size, level + 1)
+
+
+def _min_chunks_from(units: List[Tuple[int, int]], max_size: int) -> List[int]:
+    """need[i] = fewest chunks that can hold units[i:] (greedy packing is optimal) - O(n)"""
+    n = len(units)
+    need = [0] * (n + 1)
+    reach = n  # first unit that does not fit in a chunk starting at unit i
+    for i in range(n - 1, -1, -1):
+        start = units[i][0]
+        while units[reach - 1][1] - start > max_size:
+            reach -= 1
+        need[i] = 1 + need[reach]
+    return need
+
+
+def split_text(text: str, max_size: int, target_size: Optional[int] = None) -> List[str]:
+    """
+    Split text into chunks of at most max_size characters
+
+    Never produces more chunks than plain greedy packing; within that count the
+    chunks are balanced toward target_size (default: text length spread evenly
+    over the greedy count, e.g. 1700 chars, max 800 → 3 chunks of ~570)
+    """
+    if max_size < 1:
+        raise ValueError("max_size must be >= 1")
+    if not text or not text.strip():
+        return []
+
+    units = list(_units(text, 0, len(text), max_size, 0))
+    need = _min_chunks_from(units, max_size)
+    budget = need[0]
+    if target_size is None:
+        target_size = len(text) / budget
+    target_size = min(target_size, max_size)
+
+    chunks = []
+    cur_start, cur_end = units[0]
+    for k in range(1, len(units)):
+        s, e = units[k]
+        cur_len = cur_end - cur_start
+        new_len = e - cur_start
+        # Close the chunk if it would overflow, or if it is already closer to the target
+        # and the rest still fits in the remaining chunk budget
+        if new_len > max_size or (abs(cur_len - target_size) <= abs(new_len - target_size)
+                                  and len(chunks) + 1 + need[k] <= budget):
+            chunks.append(text[cur_start:cur_end].strip())
+            cur_start = s
+        cur_end = e
+    chunks.append(text[cur_start:cur_end].strip())
+
+    return [c for c in chunks if c]
@@ -0,0 +1,245 @@
+"""
+Thumbnail Cache - one thumbnail service shared by the Image and Video tabs
+Replaces per-widget "decode the full image, then scale" code paths:
+- Disk cache keyed by (path, mtime, size, target w×h, mode) → reopening a project
+  with hundreds of images reads small PNGs instead of decoding every 2K original;
+  bounded by a byte budget, least recently used files are pruned first
+- Widgets whose size changes continuously request bucket_size() and let the label scale
+- In-memory LRU of QImage bounded by a byte budget (not by item count)
+- Background generation on a small thread pool; callbacks run on the UI thread
+- Decoding uses QImageReader.setScaledSize, so no full-size QPixmap is ever built
+"""
+
+import hashlib
+import os
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from PySide6.QtCore import QObject, Signal, QSize
+from PySide6.QtGui import QImage, QImageReader
+
+
+if os.name == 'nt':
+    THUMB_CACHE_DIR = "C:/TotalTool/thumb_cache"
+else:
+    THUMB_CACHE_DIR = os.path.expanduser("~/.cache/amzmedia/thumbs")
+
+THUMB_MEMORY_BYTES = 64 * 1024 * 1024
+THUMB_DISK_BYTES = 256 * 1024 * 1024
+THUMB_DISK_PRUNE_TO = 0.8   # prune xuống 80% budget → không prune lại sau mỗi file mới
+THUMB_SIZE_STEP = 64        # bucket kích thước cho card resize liên tục
+THUMB_WORKERS = 2
+
+MODE_FIT = "fit"      # nằm gọn trong w×h (giữ tỉ lệ)
+MODE_COVER = "cover"  # phủ kín w×h (giữ tỉ lệ) - để crop sau
+
+
+def bucket_size(width: int, height: int):
+    """Làm tròn lên bội số THUMB_SIZE_STEP → kéo cột từng pixel không sinh thumbnail mới mỗi pixel"""
+    def up(v):
+        return max(1, -(-int(v) // THUMB_SIZE_STEP)) * THUMB_SIZE_STEP
+    return up(width), up(height)
+
+
+def _read_scaled(path: str, width: int, height: int, mode: str) -> QImage:
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid() and size.width() > 0 and size.height() > 0:
+        fx, fy = width / size.width(), height / size.height()
+        f = min(1.0, max(fx, fy) if mode == MODE_COVER else min(fx, fy))
+        if f < 1.0:
+            reader.setScaledSize(QSize(max(1, round(size.width() * f)), max(1, round(size.height() * f))))
+    return reader.read()
+
+
+class ThumbnailService(QObject):
+    """Thread-safe; get()/load() có thể gọi từ mọi thread, request() gọi từ UI thread"""
+
+    _ready = Signal(str, object)  # key, QImage (queued về UI thread)
+
+    def __init__(self, cache_dir: str = THUMB_CACHE_DIR, max_bytes: int = THUMB_MEMORY_BYTES,
+                 workers: int = THUMB_WORKERS, max_disk_bytes: int = THUMB_DISK_BYTES):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None  # tổng dung lượng thư mục cache, quét lần đầu khi ghi (trong worker thread)
+        self._memory = collections.OrderedDict()  # key -> QImage (LRU)
+        self._bytes = 0
+        self._waiting = {}  # key -> [callback] đang chờ background job
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumb")
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError:
+            self.cache_dir = None  # chỉ cache trong RAM
+        self._ready.connect(self._deliver)
+
+    @staticmethod
+    def key(path: str, width: int, height: int, mode: str = MODE_FIT) -> Optional[str]:
+        """Key đổi khi file đổi (mtime/size) → không bao giờ trả thumbnail cũ"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        raw = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{width}x{height}|{mode}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    # ---------- memory LRU ----------
+    def _remember(self, key: str, image: QImage):
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._bytes -= old.sizeInBytes()
+            self._memory[key] = image
+            self._bytes += image.sizeInBytes()
+            while self._bytes > self.max_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._bytes -= evicted.sizeInBytes()
+
+    def _recall(self, key: str) -> Optional[QImage]:
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+            return image
+
+    def get(self, path: str, width: int, height: int, mode: str = MODE_FIT) -> Optional[QImage]:
+        """Chỉ tra RAM (O(1), không I/O) - None nếu chưa có"""
+        key = self.key(path, width, height, mode)
+        return self._recall(key) if key else None
+
+    # ---------- disk + generation ----------
+    def _disk_path(self, key: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, key[:2], key + ".png") if self.cache_dir else None
+
+    def _disk_files(self):
+        """[(mtime, size, path)] của mọi thumbnail trên disk"""
+        files = []
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".png"):
+                    st = entry.stat()
+                    files.append((st.st_mtime, st.st_size, entry.path))
+        return files
+
+    def _disk_added(self, size: int):
+        """Cộng dung lượng file vừa ghi; vượt budget → xoá file dùng lâu nhất (mtime cũ nhất)"""
+        with self._disk_lock:
+            try:
+                if self._disk_bytes is None:
+                    self._disk_bytes = sum(f[1] for f in self._disk_files())
+                else:
+                    self._disk_bytes += size
+                if self._disk_bytes <= self.max_disk_bytes:
+                    return
+                files = sorted(self._disk_files())
+                self._disk_bytes = sum(f[1] for f in files)
+                target = self.max_disk_bytes * THUMB_DISK_PRUNE_TO
+                for _, fsize, fpath in files:
+                    if self._disk_bytes <= target:
+                        break
+                    try:
+                        os.remove(fpath)
+                        self._disk_bytes -= fsize
+                    except OSError:
+                        pass
+            except OSError:
+                pass
+
+    def _build(self, key: str, path: str, width: int, height: int, mode: str) -> QImage:
+        disk = self._disk_path(key)
+        if disk and os.path.exists(disk):
+            image = QImage(disk)
+            if not image.isNull():
+                try:
+                    os.utime(disk)  # mtime = lần dùng gần nhất → prune theo LRU
+                except OSError:
+                    pass
+                self._remember(key, image)
+                return image
+        image = _read_scaled(path, width, height, mode)
+        if image.isNull():
+            return image
+        self._remember(key, image)
+        if disk:
+            try:
+                os.makedirs(os.path.dirname(disk), exist_ok=True)
+                tmp = disk + ".tmp"
+                if image.save(tmp, "PNG"):
+                    os.replace(tmp, disk)
+                    self._disk_added(os.path.getsize(disk))
+            except OSError:
+                pass
+        return image
+
+    def load(self, path: str, width: int, height: int, mode: str = MODE_FIT) -> QImage:
+        """Đồng bộ: RAM → disk cache → decode thu nhỏ (dùng trong worker thread)"""
+        key = self.key(path, width, height, mode)
+        if key is None:
+            return QImage()
+        image = self._recall(key)
+        if image is not None:
+            return image
+        return self._build(key, path, width, height, mode)
+
+    def request(self, path: str, width: int, height: int, callback: Callable[[QImage], None],
+                mode: str = MODE_FIT):
+        """
+        Bất đồng bộ: callback(QImage) chạy trên UI thread (ngay lập tức nếu đã có trong RAM)
+        Nhiều request cùng key đang chờ → chỉ 1 job decode. QImage rỗng = không đọc được
+        """
+        key = self.key(path, width, height, mode) if path else None
+        if key is None:
+            callback(QImage())
+            return
+        image = self._recall(key)
+        if image is not None:
+            callback(image)
+            return
+        with self._lock:
+            waiting = self._waiting.get(key)
+            if waiting is not None:
+                waiting.append(callback)
+                return
+            self._waiting[key] = [callback]
+        self._pool.submit(self._job, key, path, width, height, mode)
+
+    def _job(self, key, path, width, height, mode):
+        try:
+            image = self._build(key, path, width, height, mode)
+        except Exception as e:
+            print(f"[THUMB] Failed to build thumbnail for {path}: {e}")
+            image = QImage()
+        self._ready.emit(key, image)
+
+    def _deliver(self, key: str, image: QImage):
+        with self._lock:
+            callbacks = self._waiting.pop(key, [])
+        for cb in callbacks:
+            try:
+                cb(image)
+            except RuntimeError:
+                pass  # widget nhận callback đã bị xoá
+
+    def stats(self):
+        """(số thumbnail trong RAM, bytes đang dùng)"""
+        with self._lock:
+            return len(self._memory), self._bytes
+
+
+_service = None
+
+
+def thumbnail_service() -> ThumbnailService:
+    """Instance dùng chung - tạo lần đầu trên UI thread (signal giao kết quả về thread này)"""
+    global _service
+    if _service is None:
+        _service = ThumbnailService()
+    return _service